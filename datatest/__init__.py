@@ -1,5 +1,9 @@
 # -*- coding: utf-8 -*-
 from .case import DataTestCase
+from .case import register_sources
+from .case import unregister_sources
+from .require import parallel
+from .require import batch
 
 from .errors import ValidationError
 from .errors import Missing
@@ -30,6 +34,7 @@ from .dataaccess import DataSource
 from .dataaccess import DataQuery
 from .dataaccess import DataResult
 from .dataaccess import working_directory
+from .expression import element
 
 
 __version__ = '0.8.3.dev0'
@@ -37,6 +42,10 @@ __version__ = '0.8.3.dev0'
 __all__ = [
     # Test case.
     'DataTestCase',
+    'register_sources',
+    'unregister_sources',
+    'parallel',
+    'batch',
 
     # Error classes.
     'ValidationError',
@@ -70,6 +79,7 @@ __all__ = [
     'DataQuery',
     'DataResult',
     'working_directory',
+    'element',
 ]
 
 # Temporary alias for old "required" decorator.
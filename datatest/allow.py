@@ -13,12 +13,14 @@ from .utils.misc import _is_consumable
 from .utils.misc import _get_arg_lengths
 from .utils.misc import _expects_multiple_params
 from .utils.misc import _make_decimal
+from .utils.misc import _is_plain_number
 from .utils.misc import string_types
 from .dataaccess import _is_collection_of_items
 from .dataaccess import BaseElement
 from .dataaccess import DictItems
 
 from .errors import ValidationError
+from .errors import _make_truncated
 from .errors import BaseDifference
 from .errors import Missing
 from .errors import Extra
@@ -26,6 +28,12 @@ from .errors import Invalid
 from .errors import Deviation
 
 
+try:
+    import numpy as _numpy
+except ImportError:
+    _numpy = None
+
+
 __datatest = True  # Used to detect in-module stack frames (which are
                    # omitted from output).
 
@@ -102,6 +110,10 @@ class BaseAllowance(abc.ABC):
             if _is_consumable(differences):  # Rebuild if consumable.
                 differences = itertools.chain([first_item], differences)
         except StopIteration:
+            if getattr(exc_value, 'truncated', False):
+                return False  # <- EXIT! Differences past the truncated
+                              #    sample were never checked so the
+                              #    original error is re-raised.
             return True  # <- EXIT!
 
         # Handle mapping input with iterable-of-items output.
@@ -125,7 +137,10 @@ class BaseAllowance(abc.ABC):
         message = getattr(exc_value, 'message', '')
         if self.msg:
             message = '{0}: {1}'.format(self.msg, message)
-        exc = ValidationError(message, differences)
+        if getattr(exc_value, 'truncated', False):
+            differences = _make_truncated(differences)  # <- Keep truncated.
+        lazy = getattr(exc_value, 'lazy', False)  # <- Keep streaming if lazy.
+        exc = ValidationError(message, differences, lazy=lazy)
         exc.maxDiff = exc_value.maxDiff  # <- Re-raised error inherits the
                                          #    maxDiff of the original error.
         exc.__cause__ = None  # <- Suppress context using verbose
@@ -220,7 +235,118 @@ def _normalize_devargs(lower, upper, msg):
     return (lower, upper, msg)
 
 
-class allowed_deviation(ElementAllowance):
+def _get_plain_number(x):
+    """Return *x* as a float if it is a plain number that can be
+    exactly represented as a float (None is treated as zero). Returns
+    None for other objects.
+    """
+    if x is None:
+        return 0.0
+    if _is_plain_number(x):
+        return float(x)
+    return None
+
+
+class _DeviationAllowance(ElementAllowance):
+    """Base class for deviation allowances. When NumPy is available,
+    tolerances are checked for many differences at once using arrays
+    (differences that fall within rounding distance of a bound, and
+    non-finite values, are still checked with the *predicate*).
+    """
+    def __init__(self, predicate, lower, upper, msg=None):
+        self._lower = lower
+        self._upper = upper
+        super(_DeviationAllowance, self).__init__(predicate, msg)
+
+    @abc.abstractmethod
+    def _get_values(self, deviations, expecteds):
+        """Return an array of values to compare against the bounds."""
+
+    def _get_allowed(self, differences):
+        """Return a boolean array that is True for allowed differences
+        or None if the differences can not be checked with arrays.
+        """
+        deviations = []
+        expecteds = []
+        for diff in differences:
+            if diff.__class__ is not Deviation:
+                return None  # <- EXIT!
+            deviation = _get_plain_number(diff.args[0])
+            expected = _get_plain_number(diff.args[1])
+            if deviation is None or expected is None:
+                return None  # <- EXIT!
+            deviations.append(deviation)
+            expecteds.append(expected)
+
+        deviations = _numpy.array(deviations, dtype=float)
+        expecteds = _numpy.array(expecteds, dtype=float)
+        lower = float(self._lower)
+        upper = float(self._upper)
+        with _numpy.errstate(invalid='ignore', divide='ignore'):
+            values = self._get_values(deviations, expecteds)
+            allowed = (lower <= values) & (values <= upper)
+
+            # Bounds are Decimal values, so differences within rounding
+            # distance of a bound are checked with the exact predicate.
+            uncertain = ~_numpy.isfinite(deviations) | ~_numpy.isfinite(expecteds)
+            for bound in (lower, upper):
+                tolerance = 1e-9 * max(1.0, abs(bound))
+                uncertain |= _numpy.abs(values - bound) <= tolerance
+
+        predicate = self.predicate
+        for i in _numpy.flatnonzero(uncertain):
+            i = int(i)
+            allowed[i] = bool(predicate(None, differences[i]))
+        return allowed
+
+    def apply_filterfalse(self, iterable):
+        if _numpy is None:
+            return super(_DeviationAllowance, self).apply_filterfalse(iterable)  # <- EXIT!
+
+        if isinstance(iterable, collections.Mapping):
+            return self._filter_mapping(iterable)  # <- EXIT!
+
+        if isinstance(iterable, list):
+            allowed = self._get_allowed(iterable)
+            if allowed is not None:
+                return (diff for diff, ok in zip(iterable, allowed) if not ok)  # <- EXIT!
+
+        return super(_DeviationAllowance, self).apply_filterfalse(iterable)
+
+    def _filter_mapping(self, mapping):
+        items = list(getattr(mapping, 'iteritems', mapping.items)())
+        differences = []
+        for _, diff in items:
+            if isinstance(diff, (BaseElement, Exception)):
+                differences.append(diff)
+            else:
+                differences.extend(diff)
+
+        allowed = self._get_allowed(differences)
+        if allowed is None:
+            return super(_DeviationAllowance, self).apply_filterfalse(mapping)  # <- EXIT!
+        return self._iter_not_allowed(items, allowed)
+
+    @staticmethod
+    def _iter_not_allowed(items, allowed):
+        """Yield key-difference pairs that are not allowed."""
+        position = 0
+        for key, diff in items:
+            if isinstance(diff, (BaseElement, Exception)):
+                if not allowed[position]:
+                    yield key, diff
+                position += 1
+            else:
+                remaining = []
+                for d in diff:
+                    if not allowed[position]:
+                        remaining.append(d)
+                    position += 1
+                if remaining:
+                    yield key, remaining
+
+
+class allowed_deviation(_DeviationAllowance):
     """allowed_deviation(tolerance, /, msg=None)
     allowed_deviation(lower, upper, msg=None)
 
@@ -236,7 +362,12 @@ class allowed_deviation(ElementAllowance):
             if isnan(deviation) or isnan(diff.expected or 0.0):
                 return False
             return lower <= deviation <= upper
-        super(allowed_deviation, self).__init__(tolerance, msg)
+        super(allowed_deviation, self).__init__(tolerance, lower, upper, msg)
+
+    def _get_values(self, deviations, expecteds):
+        values = deviations.copy()
+        values[_numpy.isnan(expecteds)] = _numpy.nan  # <- Never allowed.
+        return values
 
 with contextlib.suppress(AttributeError):  # inspect.Signature() is new in 3.3
     allowed_deviation.__init__.__signature__ = inspect.Signature([
@@ -246,7 +377,7 @@ with contextlib.suppress(AttributeError):  # inspect.Signature() is new in 3.3
     ])
 
 
-class allowed_percent_deviation(ElementAllowance):
+class allowed_percent_deviation(_DeviationAllowance):
     def __init__(self, lower, upper=None, msg=None):
         lower, upper, msg = _normalize_devargs(lower, upper, msg)
         def percent_tolerance(_, diff):  # <- Closes over lower & upper.
@@ -254,7 +385,12 @@ class allowed_percent_deviation(ElementAllowance):
             if isnan(percent_deviation) or isnan(diff.expected or 0):
                 return False
             return lower <= percent_deviation <= upper
-        super(allowed_percent_deviation, self).__init__(percent_tolerance, msg)
+        super(allowed_percent_deviation, self).__init__(percent_tolerance, lower, upper, msg)
+
+    def _get_values(self, deviations, expecteds):
+        nonzero = expecteds != 0
+        divisors = _numpy.where(nonzero, expecteds, 1.0)
+        return _numpy.where(nonzero, deviations / divisors, 0.0)
 
 with contextlib.suppress(AttributeError):  # inspect.Signature() is new in 3.3
     allowed_percent_deviation.__init__.__signature__ = inspect.Signature([
@@ -286,13 +422,32 @@ class allowed_specific(BaseAllowance):
 
         if isinstance(allowed, BaseDifference):
             allowed = [allowed]
-        else:
-            allowed = list(allowed)  # Make list or copy existing list.
+
+        # Count allowed differences by hash so that each observed
+        # difference is matched in constant time. Each allowed
+        # difference can only be matched once. Differences that can
+        # not be hashed are kept in a list and matched by equality.
+        allowed_counts = {}
+        allowed_unhashable = []
+        for diff in allowed:
+            try:
+                allowed_counts[diff] = allowed_counts.get(diff, 0) + 1
+            except TypeError:
+                allowed_unhashable.append(diff)
 
         for key, difference in iterable:
             try:
-                allowed.remove(difference)
-            except ValueError:
+                count = allowed_counts.get(difference, 0)
+            except TypeError:
+                try:
+                    allowed_unhashable.remove(difference)
+                except ValueError:
+                    yield key, difference
+                continue
+
+            if count:
+                allowed_counts[difference] = count - 1
+            else:
                 yield key, difference
 
     def apply_filterfalse(self, iterable):
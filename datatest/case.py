@@ -1,6 +1,8 @@
 # -*- coding: utf-8 -*-
 from __future__ import division
 import inspect
+import sys
+import weakref
 from unittest import TestCase
 
 from .utils.builtins import *
@@ -11,6 +13,7 @@ from .dataaccess import DataQuery
 from .dataaccess import DataResult
 
 from .require import _get_difference_info
+from .require import _regex_type
 from .errors import ValidationError
 
 __datatest = True  # Used to detect in-module stack frames (which are
@@ -27,6 +30,62 @@ from .allow import allowed_args
 from .allow import allowed_limit
 
 
+# Data sources registered with register_sources(), keyed by module name.
+_registered_sources = {}
+
+
+def register_sources(subject=None, reference=None, module=None):
+    """Register the *subject* and *reference* data for all test cases
+    defined in *module* (a module object or name). If *module* is
+    omitted, the sources are registered for the calling module::
+
+        def setUpModule():
+            subject = datatest.DataSource.from_csv('myfile.csv')
+            datatest.register_sources(subject=subject)
+
+    Registered sources are used by the :attr:`DataTestCase.subject`
+    and :attr:`DataTestCase.reference` properties in place of
+    module-level globals. Arguments that are None are left unchanged.
+
+    Sources stay registered (and their database connections stay
+    open) until :func:`unregister_sources` is called, so modules
+    that register sources should release them when finished::
+
+        def tearDownModule():
+            datatest.unregister_sources()
+    """
+    if module is None:
+        module = sys._getframe(1).f_globals['__name__']
+    elif hasattr(module, '__name__'):
+        module = module.__name__  # <- Get name of module object.
+
+    sources = _registered_sources.setdefault(module, {})
+    if subject is not None:
+        sources['subject'] = subject
+    if reference is not None:
+        sources['reference'] = reference
+
+
+def unregister_sources(module=None):
+    """Remove the data sources registered for *module* (a module
+    object or name) with :func:`register_sources`. If *module* is
+    omitted, sources are removed for the calling module. Removing
+    the registry's references allows the sources (and their database
+    connections) to be garbage collected.
+    """
+    if module is None:
+        module = sys._getframe(1).f_globals['__name__']
+    elif hasattr(module, '__name__'):
+        module = module.__name__  # <- Get name of module object.
+
+    _registered_sources.pop(module, None)
+
+
+# Namespaces where data sources were last found, keyed by test class
+# (values are dictionaries of namespaces keyed by source name).
+_namespace_cache = weakref.WeakKeyDictionary()
+
+
 class DataTestCase(TestCase):
     """This class extends :py:class:`unittest.TestCase` with methods
     for asserting data validity. In addition to the new functionality,
@@ -34,6 +93,8 @@ class DataTestCase(TestCase):
     available.
     """
     maxDiff = 80 * 8  # TestCase.maxDiff not defined in 3.1 or 2.6.
+    maxDifferences = None  # Limit differences found by assertValid().
+    lazyDifferences = False  # Read differences only as needed.
 
     @property
     def subject(self):
@@ -99,19 +160,36 @@ class DataTestCase(TestCase):
     def reference(self, value):
         self._reference_data = value
 
-    @staticmethod
-    def _find_data_source(name):
+    def _find_data_source(self, name):
+        """Return the data source *name* for this test case. Sources
+        given to register_sources() are checked first, then the global
+        namespaces of calling frames are searched (nearest first). The
+        namespace where a source is found is cached per test class so
+        later lookups do not need to walk the stack.
+        """
         # TODO: Make this method play nice with getattr() when
         # attribute is missing.
-        stack = inspect.stack()
-        stack.pop()  # Skip record of current frame.
-        for record in stack:   # Bubble-up stack looking for name.
-            frame = record[0]
+        cls = self.__class__
+        registered = _registered_sources.get(cls.__module__)
+        if registered and name in registered:
+            return registered[name]  # <- EXIT!
+
+        namespaces = _namespace_cache.get(cls)
+        if namespaces is not None:
+            namespace = namespaces.get(name)
+            if namespace is not None and name in namespace:
+                return namespace[name]  # <- EXIT!
+
+        frame = sys._getframe(1)
+        while frame:  # Bubble-up stack looking for name.
             if name in frame.f_globals:
-                return frame.f_globals[name]  # <- EXIT!
+                namespace = frame.f_globals
+                _namespace_cache.setdefault(cls, {})[name] = namespace
+                return namespace[name]  # <- EXIT!
+            frame = frame.f_back
         raise NameError('cannot find {0!r}'.format(name))
 
-    def assertValid(self, data, requirement, msg=None):
+    def assertValid(self, data, requirement, msg=None, max_differences=None):
         """Fail if the *data* under test does not satisfy the
         *requirement*.
 
@@ -183,23 +261,39 @@ class DataTestCase(TestCase):
                 data = ...
                 requirement = 'FOO'
                 self.assertValid(data, requirement)
+
+        **Limiting differences:** When *max_differences* is given (or
+        when the :attr:`maxDifferences` attribute is set), validation
+        stops once more than this number of differences are found. The
+        remaining data is not consumed and the :class:`ValidationError`
+        contains a sample of the differences::
+
+            def test_mydata(self):
+                data = ...
+                requirement = 'FOO'
+                self.assertValid(data, requirement, max_differences=100)
         """
-        # If data is a DataQuery, lazily evaluate it.
-        if isinstance(data, DataQuery):
-            data = data()
+        if max_differences is None:
+            max_differences = self.maxDifferences
 
         # If requirement is DataQuery or DataResult, eagerly evaluate it.
         if isinstance(requirement, (DataQuery, DataResult)):
             requirement = requirement.fetch()
 
-        diff_info = _get_difference_info(data, requirement)
+        # If data is a DataQuery, lazily evaluate it (set and regex
+        # requirements are checked inside the data source when possible).
+        if (isinstance(data, DataQuery)
+                and not isinstance(requirement, (collections.Set, _regex_type))):
+            data = data()
+
+        diff_info = _get_difference_info(data, requirement, max_differences)
         if diff_info:
             default_msg, differences = diff_info  # Unpack values.
             self.fail(msg or default_msg, differences)
 
     def fail(self, msg, differences=None):
         if differences:
-            err = ValidationError(msg, differences)
+            err = ValidationError(msg, differences, lazy=self.lazyDifferences)
             err.maxDiff = self.maxDiff  # <- Propagate maxDiff to error object.
             raise err
         else:
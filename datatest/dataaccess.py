@@ -2,8 +2,15 @@
 from __future__ import absolute_import
 import inspect
 import os
+import sqlite3
 import sys
+import threading
+import time
+import weakref
 from io import IOBase
+from math import isinf
+from math import isnan
+from numbers import Integral
 from numbers import Number
 from sqlite3 import Binary
 
@@ -20,8 +27,17 @@ from .utils.misc import _is_sortable
 from .utils.misc import _make_token
 from .utils.misc import _unique_everseen
 from .utils.misc import string_types
+from .expression import Expression
+from .expression import _ColumnExpression
+from .expression import _REGEX_FUNCTION
 from .load.sqltemp import TemporarySqliteTable
 from .load.sqltemp import _from_csv
+from .load.sqltemp import _get_dtypes_key
+from .load.sqltemp import _load_with_cache
+from .load.sqltemp import _new_connection
+from .load.sqltemp import _save_table
+from .load.sqltemp import _TemporaryDatabaseFile
+from .load.sqltemp import _TransactionSyncOff
 
 
 class working_directory(contextlib.ContextDecorator):
@@ -338,6 +354,8 @@ def _sqlite_cast_as_real(value):
         https://www.sqlite.org/lang_expr.html#castexpr
     """
     # TODO: Implement behavioral parity with SQLite and add tests.
+    if isinstance(value, float):
+        return value  # <- EXIT! Already a REAL value.
     try:
         return float(value)
     except ValueError:
@@ -350,12 +368,25 @@ def _sqlite_sum(iterable):
     """
     if isinstance(iterable, BaseElement):
         iterable = [iterable]
-    iterable = (_sqlite_cast_as_real(x) for x in iterable if x != None)
+    iterable = (x for x in iterable if x != None)
     try:
-        start_value = next(iterable)
+        total = next(iterable)
     except StopIteration:  # From SQLite docs: "If there are no non-NULL
         return None        # input rows then sum() returns NULL..."
-    return sum(iterable, start_value)
+
+    # From SQLite docs: "If any input to sum() is neither an integer
+    # nor a NULL then sum() returns a floating point value..."
+    if isinstance(total, Integral):
+        for value in iterable:
+            if not isinstance(value, Integral):
+                total = float(total) + _sqlite_cast_as_real(value)
+                break
+            total += value
+        else:
+            return total  # <- EXIT! All integers.
+    else:
+        total = _sqlite_cast_as_real(total)
+    return sum((_sqlite_cast_as_real(x) for x in iterable), total)
 
 
 def _sqlite_count(iterable):
@@ -542,6 +573,251 @@ RESULT_TOKEN = _make_token(
 )
 
 
+_sqlite_aggregate_functions = {
+    _sqlite_sum: 'SUM',
+    _sqlite_count: 'COUNT',
+    _sqlite_avg: 'AVG',
+    _sqlite_min: 'MIN',
+    _sqlite_max: 'MAX',
+}
+
+
+def _get_value_field(select):
+    """Return the field (a string or _ColumnExpression) selected as
+    the value of *select* or None if more than one field is selected.
+    """
+    _, value = _parse_select(select)
+    inner = next(iter(value))
+    if isinstance(inner, (string_types, _ColumnExpression)):
+        return inner
+    return None
+
+
+def _make_distinct_select(select):
+    """Return a copy of *select* that uses a set for its value
+    container or None if the value selects more than one field.
+    """
+    field = _get_value_field(select)
+    if field is None:
+        return None  # <- EXIT!
+    if isinstance(select, collections.Mapping):
+        key, _ = _parse_select(select)
+        return {key: set([field])}
+    return set([field])
+
+
+def _optimize_distinct(method, args, kwds, step):
+    """Fold a distinct step into a _select or _select_distinct
+    call (a repeated distinct step is redundant).
+    """
+    if step != (_sqlite_distinct, (RESULT_TOKEN,), {}):
+        return None  # <- EXIT!
+
+    if method in ('_select', '_select_distinct'):
+        return '_select_distinct', args, kwds
+    return None
+
+
+def _optimize_aggregate(method, args, kwds, step):
+    """Fold an aggregate step into a _select_aggregate call. When
+    the preceding step selects distinct values from a single field,
+    the aggregate is applied to distinct values (e.g., "COUNT(DISTINCT
+    ...)").
+    """
+    function, step_args, step_kwds = step
+    if function != _apply_to_data or step_kwds:
+        return None  # <- EXIT!
+
+    sqlfunc = _sqlite_aggregate_functions.get(step_args[0], None)
+    if not sqlfunc:
+        return None  # <- EXIT!
+
+    if method == '_select':
+        return '_select_aggregate', (sqlfunc,) + args, kwds
+
+    if method == '_select_distinct':
+        distinct_select = _make_distinct_select(args[0])
+        if distinct_select is not None:
+            return '_select_aggregate', (sqlfunc, distinct_select), kwds
+    return None
+
+
+def _optimize_filter(method, args, kwds, step):
+    """Translate a filter step that uses an Expression into a WHERE
+    condition on the selected field.
+    """
+    function, step_args, step_kwds = step
+    if function != _filter_data or method not in ('_select', '_select_distinct'):
+        return None  # <- EXIT!
+
+    expression = step_args[0]
+    if (not isinstance(expression, Expression)
+            or expression._sql is None
+            or not expression._predicate):
+        return None  # <- EXIT!
+
+    select = args[0]
+    if isinstance(select, collections.Mapping):
+        return None  # <- EXIT! Filtering in SQL would remove empty groups.
+
+    field = _get_value_field(select)
+    if field is None:
+        return None  # <- EXIT!
+
+    if isinstance(field, _ColumnExpression):  # Field was mapped in SQL.
+        expression = expression._compose(field.expression)
+        field = field.field
+
+    if field in kwds:
+        if not isinstance(kwds[field], Expression):
+            return None  # <- EXIT! Keep user's where-condition as-is.
+        expression = kwds[field] & expression
+
+    kwds = dict(kwds)
+    kwds[field] = expression
+    return method, args, kwds
+
+
+def _optimize_map(method, args, kwds, step):
+    """Translate a map step that uses an Expression into an SQL
+    expression for the selected field.
+    """
+    function, step_args, step_kwds = step
+    if function != _map_data or method != '_select':
+        return None  # <- EXIT!
+
+    # Predicates are not translated because SQLite returns 1 and 0
+    # rather than True and False.
+    expression = step_args[0]
+    if (not isinstance(expression, Expression)
+            or expression._sql is None
+            or expression._predicate):
+        return None  # <- EXIT!
+
+    select = args[0]
+    key, value = _parse_select(select)
+    if isinstance(value, collections.Set):
+        return None  # <- EXIT! Mapped values would be made distinct.
+
+    field = _get_value_field(select)
+    if field is None:
+        return None  # <- EXIT!
+
+    if isinstance(field, _ColumnExpression):  # Field was mapped in SQL.
+        expression = expression._compose(field.expression)
+        field = field.field
+
+    value = value.__class__([_ColumnExpression(field, expression)])
+    if isinstance(select, collections.Mapping):
+        select = select.__class__([(key, value)])
+    else:
+        select = value
+    return method, (select,), kwds
+
+
+# Rules are tried in order for each step following the data selection.
+# Each rule accepts the name of the current DataSource method, its args
+# and kwds, and the next execution step. If the step can be folded into
+# the SQL query, a rule returns a new method name, args, and kwds--if
+# not, it returns None.
+_optimization_rules = (
+    _optimize_distinct,
+    _optimize_aggregate,
+    _optimize_filter,
+    _optimize_map,
+)
+
+
+_CacheInfo = collections.namedtuple('CacheInfo', ['hits', 'misses', 'maxsize', 'currsize'])
+
+
+class _CacheCounts(object):
+    """Hit and miss counts for all of a data source's result caches.
+    The totals are kept by the source so they are not lost when the
+    cache of a thread's connection is released.
+    """
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def add(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+
+class _ResultCache(object):
+    """A least-recently-used cache of query results for a single
+    connection. Results are lists of rows keyed by SQL statement and
+    parameters. The cache is cleared whenever *changes* (a value that
+    identifies the state of the connection's database, see
+    DataSource._get_changes()) differs from the value recorded when
+    results were stored. Hits and misses are also added to the
+    shared *counts* (a _CacheCounts instance).
+    """
+    def __init__(self, maxsize, counts):
+        self.maxsize = maxsize
+        self.counts = counts
+        self.hits = 0
+        self.misses = 0
+        self.changes = None
+        self._data = {}     # Maps key to (last_used, rows).
+        self._counter = 0
+        self._lock = threading.Lock()
+
+    def validate(self, changes):
+        """Clear cached results if *changes* does not match."""
+        with self._lock:
+            if changes != self.changes:
+                self._data.clear()
+                self.changes = changes
+
+    def get(self, key):
+        """Return cached rows for *key* or None if not cached."""
+        with self._lock:
+            item = self._data.get(key)
+            if item is None:
+                self.misses += 1
+                self.counts.add(hit=False)
+                return None  # <- EXIT!
+            self.hits += 1
+            self.counts.add(hit=True)
+            self._counter += 1
+            rows = item[1]
+            self._data[key] = (self._counter, rows)
+            return rows
+
+    def put(self, key, rows):
+        """Store *rows* and evict the least-recently-used result if
+        the cache is full.
+        """
+        with self._lock:
+            if key not in self._data and len(self._data) >= self.maxsize:
+                oldest = min(self._data, key=lambda k: self._data[k][0])
+                del self._data[oldest]
+            self._counter += 1
+            self._data[key] = (self._counter, rows)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def accept_changes(self, old, new):
+        """Keep cached results valid after changes that did not touch
+        the source's data (like writing to a temporary table). If the
+        cache was valid at *old*, it is marked as valid at *new*.
+        """
+        with self._lock:
+            if self.changes == old:
+                self.changes = new
+
+    def info(self):
+        return _CacheInfo(self.hits, self.misses, self.maxsize, len(self._data))
+
+
 ########################################################
 # Main data handling classes (DataQuery and DataSource).
 ########################################################
@@ -637,6 +913,11 @@ class DataQuery(object):
         """Apply *function* to each element, keeping the results.
         If the group of data is a set type, it will be converted
         to a list (as the results may not be distinct or hashable).
+
+        When querying a DataSource, :data:`element` expressions can
+        be evaluated by SQLite itself::
+
+            source('A').map(element.strip().upper())
         """
         return self._add_step('map', function)
 
@@ -644,6 +925,11 @@ class DataQuery(object):
         """Filter elements, keeping only those values for which
         *function* returns True. If *function* is None, this method
         keeps all elements for which :py:class:`bool` returns True.
+
+        When querying a DataSource, :data:`element` expressions can
+        be evaluated by SQLite itself::
+
+            source('A').filter(element > 100)
         """
         return self._add_step('filter', function)
 
@@ -749,47 +1035,107 @@ class DataQuery(object):
 
     @staticmethod
     def _optimize(execution_plan):
-        try:
-            step_0 = execution_plan[0]
-            step_1 = execution_plan[1]
-            step_2 = execution_plan[2]
-            remaining_steps = execution_plan[3:]
-        except IndexError:
+        """Return an optimized version of *execution_plan* or None if
+        no optimization can be made.
+
+        Starting with the steps that select data from the source, each
+        following step is folded into the SQL query for as long as an
+        optimization rule can translate it. The first step that cannot
+        be translated (and all steps after it) are left to run in
+        Python.
+        """
+        if len(execution_plan) < 3:
             return None  # <- EXIT!
 
-        if step_0 != (getattr, (RESULT_TOKEN, '_select'), {}):
+        if execution_plan[0] != (getattr, (RESULT_TOKEN, '_select'), {}):
             return None  # <- EXIT!
 
-        if step_2[0] == _apply_to_data:
-            func_dict = {
-                _sqlite_sum: 'SUM',
-                _sqlite_count: 'COUNT',
-                _sqlite_avg: 'AVG',
-                _sqlite_min: 'MIN',
-                _sqlite_max: 'MAX',
-            }
-            py_function = step_2[1][0]
-            sqlite_function = func_dict.get(py_function, None)
-            if sqlite_function:
-                func_1, args_1, kwds_1 = step_1
-                args_1 = (sqlite_function,) + args_1  # <- Add SQL function
-                optimized_steps = (                   #    as 1st arg.
-                    (getattr, (RESULT_TOKEN, '_select_aggregate'), {}),
-                    (func_1, args_1, kwds_1),
-                )
+        method = '_select'
+        func_1, args_1, kwds_1 = execution_plan[1]
+        remaining_steps = execution_plan[2:]
+        folded_count = 0
+        while remaining_steps:
+            for rule in _optimization_rules:
+                folded = rule(method, args_1, kwds_1, remaining_steps[0])
+                if folded:
+                    break
             else:
-                optimized_steps = ()
-        elif step_2 == (_sqlite_distinct, (RESULT_TOKEN,), {}):
-            optimized_steps = (
-                (getattr, (RESULT_TOKEN, '_select_distinct'), {}),
-                step_1,
-            )
-        else:
-            optimized_steps = ()
+                break  # <- No rule could translate the step.
+            method, args_1, kwds_1 = folded
+            remaining_steps = remaining_steps[1:]
+            folded_count += 1
 
-        if optimized_steps:
-            return optimized_steps + remaining_steps
-        return None
+        if not folded_count:
+            return None  # <- EXIT! No steps were folded.
+
+        optimized_steps = (
+            (getattr, (RESULT_TOKEN, method), {}),
+            (func_1, args_1, kwds_1),
+        )
+        return optimized_steps + tuple(remaining_steps)
+
+    def _get_field_selection(self):
+        """Return a three-tuple of (*field*, *distinct*, *where*) if the
+        query can be run entirely in SQL and selects a single field
+        from a DataSource (without grouping). Otherwise, return None.
+        """
+        source = self._data_source
+        if not isinstance(source, DataSource):
+            return None  # <- EXIT!
+
+        execution_plan = self._get_execution_plan(source, self._query_steps)
+        execution_plan = self._optimize(execution_plan) or execution_plan
+        if len(execution_plan) != 2:
+            return None  # <- EXIT! Remaining steps must run in Python.
+
+        _, (_, method), _ = execution_plan[0]
+        _, args, kwds = execution_plan[1]
+        if method not in ('_select', '_select_distinct'):
+            return None  # <- EXIT!
+
+        select = args[0]
+        if isinstance(select, collections.Mapping):
+            return None  # <- EXIT!
+
+        field = _get_value_field(select)
+        if field is None:
+            return None  # <- EXIT!
+
+        distinct = (method == '_select_distinct'
+                    or isinstance(select, collections.Set))
+        return field, distinct, kwds
+
+    def _compare_set(self, requirement_set):
+        """Compare the values selected by the query against the given
+        *requirement_set* inside the data source's database. Returns
+        a two-tuple of distinct *matching* and *extra* values or None
+        if the comparison can not be made in SQL (the query does not
+        select a single field from a DataSource, it has steps that
+        must run in Python, or the requirement contains values that
+        SQLite can not compare like Python does).
+        """
+        selection = self._get_field_selection()
+        if selection is None:
+            return None  # <- EXIT!
+        field, _, kwds = selection
+        return self._data_source._compare_set(field, requirement_set, **kwds)
+
+    def _find_regex_mismatches(self, regex):
+        """Return an iterator of the selected values that do not
+        contain a match for the compiled *regex*. The search is made
+        inside the data source's database. Returns None if the query
+        can not be run in SQL or if *regex* does not use a text
+        pattern.
+        """
+        if not isinstance(regex.pattern, string_types):
+            return None  # <- EXIT! Bytes patterns are not supported.
+
+        selection = self._get_field_selection()
+        if selection is None:
+            return None  # <- EXIT!
+        field, distinct, kwds = selection
+        return self._data_source._select_regex_mismatches(
+            field, regex, distinct, **kwds)
 
     def fetch(self):
         """Executes query and returns an eagerly evaluated result."""
@@ -949,20 +1295,61 @@ class DataSource(object):
             {'A': 'z', 'B': 300},
         ]
         source = datatest.DataSource(data)
+
+    Each source loads its data into a separate, temporary SQLite
+    database. The database is removed when the source is garbage
+    collected. A source can be used from threads other than the one
+    that created it but not from multiple threads at the same time
+    (unless :meth:`enable_concurrent_reads` is called).
+
+    By default, values are stored as given. The optional *dtypes*
+    argument can be a dictionary of field names and types (int,
+    float, or str) or the string ``'infer'`` to detect numeric
+    fields from the first 1000 rows of data (if a later value cannot
+    be stored as a number without loss, its field is changed to
+    text). Typed fields store numbers natively which makes
+    aggregation and sorting faster::
+
+        source = datatest.DataSource(data, dtypes={'B': int})
+
+    Numeric text in typed fields is converted to numbers when
+    loaded, so queries return :py:class:`int` or :py:class:`float`
+    values rather than strings.
     """
-    def __init__(self, data, fieldnames=None):
+    #: When True, indexes are created automatically for columns that
+    #: are frequently used to filter, group, or sort queries (see
+    #: :meth:`suggest_indexes`). Indexes are only created for sources
+    #: with 1000 or more rows once a column combination has been used
+    #: by three queries.
+    auto_index = False
+    _auto_index_min_uses = 3
+    _auto_index_min_rows = 1000
+
+    #: The number of query results to keep in a least-recently-used
+    #: cache (0 disables caching). When enabled, repeated queries
+    #: return stored rows instead of querying the database again.
+    #: Cached results are discarded if the data changes::
+    #:
+    #:     source.result_cache_size = 128
+    result_cache_size = 0
+
+    def __init__(self, data, fieldnames=None, dtypes=None):
         """Initialize self."""
-        temptable = TemporarySqliteTable(data, fieldnames)
+        temptable = TemporarySqliteTable(data, fieldnames, _new_connection(), dtypes)
         self._connection = temptable.connection
         self._table = temptable.name
 
-        repr_string = '{0}(<{1} of records>, fieldnames={2})'
-        self._repr_string = repr_string.format(self.__class__.__name__,
-                                               data.__class__.__name__,
-                                               repr(self.fieldnames))
+        repr_string = '{0}(<{1} of records>, fieldnames={2}{3})'
+        self._repr_string = repr_string.format(
+            self.__class__.__name__,
+            data.__class__.__name__,
+            repr(self.fieldnames),
+            ', dtypes={0!r}'.format(dtypes) if dtypes else '',
+        )
 
     @classmethod
-    def from_csv(cls, file, encoding=None, **fmtparams):
+    def from_csv(cls, file, encoding=None, dtypes=None, cache_dir=None,
+                 processes=None, **fmtparams):
         """Create a DataSource from a CSV *file* (a path or file-like
         object)::
 
@@ -973,19 +1360,43 @@ class DataSource(object):
 
             files = ['mydata1.csv', 'mydata2.csv']
             source = datatest.DataSource.from_csv(files)
+
+        CSV values are loaded as text unless *dtypes* is given (see
+        :class:`DataSource` for details)::
+
+            source = datatest.DataSource.from_csv('mydata.csv', dtypes='infer')
+
+        Loading large files can take some time. If a *cache_dir* is
+        given, the loaded data is saved in that directory and reused
+        by later calls (even from other processes) for as long as the
+        files are unchanged. A file is considered unchanged when its
+        path, size, and modification time are the same. Caching only
+        applies when files are given by path::
+
+            source = datatest.DataSource.from_csv('mydata.csv', cache_dir='.datacache')
+
+        When loading many files, *processes* can be given to read them
+        in parallel using a pool of worker processes. The data is the
+        same as when files are read one after another (parallel reading
+        also requires that files are given by path)::
+
+            files = glob.glob('partitions/*.csv')
+            source = datatest.DataSource.from_csv(files, processes=4)
         """
         if isinstance(file, string_types) or isinstance(file, IOBase):
             file = [file]
 
         new_cls = cls.__new__(cls)
-        temptable = _from_csv(file, encoding, **fmtparams)
+        temptable = _from_csv(file, encoding, dtypes, cache_dir, processes,
+                              _new_connection(), **fmtparams)
         new_cls._connection = temptable.connection
         new_cls._table = temptable.name
 
-        repr_string = '{0}.from_csv({1}{2}{3})'.format(
+        repr_string = '{0}.from_csv({1}{2}{3}{4})'.format(
             new_cls.__class__.__name__,
             repr(file[0]) if len(file) == 1 else repr(file),
             ', {0!r}'.format(encoding) if encoding else '',
+            ', dtypes={0!r}'.format(dtypes) if dtypes else '',
             ', **{0!r}'.format(fmtparams) if fmtparams else '',
         )
         new_cls._repr_string = repr_string
@@ -993,7 +1404,7 @@ class DataSource(object):
         return new_cls
 
     @classmethod
-    def from_excel(cls, path, worksheet=0):
+    def from_excel(cls, path, worksheet=0, dtypes=None, cache_dir=None):
         """Create a DataSource from an Excel worksheet. The *path*
         must specify to an XLSX or XLS file and the *worksheet* must
         specify the index or name of the worksheet to load (defaults
@@ -1008,6 +1419,9 @@ class DataSource(object):
         index (an integer)::
 
             source = datatest.DataSource.from_excel('mydata.xlsx', 'Sheet 2')
+
+        Field types can be given with *dtypes* and loaded data can be
+        cached in *cache_dir* (see :meth:`from_csv` for details).
         """
         try:
             import xlrd
@@ -1019,27 +1433,134 @@ class DataSource(object):
                 "third-party library 'xlrd'."
             )
 
-        book = xlrd.open_workbook(path, on_demand=True)
-        try:
-            if isinstance(worksheet, int):
-                sheet = book.sheet_by_index(worksheet)
-            else:
-                sheet = book.sheet_by_name(worksheet)
-            data = (sheet.row(i) for i in range(sheet.nrows))  # Build *data*
-            data = ([x.value for x in row] for row in data)    # and *fields*
-            fieldnames = next(data)                            # from rows.
-            new_instance = cls(data, fieldnames)  # <- Create instance.
-        finally:
-            book.release_resources()
+        connection = _new_connection()
 
+        def load():
+            book = xlrd.open_workbook(path, on_demand=True)
+            try:
+                if isinstance(worksheet, int):
+                    sheet = book.sheet_by_index(worksheet)
+                else:
+                    sheet = book.sheet_by_name(worksheet)
+                data = (sheet.row(i) for i in range(sheet.nrows))  # Build *data*
+                data = ([x.value for x in row] for row in data)    # and *fields*
+                fieldnames = next(data)                            # from rows.
+                return TemporarySqliteTable(data, fieldnames, connection, dtypes)
+            finally:
+                book.release_resources()
+
+        if cache_dir:
+            options = ('excel', worksheet, _get_dtypes_key(dtypes))
+            temptable = _load_with_cache(cache_dir, [path], options, load,
+                                         connection=connection)
+        else:
+            temptable = load()
+
+        new_instance = cls.__new__(cls)
+        new_instance._connection = temptable.connection
+        new_instance._table = temptable.name
+        new_instance._repr_string = '{0}.from_excel({1!r}{2}{3})'.format(
+            cls.__name__,
+            path,
+            ', {0!r}'.format(worksheet) if worksheet else '',
+            ', dtypes={0!r}'.format(dtypes) if dtypes else '',
+        )
         return new_instance
 
     @property
     def fieldnames(self):
         """A tuple of field names used by the data source."""
-        cursor = self._connection.cursor()
-        cursor.execute('PRAGMA table_info(' + self._table + ')')
-        return tuple(x[1] for x in cursor)
+        return self._get_metadata('fieldnames')
+
+    @property
+    def _connection(self):
+        """The database connection for the current thread."""
+        local = self.__dict__.get('_thread_local')
+        if local is None:
+            return self.__dict__['_primary_connection']  # <- EXIT!
+
+        connection = getattr(local, 'connection', None)
+        if connection is None:
+            connection = _new_connection(self._database_path)
+            local.connection = connection
+        return connection
+
+    @_connection.setter
+    def _connection(self, value):
+        self.__dict__['_primary_connection'] = value
+
+    def enable_concurrent_reads(self, path=None):
+        """Allow the source to be queried from many threads at once.
+
+        The source's data is copied into a database file and each
+        thread that queries the source gets its own connection to
+        this file. Since SQLite runs without holding Python's global
+        interpreter lock, queries in different threads can run in
+        parallel::
+
+            source.enable_concurrent_reads()
+            with ThreadPoolExecutor(max_workers=4) as executor:
+                results = executor.map(lambda q: q.fetch(), queries)
+
+        If *path* is omitted, the file is created in a temporary
+        directory that is removed when the source is garbage
+        collected. Indexes are re-created in the new database.
+        """
+        if self.__dict__.get('_thread_local') is not None:
+            return  # <- EXIT! Already enabled.
+
+        index_columns = self._get_metadata('index_columns')
+        if path is None:
+            self._database_file = _TemporaryDatabaseFile()
+            path = self._database_file.path
+        _save_table(self._connection, self._table, path)
+
+        self._database_path = path
+        self._primary_connection = None  # Release in-memory table.
+        self._thread_local = threading.local()
+        self._table = 'data'
+        self._clear_metadata()
+        for columns in index_columns:
+            self.create_index(*columns)
+
+    def _get_metadata(self, name):
+        """Return cached metadata for the source's table. The *name*
+        can be 'fieldnames', 'fieldset', 'dtypes', 'row_count',
+        'indexes', or 'index_columns'. Metadata is loaded from the database the first time
+        it's used and kept until _clear_metadata() is called.
+        """
+        cache = self.__dict__.setdefault('_metadata', {})
+        if name not in cache:
+            cursor = self._connection.cursor()
+            if name in ('fieldnames', 'fieldset', 'dtypes'):
+                cursor.execute('PRAGMA table_info(' + self._table + ')')
+                table_info = cursor.fetchall()
+                fieldnames = tuple(x[1] for x in table_info)
+                cache['fieldnames'] = fieldnames
+                cache['fieldset'] = frozenset(fieldnames)
+                cache['dtypes'] = dict((x[1], x[2]) for x in table_info if x[2])
+            elif name == 'row_count':
+                cursor.execute('SELECT COUNT(*) FROM ' + self._table)
+                cache['row_count'] = cursor.fetchone()[0]
+            elif name in ('indexes', 'index_columns'):
+                cursor.execute('PRAGMA index_list(' + self._table + ')')
+                indexes = tuple(x[1] for x in cursor.fetchall())
+                index_columns = []
+                for index in indexes:
+                    cursor.execute('PRAGMA index_info(' + index + ')')
+                    index_columns.append(tuple(x[2] for x in cursor))
+                cache['indexes'] = indexes
+                cache['index_columns'] = tuple(index_columns)
+            else:
+                raise ValueError('unknown metadata name: {0!r}'.format(name))
+        return cache[name]
+
+    def _clear_metadata(self):
+        """Clear cached metadata and query results. This must be
+        called after any operation that changes the source's table.
+        """
+        self.__dict__.pop('_metadata', None)
+        self.clear_result_cache()
 
     def __repr__(self):
         """Return a string representation of the data source."""
@@ -1049,13 +1570,61 @@ class DataSource(object):
         return super(DataSource, self).__repr__()
 
     def __iter__(self):
-        """Return iterable of dictionary rows (like csv.DictReader)."""
+        """Return iterable of dictionary rows (like csv.DictReader).
+        Rows are fetched from the database in batches as they are
+        needed (see :meth:`iter_rows`).
+        """
+        return self.iter_rows()
+
+    def iter_rows(self, row_type=dict, batch_size=None):
+        """Return an iterator of rows from the data source. Rows are
+        fetched from the database in batches of *batch_size* rows
+        (defaults to 1000) so memory use stays the same regardless
+        of the number of rows::
+
+            for row in source.iter_rows():
+                ...
+
+        By default, rows are dictionaries. The *row_type* can also be
+        :py:class:`tuple` (the fastest option), a :py:func:`namedtuple
+        <collections.namedtuple>` class with one field per fieldname,
+        or the string ``'namedtuple'`` to create a namedtuple class
+        from the source's fieldnames::
+
+            for row in source.iter_rows('namedtuple'):
+                ...
+        """
+        fieldnames = self.fieldnames
+        if row_type is dict:
+            make_row = lambda x: dict(zip(fieldnames, x))
+        elif row_type is tuple:
+            make_row = None
+        elif row_type == 'namedtuple':
+            make_row = collections.namedtuple('Row', fieldnames, rename=True)._make
+        elif isinstance(row_type, type) and issubclass(row_type, tuple) \
+                and hasattr(row_type, '_fields'):
+            make_row = row_type._make
+        else:
+            msg = "row_type must be dict, tuple, namedtuple class or 'namedtuple', got {0!r}"
+            raise TypeError(msg.format(row_type))
+
         cursor = self._connection.cursor()
         cursor.execute('SELECT * FROM ' + self._table)
+        return self._fetch_batches(cursor, make_row, batch_size or 1000)
 
-        fieldnames = self.fieldnames
-        dict_row = lambda x: dict(zip(fieldnames, x))
-        return (dict_row(row) for row in cursor.fetchall())
+    @staticmethod
+    def _fetch_batches(cursor, make_row, batch_size):
+        """Generate rows from *cursor* by fetching *batch_size* rows
+        at a time. If *make_row* is given, it's applied to each row.
+        """
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                return  # <- EXIT!
+            if make_row:
+                rows = [make_row(row) for row in rows]
+            for row in rows:
+                yield row
 
     def __call__(self, select, **where):
         """Calling a DataSource like a function returns a DataQuery
@@ -1070,21 +1639,173 @@ class DataSource(object):
         """
         return DataQuery.from_object(self, select, **where)
 
+    def _execute_and_record(self, key, select_clause, trailing_clause=None, **where):
+        """Execute query and record the columns it could use as an
+        index (see suggest_indexes()). When auto_index is enabled,
+        frequently used columns are indexed before running the query.
+        """
+        columns = self._get_index_candidate(key, where)
+        if not columns:
+            return self._execute_query(select_clause, trailing_clause, **where)  # <- EXIT!
+
+        stats = self.__dict__.setdefault('_query_stats', {})
+        uses, seconds = stats.get(columns, (0, 0.0))
+        uses += 1
+        stats[columns] = (uses, seconds)
+
+        if (self.auto_index
+                and uses >= self._auto_index_min_uses
+                and not self._is_indexed(columns)
+                and self._get_metadata('row_count') >= self._auto_index_min_rows):
+            self.create_index(*columns)
+
+        start = time.time()
+        cursor = self._execute_query(select_clause, trailing_clause, **where)
+        stats[columns] = (uses, seconds + (time.time() - start))
+        return cursor
+
+    @staticmethod
+    def _get_index_candidate(key, where):
+        """Return a tuple of columns that an index could use to speed
+        up a query: columns with equality (or IN) conditions followed
+        by the GROUP BY or ORDER BY columns from *key*.
+        """
+        where_columns = sorted(k for k, v in where.items()
+                               if not isinstance(v, Expression))
+        if not key:
+            key_columns = ()
+        elif isinstance(key, string_types):
+            key_columns = (key,)
+        else:
+            key_columns = tuple(key)
+        key_columns = tuple(x for x in key_columns if x not in where_columns)
+        return tuple(where_columns) + key_columns
+
+    def _is_indexed(self, columns):
+        """Return True if an existing index starts with *columns*."""
+        width = len(columns)
+        for index_columns in self._get_metadata('index_columns'):
+            if index_columns[:width] == columns:
+                return True
+        return False
+
+    def suggest_indexes(self):
+        """Return a list of suggested indexes based on the queries
+        that have been run against this source. Each suggestion is a
+        tuple of ``(columns, uses, seconds)`` where *columns* can be
+        passed to :meth:`create_index`, *uses* is the number of queries
+        that could have used the index, and *seconds* is the total time
+        spent executing those queries. Suggestions are sorted with the
+        most costly first and columns that are already indexed are
+        omitted::
+
+            for columns, uses, seconds in source.suggest_indexes():
+                print(columns, uses, seconds)
+
+        To create indexes automatically, set :attr:`auto_index` to
+        True.
+        """
+        stats = getattr(self, '_query_stats', {})
+        suggestions = [(k, v[0], v[1]) for k, v in stats.items()
+                       if not self._is_indexed(k)]
+        return sorted(suggestions, key=lambda x: (-x[2], -x[1], x[0]))
+
     def _execute_query(self, select_clause, trailing_clause=None, **kwds_filter):
-        """Execute query and return cursor object."""
+        """Execute query and return cursor object (or an iterator of
+        rows if results are cached).
+        """
         try:
             stmnt, params = self._build_query(self._table, select_clause, **kwds_filter)
             if trailing_clause:
                 stmnt += '\n' + trailing_clause
+
+            cache = self._get_result_cache()
+            if cache:
+                key = (stmnt, tuple(params))
+                try:
+                    hash(key)
+                except TypeError:
+                    cache = None  # <- Unhashable params are not cached.
+            if cache:
+                rows = cache.get(key)
+                if rows is not None:
+                    return iter(rows)  # <- EXIT!
+
             cursor = self._connection.cursor()
             #print(stmnt, params)
             cursor.execute(stmnt, params)
+            if cache:
+                rows = cursor.fetchall()
+                cache.put(key, rows)
+                return iter(rows)  # <- EXIT!
         except Exception as e:
             exc_cls = e.__class__
             msg = '%s\n  query: %s\n  params: %r' % (e, stmnt, params)
             raise exc_cls(msg)
         return cursor
 
+    def _get_changes(self):
+        """Return a value that changes whenever rows in the database
+        are changed. The number of changed rows is only counted for
+        the current connection, so when concurrent reads are enabled,
+        SQLite's data_version is included to detect changes committed
+        by the connections of other threads.
+        """
+        connection = self._connection
+        if self.__dict__.get('_thread_local') is None:
+            return connection.total_changes  # <- EXIT!
+        data_version = connection.execute('PRAGMA data_version').fetchone()
+        return (connection.total_changes, data_version)
+
+    def _get_result_cache(self):
+        """Return the result cache for the current thread's connection
+        or None if caching is disabled. Cached results are cleared if
+        any rows have been changed since they were stored. Since
+        changes are tracked per connection, each thread gets its own
+        cache when concurrent reads are enabled.
+        """
+        if not self.result_cache_size:
+            return None  # <- EXIT!
+
+        local = self.__dict__.get('_thread_local')
+        owner = self if local is None else local
+        cache = getattr(owner, '_result_cache', None)
+        if cache is None or cache.maxsize != self.result_cache_size:
+            counts = self.__dict__.setdefault('_result_cache_counts', _CacheCounts())
+            cache = _ResultCache(self.result_cache_size, counts)
+            owner._result_cache = cache
+            caches = [x for x in self.__dict__.get('_result_caches', []) if x()]
+            caches.append(weakref.ref(cache))
+            self._result_caches = caches
+        cache.validate(self._get_changes())
+        return cache
+
+    def _iter_result_caches(self):
+        """Return an iterator of result caches (one for each
+        connection that has used caching).
+        """
+        caches = (ref() for ref in self.__dict__.get('_result_caches', []))
+        return (cache for cache in caches if cache is not None)
+
+    def result_cache_info(self):
+        """Return a named tuple of ``(hits, misses, maxsize, currsize)``
+        for the result cache (see :attr:`result_cache_size`). When
+        concurrent reads are enabled, the counts are totals for all
+        threads (including threads that have finished).
+        """
+        counts = self.__dict__.get('_result_cache_counts') or _CacheCounts()
+        return _CacheInfo(
+            counts.hits,
+            counts.misses,
+            self.result_cache_size,
+            sum(cache.info().currsize for cache in self._iter_result_caches()),
+        )
+
+    def clear_result_cache(self):
+        """Remove all cached query results."""
+        for cache in self._iter_result_caches():
+            cache.clear()
+
     @classmethod
     def _build_query(cls, table, select_clause, **kwds_filter):
         """Return 'SELECT' query."""
@@ -1104,7 +1825,14 @@ class DataSource(object):
         items = where.items()
         items = sorted(items, key=lambda x: x[0])  # Ordered by key.
         for key, val in items:
-            if _is_nsiterable(val):
+            if isinstance(val, Expression):
+                column = '"{0}"'.format(key.replace('"', '""'))
+                expression_sql = val._to_sql(column)
+                if expression_sql is None:
+                    msg = 'cannot translate expression into SQL: {0!r}'
+                    raise ValueError(msg.format(val))
+                clause.append(expression_sql)
+            elif _is_nsiterable(val):
                 clause.append(key + ' IN (%s)' % (', '.join('?' * len(val))))
                 for x in val:
                     params.append(x)
@@ -1118,7 +1846,7 @@ class DataSource(object):
     def _format_result_group(self, select, cursor):
         outer_type = type(select)
         inner_type = type(next(iter(select)))
-        if issubclass(inner_type, str):
+        if issubclass(inner_type, (str, _ColumnExpression)):
             result = (row[0] for row in cursor)
         elif issubclass(inner_type, tuple) and hasattr(inner_type, '_fields'):
             result = (inner_type(*x) for x in cursor)  # If namedtuple.
@@ -1151,7 +1879,7 @@ class DataSource(object):
             grouped = itertools.groupby(cursor, keyfunc)
 
             inner = next(iter(value))
-            index = 1 if isinstance(inner, str) else len(inner)
+            index = 1 if isinstance(inner, (str, _ColumnExpression)) else len(inner)
             sliced = ((k, (x[-index:] for x in g)) for k, g in grouped)
             formatted = ((k, self._format_result_group(value, g)) for k, g in sliced)
             dictitems =  DictItems(formatted)
@@ -1164,7 +1892,7 @@ class DataSource(object):
         raises LookupError if fields are missing.
         """
         #assert not isinstance(fieldnames, BaseElement)
-        available = self.fieldnames
+        available = self._get_metadata('fieldset')
         for name in fieldnames:
             if name not in available:
                 msg = '{0!r} not in {1!r}'.format(name, self)
@@ -1175,14 +1903,24 @@ class DataSource(object):
         name = name.replace('"', '""')
         return '"{0}"'.format(name)
 
+    def _translate_column(self, column):
+        """Return SQL for a field name or _ColumnExpression."""
+        if isinstance(column, _ColumnExpression):
+            field = self._escape_field_name(column.field)
+            return column.expression._to_sql(field)
+        return self._escape_field_name(column)
+
     def _parse_key_value(self, key, value):
         key_columns = (key,) if isinstance(key, str) else tuple(key)
         value = tuple(value)[0]
-        value_columns = (value,) if isinstance(value, str) else  tuple(value)
+        if isinstance(value, (str, _ColumnExpression)):
+            value_columns = (value,)
+        else:
+            value_columns = tuple(value)
         self._assert_fields_exist(key_columns)
-        self._assert_fields_exist(value_columns)
+        self._assert_fields_exist(getattr(x, 'field', x) for x in value_columns)
         key_columns = tuple(self._escape_field_name(x) for x in key_columns)
-        value_columns = tuple(self._escape_field_name(x) for x in value_columns)
+        value_columns = tuple(self._translate_column(x) for x in value_columns)
 
         return key_columns, value_columns
 
@@ -1198,7 +1936,7 @@ class DataSource(object):
             order_by = 'ORDER BY {0}'.format(', '.join(key_columns))
         else:
             order_by = None
-        cursor = self._execute_query(select_clause, order_by, **where)
+        cursor = self._execute_and_record(key, select_clause, order_by, **where)
         return self._format_results(select, cursor)
 
     def _select_distinct(self, select, **where):
@@ -1211,7 +1949,7 @@ class DataSource(object):
             order_by = 'ORDER BY {0}'.format(', '.join(key_columns))
         else:
             order_by = None
-        cursor = self._execute_query(select_clause, order_by, **where)
+        cursor = self._execute_and_record(key, select_clause, order_by, **where)
         return self._format_results(select, cursor)
 
     def _select_aggregate(self, sqlfunc, select, **where):
@@ -1229,7 +1967,7 @@ class DataSource(object):
             group_by = 'GROUP BY {0}'.format(', '.join(key_columns))
         else:
             group_by = None
-        cursor = self._execute_query(select_clause, group_by, **where)
+        cursor = self._execute_and_record(key, select_clause, group_by, **where)
         results =  self._format_results(select, cursor)
 
         if isinstance(select, collections.Mapping):
@@ -1237,6 +1975,121 @@ class DataSource(object):
             return DataResult(results, evaluation_type=dict)
         return next(results)
 
+    # Temporary tables of required values are named with this prefix
+    # and a number that is unique for each comparison.
+    _requirement_table_prefix = 'datatest_requirement_values_'
+    _requirement_table_ids = itertools.count()
+
+    @staticmethod
+    def _is_set_comparable(value):
+        """Return True if *value* compares the same way in SQLite as
+        it does in Python (None is excluded because NULL never equals
+        another value in SQL).
+        """
+        if isinstance(value, string_types):
+            return '\x00' not in value
+        if isinstance(value, Integral):
+            return -2 ** 63 <= value < 2 ** 63
+        if isinstance(value, float):
+            return not (isnan(value) or isinf(value))
+        return False
+
+    def _drop_requirement_tables(self):
+        """Drop the temporary tables of required values that are left
+        on the current connection. A table can not be dropped while
+        other statements are reading from the database (for example,
+        a partly consumed iterator), so tables that are still locked
+        are left to be dropped by a later comparison.
+        """
+        cursor = self._connection.cursor()
+        cursor.execute("SELECT name FROM sqlite_temp_master WHERE type='table'"
+                       ' AND name GLOB ?', (self._requirement_table_prefix + '*',))
+        for table in [row[0] for row in cursor]:
+            try:
+                with _TransactionSyncOff(self._connection) as cursor:
+                    cursor.execute('DROP TABLE temp.{0}'.format(table))
+            except sqlite3.OperationalError:
+                pass
+
+    def _compare_set(self, column, requirement_set, **where):
+        """Compare the values of *column* (a field name or
+        _ColumnExpression) against *requirement_set* and return a
+        two-tuple of distinct *matching* and *extra* values. Returns
+        None if the requirement contains values that can not be
+        compared in SQL or if SQLite can not make the comparison
+        (for example, when other statements have locked the schema).
+
+        Required values are loaded into a temporary table so that
+        only matching and extra values are returned from SQLite (an
+        anti-join rather than checking each value in Python).
+        """
+        values = list(requirement_set)
+        for value in values:
+            if not self._is_set_comparable(value):
+                return None  # <- EXIT!
+
+        self._assert_fields_exist([getattr(column, 'field', column)])
+        column_sql = self._translate_column(column)
+        where_clause, params = self._build_where_clause(**where)
+        if where_clause:
+            where_clause += ' AND '
+
+        # Values must also be of the same type class (numbers or text)
+        # to match, typed columns would otherwise convert numeric text.
+        table = self._requirement_table_prefix + str(next(self._requirement_table_ids))
+        match_clause = (
+            '(SELECT 1 FROM temp.{0} AS r WHERE r.value = {1}'
+            " AND (typeof(r.value) IN ('integer', 'real'))"
+            " = (typeof({1}) IN ('integer', 'real')))"
+        ).format(table, column_sql)
+        statement = 'SELECT DISTINCT {0} FROM {1} WHERE {2}{3}EXISTS {4}'
+
+        cache = self._get_result_cache()
+        changes_before = self._get_changes()
+        try:
+            # Loading is committed so no transaction is left open.
+            with _TransactionSyncOff(self._connection) as cursor:
+                cursor.execute('CREATE TEMPORARY TABLE {0} (value UNIQUE)'.format(table))
+                cursor.executemany('INSERT INTO temp.{0} VALUES (?)'.format(table),
+                                   ((x,) for x in values))
+            cursor = self._connection.cursor()
+            cursor.execute(statement.format(column_sql, self._table,
+                                            where_clause, '', match_clause), params)
+            matching = [row[0] for row in cursor]
+            cursor.execute(statement.format(column_sql, self._table,
+                                            where_clause, 'NOT ', match_clause), params)
+            extra = [row[0] for row in cursor]
+        except sqlite3.OperationalError:
+            return None  # <- EXIT! Compare in Python instead.
+        finally:
+            self._drop_requirement_tables()
+            if cache is not None:
+                cache.accept_changes(changes_before, self._get_changes())
+        return matching, extra
+
+    def _select_regex_mismatches(self, column, regex, distinct=False, **where):
+        """Return an iterator of values from *column* (a field name or
+        _ColumnExpression) that do not contain a match for the compiled
+        *regex*. Values are searched inside SQLite so only non-matching
+        values are returned.
+        """
+        self._assert_fields_exist([getattr(column, 'field', column)])
+        column_sql = self._translate_column(column)
+        where_clause, params = self._build_where_clause(**where)
+        if where_clause:
+            where_clause += ' AND '
+
+        statement = 'SELECT {0}{1} FROM {2} WHERE {3}NOT {4}(?, ?, {1})'.format(
+            'DISTINCT ' if distinct else '',
+            column_sql,
+            self._table,
+            where_clause,
+            _REGEX_FUNCTION,
+        )
+        cursor = self._connection.cursor()
+        cursor.execute(statement, params + [regex.pattern, regex.flags])
+        return (row[0] for row in cursor)
+
     def create_index(self, *columns):
         """Create an index for specified columns---can speed up
         testing in many cases.
@@ -1261,6 +2114,8 @@ class DataSource(object):
                   a test suite's over-all performance.  Creating
                   several indexes before testing even begins could
                   lead to longer run times so use indexes with care.
+                  Use :meth:`suggest_indexes` to see which columns
+                  your queries actually use.
         """
         self._assert_fields_exist(columns)
 
@@ -1280,3 +2135,4 @@ class DataSource(object):
         cursor = self._connection.cursor()
         cursor.execute('PRAGMA synchronous=OFF')
         cursor.execute(statement)
+        self._clear_metadata()
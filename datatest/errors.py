@@ -1,4 +1,6 @@
 # -*- coding: utf-8 -*-
+import pickle
+import tempfile
 from math import isnan
 from numbers import Number
 from pprint import pformat
@@ -11,11 +13,135 @@ from .utils.misc import _is_nsiterable
 from .utils.misc import _is_consumable
 from .utils.misc import _make_token
 from .dataaccess import _is_collection_of_items
+from .dataaccess import DictItems
+
+
+class _TruncatedList(list):
+    """A list of differences that stops short of the full set of
+    differences (see the *max_differences* argument of assertValid).
+    """
+
+
+class _TruncatedDict(dict):
+    """A dictionary of differences that stops short of the full set
+    of differences (see the *max_differences* argument of assertValid).
+    """
+
+
+def _make_truncated(differences):
+    """Return a truncated container of the given *differences*."""
+    if isinstance(differences, (_TruncatedList, _TruncatedDict)):
+        return differences  # <- EXIT!
+    if isinstance(differences, collections.Mapping) or \
+            _is_collection_of_items(differences):
+        return _TruncatedDict(differences)
+    return _TruncatedList(differences)
+
+
+class _DifferenceStream(object):
+    """A replayable iterable of differences that are read lazily from
+    a consumable *iterable*. The first *memory_limit* items are kept
+    in memory and later items are pickled to a temporary file. If
+    *is_items* is True, the iterable contains key-value pairs.
+    """
+    memory_limit = 10000
+
+    def __init__(self, iterable, is_items=False):
+        self.is_items = is_items
+        self._source = iter(iterable)
+        self._memory = []
+        self._file = None
+        self._spilled = 0  # Number of items written to file.
+
+    def _spill(self, item):
+        """Write *item* to the temporary file. Returns False if the
+        item could not be pickled.
+        """
+        try:
+            data = pickle.dumps(item, pickle.HIGHEST_PROTOCOL)
+        except Exception:  # Pickling can raise many exception types.
+            return False
+
+        if self._file is None:
+            self._file = tempfile.TemporaryFile()
+        self._file.seek(0, 2)  # Seek to end of file.
+        self._file.write(data)
+        self._spilled += 1
+        return True
+
+    def _unspill(self):
+        """Move items from the temporary file back into memory (used
+        when an item cannot be pickled).
+        """
+        if self._file is not None:
+            self._file.seek(0)
+            for _ in range(self._spilled):
+                self._memory.append(pickle.load(self._file))
+            self._file.close()
+            self._file = None
+        self._spilled = 0
+        self.memory_limit = None  # <- Keep all further items in memory.
+
+    def _fetch(self):
+        """Read the next item from the source iterator and store it.
+        Returns False if the source is exhausted.
+        """
+        if self._source is None:
+            return False  # <- EXIT!
+
+        try:
+            item = next(self._source)
+        except StopIteration:
+            self._source = None
+            return False
+
+        limit = self.memory_limit
+        if limit is None or (len(self._memory) < limit and not self._spilled):
+            self._memory.append(item)
+        elif not self._spill(item):
+            self._unspill()
+            self._memory.append(item)
+        return True
+
+    def __iter__(self):
+        position = 0
+        offset = 0  # File offset of next spilled item.
+        while True:
+            spilled_position = position - len(self._memory)
+            if spilled_position < 0:
+                yield self._memory[position]
+            elif spilled_position < self._spilled:
+                self._file.seek(offset)
+                item = pickle.load(self._file)
+                offset = self._file.tell()
+                yield item
+            elif self._fetch():
+                continue  # <- Stored item is yielded on next pass.
+            else:
+                return
+            position += 1
+
+    def __bool__(self):
+        return bool(self._memory or self._spilled or self._fetch())
+    __nonzero__ = __bool__  # For Python 2 compatibility.
+
+    def __del__(self):
+        if self._file is not None:
+            self._file.close()
+
+    def __repr__(self):
+        return '<{0} object at {1}>'.format(self.__class__.__name__, hex(id(self)))
 
 
 class ValidationError(AssertionError):
-    """Raised when a data validation fails."""
-    def __init__(self, message, differences):
+    """Raised when a data validation fails.
+
+    When *lazy* is True, consumable *differences* are not loaded into
+    a list or dict but are read only as needed (and kept in a temporary
+    file if there are very many of them).
+    """
+    def __init__(self, message, differences, lazy=False):
+        self.lazy = lazy
         self.args = message, differences
         self.maxDiff = None  # Optional unittest-style message truncation.
 
@@ -27,12 +153,23 @@ class ValidationError(AssertionError):
     @property
     def differences(self):
         """The differences given to the exception constructor."""
-        return self._differences
+        differences = self._differences
+        if isinstance(differences, _DifferenceStream) and differences.is_items:
+            return DictItems(iter(differences))
+        return differences
+
+    @property
+    def truncated(self):
+        """True if validation stopped before all differences were
+        found. When truncated, :attr:`differences` contains only a
+        sample of the differences.
+        """
+        return isinstance(self._differences, (_TruncatedList, _TruncatedDict))
 
     @property
     def args(self):
         """The tuple of arguments given to the exception constructor."""
-        return (self._message, self._differences)
+        return (self._message, self.differences)
 
     @args.setter
     def args(self, value):
@@ -50,7 +187,10 @@ class ValidationError(AssertionError):
             msg = 'expected iterable of differences, got {0!r}'
             raise TypeError(msg.format(differences.__class__.__name__))
 
-        if _is_collection_of_items(differences):
+        if getattr(self, 'lazy', False) and _is_consumable(differences):
+            is_items = _is_collection_of_items(differences)
+            differences = _DifferenceStream(differences, is_items)
+        elif _is_collection_of_items(differences):
             differences = dict(differences)
         elif _is_consumable(differences):
             differences = list(differences)
@@ -72,6 +212,14 @@ class ValidationError(AssertionError):
         if isinstance(self._differences, dict):
             begin, end = '{', '}'
             iterable = iter(self._differences.items())
+        elif getattr(self._differences, 'is_items', False):
+            begin, end = '{', '}'
+            iterable = iter(self._differences)
+        else:
+            begin, end = '[', ']'
+            iterable = iter(self._differences)
+
+        if begin == '{':
             for k, v in iterable:
                 difference_count += 1
                 diff_string = '    {0!r}: {1!r},'.format(k, v)
@@ -81,8 +229,6 @@ class ValidationError(AssertionError):
                     break
                 list_of_strings.append(diff_string)
         else:
-            begin, end = '[', ']'
-            iterable = iter(self._differences)
             for x in iterable:
                 difference_count += 1
                 diff_string = '    {0!r},'.format(x)
@@ -98,9 +244,20 @@ class ValidationError(AssertionError):
             end += ('\nTruncated (too long). Set '
                     'self.maxDiff to None for full message.')
 
+        # If validation stopped early, only a sample was kept (more
+        # than this many differences exist).
+        if self.truncated:
+            count_prefix = 'more than '
+            end += ('\nStopped early (too many differences). To find all '
+                    'differences, omit the max_differences argument of '
+                    'assertValid() and set self.maxDifferences to None.')
+        else:
+            count_prefix = ''
+
         # Prepare final output.
-        output = '{0} ({1} difference{2}): {3}\n{4}\n{5}'.format(
+        output = '{0} ({1}{2} difference{3}): {4}\n{5}\n{6}'.format(
             self._message,
+            count_prefix,
             difference_count,
             '' if difference_count == 1 else 's',
             begin,
@@ -126,8 +283,20 @@ def _nan_to_token(x):
     return x
 
 
+def _make_from_args(cls, args):
+    """Rebuild a difference of the given class from its *args* (used
+    when unpickling differences).
+    """
+    difference = cls.__new__(cls)
+    difference._args = args
+    return difference
+
+
 class BaseDifference(abc.ABC):
     """Base class for data differences."""
+    __slots__ = ('_args', '_hash')  # <- Differences can be very numerous
+                                    #    so instances have no __dict__.
+
     def __new__(cls, *args, **kwds):
         if cls is BaseDifference:
             raise TypeError("Can't instantiate abstract class "
@@ -145,14 +314,48 @@ class BaseDifference(abc.ABC):
         """The tuple of arguments given to the exception constructor."""
         return self._args
 
+    def __hash__(self):
+        try:
+            return self._hash  # <- EXIT! Hash has already been computed.
+        except AttributeError:
+            pass
+        args = tuple(_nan_to_token(x) for x in self._args)
+        self._hash = hash((self.__class__, args))
+        return self._hash
+
     def __eq__(self, other):
         if self.__class__ != other.__class__:
             return False
             # POINT OF DISCUSSION: Should subclasses test equal
             # if args all match (like tuples and nameduples do)?
-        self_args = [_nan_to_token(x) for x in self.args]
-        other_args = [_nan_to_token(x) for x in other.args]
-        return self_args == other_args
+
+        self_args = self._args
+        other_args = other._args
+        if self_args == other_args:
+            return True  # <- EXIT! Fast path (no NaN handling needed).
+
+        try:
+            if self._hash != other._hash:
+                return False  # <- EXIT! Equal differences have equal hashes.
+        except AttributeError:
+            pass  # Hash not computed for one or both differences.
+
+        if len(self_args) != len(other_args):
+            return False
+        for x, y in zip(self_args, other_args):
+            if not (x == y or _nan_to_token(x) is _nan_to_token(y) is NANTOKEN):
+                return False
+        return True
+
+    def __ne__(self, other):
+        return not self.__eq__(other)
+
+    def __reduce__(self):
+        # The cached hash is not pickled (string hashes can differ
+        # between processes). Subclasses that do not define __slots__
+        # can have a __dict__ which is passed as the state.
+        state = getattr(self, '__dict__', None) or None
+        return (_make_from_args, (self.__class__, self._args), state)
 
     def __repr__(self):
         cls_name = self.__class__.__name__
@@ -162,18 +365,20 @@ class BaseDifference(abc.ABC):
 
 class Missing(BaseDifference):
     """A value **not found in data** that is in *requirement*."""
-    pass
+    __slots__ = ()
 
 
 class Extra(BaseDifference):
     """A value found in *data* but is **not in requirement**."""
-    pass
+    __slots__ = ()
 
 
 class Invalid(BaseDifference):
     """A value in *data* that does not satisfy a function, equality,
     or regular expression *requirement*.
     """
+    __slots__ = ()
+
     def __init__(self, invalid, expected=None):
         if expected is None:
             super(Invalid, self).__init__(invalid)
@@ -185,6 +390,8 @@ class Deviation(BaseDifference):
     """The difference between a numeric value in *data* and a matching
     numeric value in *requirement*.
     """
+    __slots__ = ()
+
     def __init__(self, deviation, expected):
         empty = lambda x: not x or isnan(x)
         if ((not empty(expected) and empty(deviation)) or
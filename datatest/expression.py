@@ -0,0 +1,435 @@
+# -*- coding: utf-8 -*-
+"""Element expressions that can be translated into SQL.
+
+Expressions are built from the :data:`element` placeholder and can
+be used anywhere a function of one argument is expected::
+
+    is_large = element > 100
+    is_large(150)  # <- Returns True.
+
+When a :class:`DataQuery <datatest.DataQuery>` is executed against a
+:class:`DataSource <datatest.DataSource>`, filter and map steps that
+use expressions are run inside SQLite instead of being called once
+per element in Python::
+
+    source('A').filter(element > 100)
+    source('A').map(element.strip().upper())
+
+Steps that cannot be translated are simply called like any other
+function.
+"""
+from __future__ import absolute_import
+import operator
+import re
+from math import isinf
+from math import isnan
+from numbers import Integral
+from numbers import Number
+
+from .utils.misc import string_types
+
+
+# Name of the SQL function used to call string methods from SQLite. It
+# must be registered on a connection with _register_functions().
+_STR_METHOD_FUNCTION = 'datatest_strmethod'
+
+
+def _sqlite_str_method(name, value, *args):
+    """Call string method *name* on *value* and return the result. If
+    *value* does not support the method, None is returned (this makes
+    the SQL result NULL). Expressions evaluated in Python also call
+    methods with this function so both give the same results.
+    """
+    try:
+        return getattr(value, name)(*args)
+    except (AttributeError, TypeError):
+        return None
+
+
+# Name of the SQL function used to search values with a regular
+# expression (see _sqlite_regex()).
+_REGEX_FUNCTION = 'datatest_regex'
+
+_regex_cache = {}  # Compiled patterns keyed by (pattern, flags).
+
+
+def _sqlite_regex(pattern, flags, value):
+    """Return 1 if *value* is a string that contains a match for the
+    regular expression *pattern* (compiled with the given *flags*),
+    otherwise return 0. Non-string values never match (searching them
+    raises an error in Python).
+    """
+    if not isinstance(value, string_types):
+        return 0  # <- EXIT!
+
+    key = (pattern, flags)
+    regex = _regex_cache.get(key)
+    if regex is None:
+        if len(_regex_cache) >= 100:
+            _regex_cache.clear()
+        regex = re.compile(pattern, flags)
+        _regex_cache[key] = regex
+    return 1 if regex.search(value) else 0
+
+
+def _sqlite_regexp(pattern, value):
+    """Implements SQLite's "value REGEXP pattern" operator."""
+    return _sqlite_regex(pattern, 0, value)
+
+
+def _register_functions(connection):
+    """Register the SQL functions used by translated expressions.
+    This should be called when a connection is first created--SQLite
+    cannot replace functions while other statements are active.
+    """
+    connection.create_function(_STR_METHOD_FUNCTION, -1, _sqlite_str_method)
+    connection.create_function(_REGEX_FUNCTION, 3, _sqlite_regex)
+    connection.create_function('REGEXP', 2, _sqlite_regexp)
+
+
+_numeric_guard = " IN ('integer', 'real')"
+_text_guard = " = 'text'"
+
+
+def _typeof_guard(value):
+    """Return the "typeof()" condition that matches *value* when it is
+    stored in SQLite, or None if it is not a number or text.
+    """
+    if isinstance(value, Number):
+        return _numeric_guard
+    if isinstance(value, string_types):
+        return _text_guard
+    return None
+
+
+def _sql_literal(value):
+    """Return a two-tuple containing an SQL literal for the given
+    *value* and a "typeof()" condition that matches SQLite values of
+    the same type class. Returns None if the value cannot be used as
+    an SQL literal.
+
+    Literals are written directly into the SQL statement (with quotes
+    escaped) so that translated expressions can be used in any clause
+    without keeping track of parameter order.
+    """
+    if value is None:
+        return 'NULL', None
+    if isinstance(value, bool):
+        return str(int(value)), _numeric_guard
+    if isinstance(value, Integral):
+        return str(value), _numeric_guard
+    if isinstance(value, float):
+        if isnan(value) or isinf(value):
+            return None
+        return repr(value), _numeric_guard
+    if isinstance(value, string_types):
+        if '\x00' in value:
+            return None
+        return "'" + value.replace("'", "''") + "'", _text_guard
+    return None
+
+
+class Expression(object):
+    """A function of one data element that can also be translated
+    into an SQL expression. Expressions are not created directly,
+    use the :data:`element` placeholder instead.
+
+    The *function* argument is called to evaluate the expression in
+    Python. The *sql* and *text* arguments are functions that accept
+    a placeholder string (an SQL column or a name) and return an SQL
+    expression or a display string. If the expression cannot be
+    translated, *sql* is None. When *predicate* is True, the SQL
+    expression evaluates to 1 or 0 (rather than to a data value).
+    """
+    def __init__(self, function, sql, text, predicate=False):
+        self._function = function
+        self._sql = sql
+        self._text = text
+        self._predicate = predicate
+
+    __hash__ = object.__hash__  # Defining __eq__ would otherwise
+                                # remove the default hash function.
+
+    def __call__(self, value):
+        return self._function(value)
+
+    def __repr__(self):
+        return self._text('element')
+
+    @property
+    def __name__(self):
+        return repr(self)
+
+    def __bool__(self):
+        raise TypeError('expressions cannot be used as booleans, use '
+                        "'&', '|', and '~' instead of 'and', 'or', "
+                        "and 'not'")
+    __nonzero__ = __bool__  # For Python 2 compatibility.
+
+    def _to_sql(self, column):
+        """Return SQL expression for the given *column* or None if the
+        expression cannot be translated.
+        """
+        if self._sql is None:
+            return None
+        return self._sql(column)
+
+    def _compose(self, inner):
+        """Return a new expression that applies this expression to the
+        result of the *inner* expression.
+        """
+        outer_function = self._function
+        inner_function = inner._function
+        function = lambda value: outer_function(inner_function(value))
+
+        if self._sql is None or inner._sql is None:
+            sql = None
+        else:
+            outer_sql = self._sql
+            inner_sql = inner._sql
+            sql = lambda column: outer_sql(inner_sql(column))
+
+        outer_text = self._text
+        inner_text = inner._text
+        text = lambda name: outer_text(inner_text(name))
+        return Expression(function, sql, text, self._predicate)
+
+    def _compare(self, other, py_op, sql_op, symbol):
+        if isinstance(other, type):
+            # Comparing with a class falls back to an identity check.
+            # This keeps checks like "obj in (type, object)" (which are
+            # made by the inspect module) from building an expression.
+            return NotImplemented
+
+        function = self._function
+        self_text = self._text
+        text = lambda name: '{0} {1} {2!r}'.format(self_text(name), symbol, other)
+
+        # Only compare values of the same type class (numbers with
+        # numbers, text with text) to match the typeof() guards used
+        # in SQL. Values of other classes are unequal to *other*.
+        literal = _sql_literal(other)
+        guard = literal[1] if literal else None
+        if guard is None:
+            new_function = lambda value: py_op(function(value), other)
+        else:
+            mismatched = (sql_op == '!=')
+            def new_function(value):
+                value = function(value)
+                if _typeof_guard(value) != guard:
+                    return mismatched
+                return py_op(value, other)
+
+        if self._sql is None or self._predicate or literal is None:
+            return Expression(new_function, None, text, predicate=True)
+
+        self_sql = self._sql
+        literal = literal[0]
+        if guard is None:  # Comparing with None.
+            if sql_op == '=':
+                sql = lambda column: '(' + self_sql(column) + ' IS NULL)'
+            elif sql_op == '!=':
+                sql = lambda column: '(' + self_sql(column) + ' IS NOT NULL)'
+            else:
+                sql = None  # Ordering None is not supported in Python 3.
+            return Expression(new_function, sql, text, predicate=True)
+
+        if sql_op == '!=':
+            def sql(column):
+                column = self_sql(column)
+                return ('(NOT (typeof(' + column + ')' + guard +
+                        ' AND ' + column + ' = ' + literal + '))')
+        else:
+            def sql(column):
+                column = self_sql(column)
+                return ('(typeof(' + column + ')' + guard + ' AND ' +
+                        column + ' ' + sql_op + ' ' + literal + ')')
+        return Expression(new_function, sql, text, predicate=True)
+
+    def __eq__(self, other):
+        return self._compare(other, operator.eq, '=', '==')
+
+    def __ne__(self, other):
+        return self._compare(other, operator.ne, '!=', '!=')
+
+    def __lt__(self, other):
+        return self._compare(other, operator.lt, '<', '<')
+
+    def __le__(self, other):
+        return self._compare(other, operator.le, '<=', '<=')
+
+    def __gt__(self, other):
+        return self._compare(other, operator.gt, '>', '>')
+
+    def __ge__(self, other):
+        return self._compare(other, operator.ge, '>=', '>=')
+
+    def isin(self, values):
+        """Return an expression that tests if an element is contained
+        in the given *values*.
+        """
+        values = list(values)
+        try:
+            container = frozenset(values)
+        except TypeError:
+            container = tuple(values)
+
+        function = self._function
+        new_function = lambda value: function(value) in container
+        self_text = self._text
+        text = lambda name: '{0}.isin({1!r})'.format(self_text(name), values)
+
+        literals = [_sql_literal(x) for x in values]
+        if self._sql is None or self._predicate or None in literals:
+            return Expression(new_function, None, text, predicate=True)
+
+        groups = {}  # Group literals by their typeof() guard.
+        for literal, guard in literals:
+            groups.setdefault(guard, []).append(literal)
+
+        self_sql = self._sql
+        def sql(column):
+            column = self_sql(column)
+            conditions = []
+            for guard, group in sorted(groups.items(), key=lambda x: x[0] or ''):
+                if guard is None:
+                    conditions.append(column + ' IS NULL')
+                else:
+                    conditions.append('(typeof(' + column + ')' + guard + ' AND ' +
+                                      column + ' IN (' + ', '.join(group) + '))')
+            return '(' + (' OR '.join(conditions) or '0') + ')'
+        return Expression(new_function, sql, text, predicate=True)
+
+    def _combine(self, other, py_op, sql_op, symbol):
+        if not isinstance(other, Expression):
+            return NotImplemented
+
+        func1 = self._function
+        func2 = other._function
+        new_function = lambda value: py_op(bool(func1(value)), bool(func2(value)))
+
+        text1 = self._text
+        text2 = other._text
+        text = lambda name: '({0}) {1} ({2})'.format(text1(name), symbol, text2(name))
+
+        if (self._sql is None or other._sql is None
+                or not self._predicate or not other._predicate):
+            return Expression(new_function, None, text, predicate=True)
+
+        sql1 = self._sql
+        sql2 = other._sql
+        sql = lambda column: '(' + sql1(column) + ' ' + sql_op + ' ' + sql2(column) + ')'
+        return Expression(new_function, sql, text, predicate=True)
+
+    def __and__(self, other):
+        return self._combine(other, operator.and_, 'AND', '&')
+
+    def __or__(self, other):
+        return self._combine(other, operator.or_, 'OR', '|')
+
+    def __invert__(self):
+        function = self._function
+        new_function = lambda value: not function(value)
+        self_text = self._text
+        text = lambda name: '~({0})'.format(self_text(name))
+
+        if self._sql is None or not self._predicate:
+            return Expression(new_function, None, text, predicate=True)
+
+        self_sql = self._sql
+        sql = lambda column: '(NOT ' + self_sql(column) + ')'
+        return Expression(new_function, sql, text, predicate=True)
+
+    def _call_method(self, name, *args):
+        function = self._function
+        new_function = lambda value: _sqlite_str_method(name, function(value), *args)
+
+        self_text = self._text
+        args_repr = ', '.join(repr(x) for x in args)
+        text = lambda name_: '{0}.{1}({2})'.format(self_text(name_), name, args_repr)
+
+        literals = [_sql_literal(x) for x in args]
+        if self._sql is None or self._predicate or None in literals:
+            return Expression(new_function, None, text)
+
+        self_sql = self._sql
+        args_sql = ''.join(', ' + literal for literal, _ in literals)
+        def sql(column):
+            return "{0}('{1}', {2}{3})".format(
+                _STR_METHOD_FUNCTION, name, self_sql(column), args_sql)
+
+        is_predicate = name in ('startswith', 'endswith')
+        return Expression(new_function, sql, text, is_predicate)
+
+    def strip(self, chars=None):
+        """Return an expression that calls the element's strip()
+        method.
+        """
+        return self._call_method('strip', *([] if chars is None else [chars]))
+
+    def lstrip(self, chars=None):
+        """Return an expression that calls the element's lstrip()
+        method.
+        """
+        return self._call_method('lstrip', *([] if chars is None else [chars]))
+
+    def rstrip(self, chars=None):
+        """Return an expression that calls the element's rstrip()
+        method.
+        """
+        return self._call_method('rstrip', *([] if chars is None else [chars]))
+
+    def upper(self):
+        """Return an expression that calls the element's upper()
+        method.
+        """
+        return self._call_method('upper')
+
+    def lower(self):
+        """Return an expression that calls the element's lower()
+        method.
+        """
+        return self._call_method('lower')
+
+    def startswith(self, prefix):
+        """Return an expression that calls the element's startswith()
+        method.
+        """
+        return self._call_method('startswith', prefix)
+
+    def endswith(self, suffix):
+        """Return an expression that calls the element's endswith()
+        method.
+        """
+        return self._call_method('endswith', suffix)
+
+
+#: A placeholder that represents a single data element.
+element = Expression(lambda value: value, lambda column: column, lambda name: name)
+
+
+class _ColumnExpression(object):
+    """An expression applied to a single field of a data source. This
+    is used internally when translating DataQuery map steps into SQL.
+    """
+    def __init__(self, field, expression):
+        self.field = field
+        self.expression = expression
+
+    def __eq__(self, other):
+        if not isinstance(other, _ColumnExpression):
+            return NotImplemented
+        return (self.field == other.field
+                and self.expression is other.expression)
+
+    def __ne__(self, other):
+        result = self.__eq__(other)
+        if result is NotImplemented:
+            return result
+        return not result
+
+    def __hash__(self):
+        return hash((self.field, id(self.expression)))
+
+    def __repr__(self):
+        return self.expression._text(repr(self.field))
@@ -1,14 +1,58 @@
 # -*- coding: utf-8 -*-
 """Temporary SQLite table loader and manager."""
 from __future__ import absolute_import
+import hashlib
 import itertools
+import os
+import re
+import shutil
 import sqlite3
+import tempfile
+import warnings
+from numbers import Integral
 from .csvreader import UnicodeCsvReader
+from ..expression import _register_functions
 from ..utils.misc import _is_nsiterable
+from ..utils.misc import string_types
 
 
 # Default connection shared by TemporarySqliteTable instances.
 _sqltemp_shared_connection = sqlite3.connect('')
+_register_functions(_sqltemp_shared_connection)
+
+
+# Settings used by _new_connection(). The databases only hold temporary
+# tables that are rebuilt from their source files as needed, so there is
+# no need for journaling or syncing to guard against crashes.
+_connection_pragmas = [
+    ('page_size', 4096),      # <- Must be set before tables are created.
+    ('cache_size', -65536),   # <- Negative values are in KiB (64 MiB).
+    ('temp_store', 'MEMORY'),
+    ('mmap_size', 268435456),  # <- 256 MiB.
+    ('journal_mode', 'OFF'),
+    ('synchronous', 'OFF'),
+]
+
+
+def _new_connection(database=''):
+    """Return a new connection for use by a single data source.
+
+    Unlike the shared connection, each data source gets its own page
+    cache and lock. Its temporary tables are dropped (and the memory
+    is reclaimed) when the connection is closed or garbage collected.
+    The connection can be used from threads other than the one that
+    created it but it must not be used by multiple threads at once.
+
+    If *database* is given, it should be the path of an existing
+    database file (used to give each thread its own connection).
+    """
+    connection = sqlite3.connect(database, check_same_thread=False)
+    cursor = connection.cursor()
+    for name, value in _connection_pragmas:
+        cursor.execute('PRAGMA {0}={1}'.format(name, value))
+    cursor.close()
+    _register_functions(connection)
+    return connection
 
 
 def _get_columns_from_data(data):
@@ -27,6 +71,116 @@ def _get_columns_from_data(data):
     return columns, data
 
 
+# Number of rows examined when column types are inferred from data.
+_INFER_SAMPLE_SIZE = 1000
+
+# Strings that SQLite will store as numbers without changing their
+# meaning (integers with leading zeros, like ZIP codes, are excluded).
+_integer_pattern = re.compile(r'^[+-]?(?:0|[1-9][0-9]*)$')
+_real_pattern = re.compile(r'^[+-]?(?:(?:0|[1-9][0-9]*)(?:\.[0-9]*)?|\.[0-9]+)'
+                           r'(?:[eE][+-]?[0-9]+)?$')
+_integer_min = -2 ** 63
+_integer_max = 2 ** 63 - 1
+
+
+def _normalize_dtype(dtype):
+    """Return SQLite column type for the given *dtype* (a Python type
+    or an SQLite type name).
+    """
+    if dtype is None:
+        return None
+    if isinstance(dtype, string_types):
+        sql_type = dtype.upper()
+        if sql_type in ('INTEGER', 'REAL', 'TEXT'):
+            return sql_type
+    elif isinstance(dtype, type):
+        if issubclass(dtype, Integral):
+            return 'INTEGER'
+        if issubclass(dtype, float):
+            return 'REAL'
+        if issubclass(dtype, string_types):
+            return 'TEXT'
+    msg = "dtype must be int, float, str, or 'INTEGER', 'REAL', 'TEXT'; got {0!r}"
+    raise ValueError(msg.format(dtype))
+
+
+def _infer_value_type(value):
+    """Return 'INTEGER' or 'REAL' if *value* can be stored as a number
+    without loss, return 'TEXT' if it cannot, or None if the value is
+    empty.
+    """
+    if value is None or value == '':
+        return None
+    if isinstance(value, Integral):
+        if _integer_min <= value <= _integer_max:
+            return 'INTEGER'
+        return 'TEXT'
+    if isinstance(value, float):
+        return 'REAL'
+    if isinstance(value, string_types):
+        if _integer_pattern.match(value):
+            return _infer_value_type(int(value))
+        if _real_pattern.match(value):
+            return 'REAL'
+    return 'TEXT'
+
+
+def _infer_dtypes(columns, data, sample_size=_INFER_SAMPLE_SIZE):
+    """Examine the first rows of *data* and return a two-tuple
+    containing a dictionary of inferred column types and a rebuilt
+    data iterator. Only numeric columns are included in the returned
+    dictionary--other columns are left without a declared type so
+    their values are stored as given.
+    """
+    data = iter(data)
+    sample = list(itertools.islice(data, sample_size))
+    data = itertools.chain(sample, data)  # Rebuild original.
+
+    if sample and isinstance(sample[0], dict):
+        get_values = lambda col, i: (row.get(col) for row in sample)
+    else:
+        get_values = lambda col, i: (row[i] for row in sample)
+
+    dtypes = {}
+    for i, column in enumerate(columns):
+        found = set(_infer_value_type(x) for x in get_values(column, i))
+        found.discard(None)
+        if found == set(['INTEGER']):
+            dtypes[column] = 'INTEGER'
+        elif found and found <= set(['INTEGER', 'REAL']):
+            dtypes[column] = 'REAL'
+    return dtypes, data
+
+
+def _iter_checked_rows(rows, columns, checks, stopped):
+    """Yield *rows* while checking the values of typed columns. The
+    *checks* argument should be a list of (index, type) pairs for
+    'INTEGER' and 'REAL' columns. When a row contains a value that
+    cannot be stored as its column's type without loss, iteration
+    stops and the row and the names of the mismatched columns are
+    appended to the *stopped* list.
+    """
+    for row in rows:
+        if isinstance(row, dict):
+            values = [(i, sql_type, row.get(columns[i])) for i, sql_type in checks]
+        else:
+            values = [(i, sql_type, row[i]) for i, sql_type in checks]
+
+        mismatched = []
+        for i, sql_type, value in values:
+            found = _infer_value_type(value)
+            if found is None or found == sql_type:
+                continue
+            if found == 'INTEGER' and sql_type == 'REAL':
+                continue
+            mismatched.append(columns[i])
+
+        if mismatched:
+            stopped.append((row, mismatched))
+            return  # <- EXIT!
+        yield row
+
+
 class _TransactionSyncOff(object):
     """Context manager to handle a single transaction that sets
     synchronous=OFF temporarily and restores it's original value on
@@ -77,8 +231,18 @@ class _TransactionSyncOff(object):
 
 
 class TemporarySqliteTable(object):
-    """Creates a temporary SQLite table and inserts given data."""
-    def __init__(self, data, columns=None, connection=None):
+    """Creates a temporary SQLite table and inserts given data.
+
+    If given, *dtypes* should be a dictionary of column names and
+    types (int, float, or str) used to declare column affinity so
+    that SQLite stores numeric values natively. If *dtypes* is the
+    string ``'infer'``, types are inferred from the first rows of
+    data and the remaining values are checked as they are inserted--a
+    column is changed to TEXT if a later value cannot be stored as a
+    number without loss (e.g., '007' in an INTEGER column). Columns
+    without a type are stored as given.
+    """
+    def __init__(self, data, columns=None, connection=None, dtypes=None):
         """Initialize self."""
         global _sqltemp_shared_connection
         if not connection:
@@ -87,10 +251,16 @@ class TemporarySqliteTable(object):
         if not columns:
             columns, data = _get_columns_from_data(data)
 
+        if dtypes == 'infer':
+            dtypes, data = _infer_dtypes(columns, data)
+            insert_data = self._insert_inferred_data
+        else:
+            insert_data = self._insert_data
+
         with _TransactionSyncOff(connection) as cursor:
             table = self._get_new_table_name(cursor)
-            self._create_table(cursor, table, columns)
-            self._insert_data(cursor, table, columns, data)
+            self._create_table(cursor, table, columns, dtypes)
+            insert_data(cursor, table, columns, data)
 
         # Assign class properties.
         self._connection = connection
@@ -113,11 +283,72 @@ class TemporarySqliteTable(object):
         cursor.execute('PRAGMA table_info(' + self._name + ')')
         return [x[1] for x in cursor.fetchall()]
 
+    @property
+    def dtypes(self):
+        """Dictionary of column names and declared SQLite types
+        (columns without a declared type are omitted).
+        """
+        cursor = self._connection.cursor()
+        cursor.execute('PRAGMA table_info(' + self._name + ')')
+        return dict((x[1], x[2]) for x in cursor.fetchall() if x[2])
+
     def drop(self):
         """Drops temporary table from database."""
         cursor = self.connection.cursor()
         cursor.execute('DROP TABLE IF EXISTS ' + self.name)
 
+    @classmethod
+    def _from_database(cls, path, connection=None):
+        """Return a new instance with data copied from the table saved
+        in the SQLite database file *path* (see _save_database()).
+        """
+        global _sqltemp_shared_connection
+        if not connection:
+            connection = _sqltemp_shared_connection
+
+        cursor = connection.cursor()
+        cursor.execute('ATTACH DATABASE ? AS datatest_cache', (path,))
+        try:
+            definitions = cls._get_column_definitions(cursor, 'datatest_cache', 'data')
+            if not definitions:
+                raise sqlite3.DatabaseError('no saved table in {0!r}'.format(path))
+
+            with _TransactionSyncOff(connection) as cursor:
+                table = cls._get_new_table_name(cursor)
+                statement = 'CREATE TEMPORARY TABLE {0} ({1})'
+                cursor.execute(statement.format(table, ', '.join(definitions)))
+                statement = 'INSERT INTO {0} SELECT * FROM datatest_cache.data'
+                cursor.execute(statement.format(table))
+        finally:
+            connection.cursor().execute('DETACH DATABASE datatest_cache')
+
+        new_instance = cls.__new__(cls)
+        new_instance._connection = connection
+        new_instance._name = table
+        return new_instance
+
+    def _save_database(self, path, messages=()):
+        """Save a copy of the table (as "data") in a new SQLite
+        database file at *path* (see _save_table()).
+        """
+        _save_table(self._connection, self._name, path, messages)
+
+    @classmethod
+    def _get_column_definitions(cls, cursor, schema, table):
+        """Return list of column definitions (name, declared type, and
+        default value) for *table* in the given *schema*.
+        """
+        cursor.execute('PRAGMA {0}.table_info({1})'.format(schema, table))
+        definitions = []
+        for _, name, sql_type, _, default, _ in cursor.fetchall():
+            definition = cls._normalize_column(name)
+            if sql_type:
+                definition += ' ' + sql_type
+            if default is not None:
+                definition += ' DEFAULT ' + default
+            definitions.append(definition)
+        return definitions
+
     @staticmethod
     def _get_existing_tables(cursor):
         """Takes sqlite3 *cursor*, returns existing temporary table
@@ -148,17 +379,26 @@ class TemporarySqliteTable(object):
         return name
 
     @classmethod
-    def _create_table_statement(cls, table, columns):
+    def _column_definition(cls, column, dtypes=None):
+        """Return column name with its declared type (if any)."""
+        definition = cls._normalize_column(column)
+        sql_type = _normalize_dtype((dtypes or {}).get(column))
+        if sql_type:
+            definition += ' ' + sql_type
+        return definition
+
+    @classmethod
+    def _create_table_statement(cls, table, columns, dtypes=None):
         """Return 'CREATE TEMPORARY TABLE' statement."""
         cls._assert_unique(columns)
-        columns = [cls._normalize_column(x) for x in columns]
+        columns = [cls._column_definition(x, dtypes) for x in columns]
         #return 'CREATE TABLE %s (%s)' % (table, ', '.join(columns))
         return 'CREATE TEMPORARY TABLE %s (%s)' % (table, ', '.join(columns))
 
     @classmethod
-    def _create_table(cls, cursor, table, columns):
+    def _create_table(cls, cursor, table, columns, dtypes=None):
         try:
-            statement = cls._create_table_statement(table, columns)
+            statement = cls._create_table_statement(table, columns, dtypes)
             cursor.execute(statement)
         except Exception as e:
             if isinstance(e, UnicodeDecodeError):
@@ -186,6 +426,59 @@ class TemporarySqliteTable(object):
         )
         cursor.executemany(statement, data_iter)
 
+    @classmethod
+    def _insert_inferred_data(cls, cursor, table, columns, data):
+        """Insert *data* like _insert_data() but check the values of
+        INTEGER and REAL columns as they are inserted. Inferred types
+        are based on a sample of rows, so when a later value cannot be
+        stored without loss (e.g., '007' or '1e5' in an INTEGER column)
+        the column is changed to TEXT before the value is inserted.
+        """
+        data_iter = iter(data)
+        while True:
+            cursor.execute('PRAGMA temp.table_info({0})'.format(table))
+            declared = dict((x[1], x[2]) for x in cursor.fetchall())
+            checks = [(i, declared.get(col)) for i, col in enumerate(columns)]
+            checks = [(i, x) for i, x in checks if x in ('INTEGER', 'REAL')]
+            if not checks:
+                cls._insert_data(cursor, table, columns, data_iter)
+                return  # <- EXIT! No typed columns to check.
+
+            stopped = []
+            rows = _iter_checked_rows(data_iter, columns, checks, stopped)
+            cls._insert_data(cursor, table, columns, rows)
+            if not stopped:
+                return  # <- EXIT! All values were checked.
+
+            row, mismatched = stopped[0]
+            cls._change_to_text(cursor, table, mismatched)
+            data_iter = itertools.chain([row], data_iter)
+
+    @classmethod
+    def _change_to_text(cls, cursor, table, columns):
+        """Rebuild *table* with the given *columns* declared as TEXT.
+        Values already stored in these columns are converted to text
+        (REAL values use SQLite's formatting, e.g., '2' becomes '2.0').
+        """
+        cursor.execute('PRAGMA temp.table_info({0})'.format(table))
+        definitions = []
+        for _, name, sql_type, _, default, _ in cursor.fetchall():
+            definition = cls._normalize_column(name)
+            if name in columns:
+                sql_type = 'TEXT'
+            if sql_type:
+                definition += ' ' + sql_type
+            if default is not None:
+                definition += ' DEFAULT ' + default
+            definitions.append(definition)
+
+        new_table = cls._get_new_table_name(cursor)
+        statement = 'CREATE TEMPORARY TABLE {0} ({1})'
+        cursor.execute(statement.format(new_table, ', '.join(definitions)))
+        cursor.execute('INSERT INTO {0} SELECT * FROM {1}'.format(new_table, table))
+        cursor.execute('DROP TABLE {0}'.format(table))
+        cursor.execute('ALTER TABLE {0} RENAME TO {1}'.format(new_table, table))
+
     @staticmethod
     def _normalize_column(name):
         """Normalize value for use as SQLite column name."""
@@ -213,96 +506,387 @@ class TemporarySqliteTable(object):
             raise ValueError('Duplicate values: ' + ', '.join(duplicates))
 
 
+def _replace_file(source, destination):
+    """Rename *source* to *destination*, replacing *destination* if
+    it already exists.
+    """
+    try:
+        replace = os.replace
+    except AttributeError:  # New in version 3.3.
+        try:
+            os.rename(source, destination)
+        except OSError:  # On Windows, rename() fails if *destination*
+            if not os.path.exists(destination):  # exists (e.g., it was
+                raise                            # saved by another
+            os.remove(source)                    # process).
+        return  # <- EXIT!
+    replace(source, destination)
+
+
+def _save_table(connection, table, path, messages=()):
+    """Save a copy of the temporary *table* (as "data") in a new
+    SQLite database file at *path*. Any warning *messages* are saved
+    in a "warnings" table. The file is written under a temporary name
+    and renamed when complete so that other processes never see a
+    partially written file--if saving fails, the temporary file is
+    removed.
+    """
+    partial_path = '{0}.{1}.partial'.format(path, os.getpid())
+    if os.path.exists(partial_path):
+        os.remove(partial_path)
+
+    try:
+        cursor = connection.cursor()
+        cursor.execute('ATTACH DATABASE ? AS datatest_cache', (partial_path,))
+        try:
+            definitions = TemporarySqliteTable._get_column_definitions(cursor, 'temp', table)
+            with _TransactionSyncOff(connection) as cursor:
+                statement = 'CREATE TABLE datatest_cache.data ({0})'
+                cursor.execute(statement.format(', '.join(definitions)))
+                statement = 'INSERT INTO datatest_cache.data SELECT * FROM {0}'
+                cursor.execute(statement.format(table))
+                cursor.execute('CREATE TABLE datatest_cache.warnings (message TEXT)')
+                statement = 'INSERT INTO datatest_cache.warnings VALUES (?)'
+                cursor.executemany(statement, ((x,) for x in messages))
+        finally:
+            connection.cursor().execute('DETACH DATABASE datatest_cache')
+        _replace_file(partial_path, path)
+    except Exception:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+
+
+def _get_saved_warnings(path):
+    """Return the list of warning messages saved with the table in
+    the SQLite database file at *path* (see _save_table()).
+    """
+    connection = sqlite3.connect(path)
+    try:
+        cursor = connection.execute('SELECT message FROM warnings')
+        return [x[0] for x in cursor]
+    finally:
+        connection.close()
+
+
+class _TemporaryDatabaseFile(object):
+    """A path for a database file in a new temporary directory. The
+    directory (and the file) are removed when this object is garbage
+    collected.
+    """
+    def __init__(self):
+        self.directory = tempfile.mkdtemp(prefix='datatest-')
+        self.path = os.path.join(self.directory, 'data.sqlite')
+
+    def __del__(self):
+        try:
+            shutil.rmtree(self.directory, ignore_errors=True)
+        except Exception:
+            pass  # <- Modules may already be unloaded at shutdown.
+
+
 class TemporarySqliteTableForCsv(TemporarySqliteTable):
     """."""
     @classmethod
-    def _create_table_statement(cls, table, columns):
+    def _create_table_statement(cls, table, columns, dtypes=None):
         """Includes added default-to-empty-string clause for columns."""
         cls._assert_unique(columns)
-        columns = [cls._normalize_column(x) for x in columns]
+        columns = [cls._column_definition(x, dtypes) for x in columns]
         columns = ["{0} DEFAULT ''".format(col) for col in columns]
         return 'CREATE TEMPORARY TABLE %s (%s)' % (table, ', '.join(columns))
 
-    def _concatenate_data(self, data, columns):
+    def _concatenate_data(self, data, columns, dtypes=None):
         if not columns:
             columns, data = _get_columns_from_data(data)
 
+        existing_cols = self.columns
+        missing_cols = [x for x in columns if x not in existing_cols]
+        if dtypes == 'infer':
+            dtypes, data = _infer_dtypes(columns, data)
+            insert_data = self._insert_inferred_data
+        else:
+            insert_data = self._insert_data
+
         with _TransactionSyncOff(self._connection) as cursor:
-            existing_cols = self.columns
-            missing_cols = [x for x in columns if x not in existing_cols]
             for column in missing_cols:
                 statement = "ALTER TABLE {0} ADD COLUMN {1} DEFAULT ''"
+                column = self._column_definition(column, dtypes)
                 cursor.execute(statement.format(self._name, column))
 
-            self._insert_data(cursor, self._name, columns, data)
+            insert_data(cursor, self._name, columns, data)
 
 
-def _from_csv(file, encoding=None, **fmtparams):
-    """Loads one or more CSV files as a temporary SQLite table."""
-    # TODO: Need to refactor!!! Encoding fallback is included twice
-    # (copied from old CsvSource class).
+# Increment when the format of cached tables changes.
+_CACHE_VERSION = 2
 
-    if not _is_nsiterable(file):
-        file = [file]
-    files = iter(file)
 
-    first_file = next(files)
+def _get_cache_key(paths, options):
+    """Return a key (a hex digest) that identifies the given file
+    *paths* by their location, size, and modification time, plus any
+    loading *options*. Returns None if any of the paths is not a file
+    name (e.g., if it is a file-like object).
+    """
+    fingerprints = []
+    for path in paths:
+        if not isinstance(path, string_types):
+            return None  # <- EXIT!
+        stat = os.stat(path)
+        fingerprints.append((os.path.abspath(path), stat.st_size, stat.st_mtime))
+    key = repr((_CACHE_VERSION, fingerprints, options))
+    return hashlib.sha1(key.encode('utf-8')).hexdigest()
+
+
+def _load_with_cache(cache_dir, paths, options, load,
+                     table_class=TemporarySqliteTable, connection=None):
+    """Return a temporary table for the given *paths* using a cached
+    copy from *cache_dir* when one exists. Otherwise, the table is
+    created by calling *load* and a copy is saved in *cache_dir* for
+    later use. Any change to the files or *options* invalidates the
+    cached copy. Cached tables are loaded into *connection* (if
+    given).
+
+    UserWarnings issued by *load* (e.g., for an encoding fallback) are
+    saved with the cached copy and issued again whenever it is used.
+    If the cached copy cannot be saved, a warning is issued and the
+    loaded table is returned as usual.
+    """
+    key = _get_cache_key(paths, options)
+    if key is None:
+        return load()  # <- EXIT! Files cannot be identified.
 
-    #with UnicodeCsvReader(first_file, encoding, **fmtparams) as reader:
-    #    columns = next(reader)  # Header row.
-    #    temptable = TemporarySqliteTableForCsv(reader, columns)
+    cache_path = os.path.join(cache_dir, key + '.sqlite')
+    if os.path.isfile(cache_path):
+        try:
+            messages = _get_saved_warnings(cache_path)
+            temptable = table_class._from_database(cache_path, connection)
+        except sqlite3.DatabaseError:
+            pass  # Damaged or incomplete files are replaced below.
+        else:
+            for message in messages:
+                warnings.warn(message)
+            return temptable  # <- EXIT!
+
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter('always')
+        temptable = load()
+    for warning in caught:
+        warnings.warn(warning.message)  # Re-issue with current filters.
+    messages = [str(x.message) for x in caught if x.category is UserWarning]
+
+    try:
+        if not os.path.isdir(cache_dir):
+            os.makedirs(cache_dir)
+        temptable._save_database(cache_path, messages)
+    except (IOError, OSError, sqlite3.Error) as err:
+        msg = 'could not save table to cache directory {0!r}: {1}'
+        warnings.warn(msg.format(cache_dir, err))
+    return temptable
+
+
+def _get_dtypes_key(dtypes):
+    """Return a representation of *dtypes* suitable for a cache key."""
+    if isinstance(dtypes, dict):
+        return sorted((k, _normalize_dtype(v)) for k, v in dtypes.items())
+    return dtypes
+
+
+def _warn_encoding_fallback(file):
+    """Warn that *file* was decoded using the ISO-8859-1 fallback."""
+    try:
+        filename = os.path.basename(file)
+    except AttributeError:
+        filename = repr(file)
+    msg = ('\nData in file {0!r} does not appear to be encoded '
+           'as UTF-8 (used ISO-8859-1 as fallback). To assure '
+           'correct operation, please specify a text encoding.')
+    warnings.warn(msg.format(filename))
+
+
+def _read_csv(file, encoding, read, **fmtparams):
+    """Call *read* with a UnicodeCsvReader for *file* and return a
+    two-tuple containing its result and a flag indicating that the
+    ISO-8859-1 fallback was used. If *encoding* is not given, the file
+    is read as UTF-8 and, if it cannot be decoded, read again from the
+    beginning as ISO-8859-1 (so *read* can be called twice).
+    """
     if encoding:
-        with UnicodeCsvReader(first_file, encoding=encoding, **fmtparams) as reader:
-            columns = next(reader)  # Header row.
-            temptable = TemporarySqliteTableForCsv(reader, columns)
+        with UnicodeCsvReader(file, encoding=encoding, **fmtparams) as reader:
+            return read(reader), False  # <- EXIT!
+
+    try:
+        with UnicodeCsvReader(file, encoding='utf-8', **fmtparams) as reader:
+            return read(reader), False  # <- EXIT!
+    except UnicodeDecodeError:
+        pass
+
+    with UnicodeCsvReader(file, encoding='iso8859-1', **fmtparams) as reader:
+        return read(reader), True
+
+
+def _read_csv_header(args):
+    """Return the header row of a CSV file and the column types
+    inferred from its first rows (if *dtypes* is 'infer'). This is
+    the first pass of _from_csv_parallel() and is called by worker
+    processes so its argument is a single tuple of (path, encoding,
+    dtypes, fmtparams).
+    """
+    path, encoding, dtypes, fmtparams = args
+
+    def read_header(reader):
+        columns = next(reader)  # Header row.
+        if dtypes == 'infer':
+            return columns, list(itertools.islice(reader, _INFER_SAMPLE_SIZE))
+        return columns, None
+
+    (columns, sample), _ = _read_csv(path, encoding, read_header, **fmtparams)
+    if dtypes == 'infer':
+        dtypes, _ = _infer_dtypes(columns, sample)
     else:
-        try:
-            with UnicodeCsvReader(first_file, encoding='utf-8', **fmtparams) as reader:
-                columns = next(reader)  # Header row.
-                temptable = TemporarySqliteTableForCsv(reader, columns)
+        dtypes = None
+    return columns, dtypes
+
+
+def _read_csv_file(args):
+    """Save the data rows of a CSV file in a new SQLite database file
+    (as "data") and return a tuple containing the database's path, the
+    file's header row, and a flag indicating that the ISO-8859-1
+    fallback was used. Rows are inserted as they are read and columns
+    are stored without a declared type so values are kept as given.
+    This is called by worker processes so its argument is a single
+    tuple of (path, encoding, database, fmtparams).
+    """
+    path, encoding, database, fmtparams = args
 
+    def save_rows(reader):
+        connection = _new_connection(database)
+        try:
+            columns = next(reader)  # Header row.
+            TemporarySqliteTable._assert_unique(columns)
+            definitions = [TemporarySqliteTable._normalize_column(x) for x in columns]
+            with _TransactionSyncOff(connection) as cursor:
+                cursor.execute('CREATE TABLE data ({0})'.format(', '.join(definitions)))
+                TemporarySqliteTable._insert_data(cursor, 'data', columns, reader)
         except UnicodeDecodeError:
-            with UnicodeCsvReader(first_file, encoding='iso8859-1', **fmtparams) as reader:
-                columns = next(reader)  # Header row.
-                temptable = TemporarySqliteTableForCsv(reader, columns)
-
-            # Prepare message and raise as warning.
-            try:
-                filename = os.path.basename(first_file)
-            except AttributeError:
-                filename = repr(first_file)
-            msg = ('\nData in file {0!r} does not appear to be encoded '
-                   'as UTF-8 (used ISO-8859-1 as fallback). To assure '
-                   'correct operation, please specify a text encoding.')
-            warnings.warn(msg.format(filename))
-
-    for f in files:
-        #with UnicodeCsvReader(f, encoding, **fmtparams) as reader:
-        #    columns = next(reader)  # Header row.
-        #    temptable._concatenate_data(reader, columns)
-        if encoding:
-            with UnicodeCsvReader(f, encoding=encoding, **fmtparams) as reader:
-                columns = next(reader)  # Header row.
-                temptable._concatenate_data(reader, columns)
+            connection.close()
+            os.remove(database)  # Start over with the next encoding.
+            raise
+        finally:
+            connection.close()
+        return columns
+
+    columns, used_fallback = _read_csv(path, encoding, save_rows, **fmtparams)
+    return database, columns, used_fallback
+
+
+def _from_csv_parallel(files, encoding, dtypes, processes, connection=None, **fmtparams):
+    """Load CSV *files* (given by path) as a single temporary SQLite
+    table. Files are read by a pool of worker *processes* and then
+    inserted in order with a single transaction. The resulting table
+    is the same as the one made by loading files one after another.
+
+    Loading is done in two passes. First, the header rows (and the
+    rows used to infer types) are read to build the table. Then, each
+    worker saves the rows of a file in a temporary database file and
+    the rows are copied into the table as each file becomes ready (in
+    order). Rows are streamed through the database files so they are
+    never all held in memory at once.
+    """
+    import multiprocessing  # Imported here to keep module import fast.
+
+    directory = tempfile.mkdtemp(prefix='datatest-')
+    pool = multiprocessing.Pool(processes)
+    try:
+        args = [(path, encoding, dtypes, fmtparams) for path in files]
+        headers = pool.map(_read_csv_header, args)
+
+        # Build the union of all columns (in order of appearance) and the
+        # column types--a column's type comes from the file that added it.
+        columns = list(headers[0][0])
+        if dtypes == 'infer':
+            column_types = dict(headers[0][1])
         else:
-            try:
-                with UnicodeCsvReader(f, encoding='utf-8', **fmtparams) as reader:
-                    columns = next(reader)  # Header row.
-                    temptable._concatenate_data(reader, columns)
+            column_types = dtypes
+        for file_columns, file_types in headers[1:]:
+            for column in file_columns:
+                if column not in columns:
+                    columns.append(column)
+                    if file_types and column in file_types:
+                        column_types[column] = file_types[column]
+
+        temptable = TemporarySqliteTableForCsv([], columns, connection, dtypes=column_types)
+        if dtypes == 'infer':
+            insert_data = temptable._insert_inferred_data
+        else:
+            insert_data = temptable._insert_data
+
+        args = []
+        for index, path in enumerate(files):
+            database = os.path.join(directory, '{0}.sqlite'.format(index))
+            args.append((path, encoding, database, fmtparams))
+        results = pool.imap(_read_csv_file, args)
 
-            except UnicodeDecodeError:
-                with UnicodeCsvReader(f, encoding='iso8859-1', **fmtparams) as reader:
-                    columns = next(reader)  # Header row.
-                    temptable._concatenate_data(reader, columns)
+        with _TransactionSyncOff(temptable.connection) as cursor:
+            for index, (database, file_columns, used_fallback) in enumerate(results):
+                if used_fallback:
+                    _warn_encoding_fallback(files[index])
 
-                # Prepare message and raise as warning.
+                file_connection = sqlite3.connect(database)
                 try:
-                    filename = os.path.basename(f)
-                except AttributeError:
-                    filename = repr(f)
-                msg = ('\nData in file {0!r} does not appear to be encoded '
-                       'as UTF-8 (used ISO-8859-1 as fallback). To assure '
-                       'correct operation, please specify a text encoding.')
-                warnings.warn(msg.format(filename))
+                    rows = file_connection.execute('SELECT * FROM data')
+                    insert_data(cursor, temptable.name, file_columns, rows)
+                finally:
+                    file_connection.close()
+                os.remove(database)  # Release disk space once inserted.
+    finally:
+        pool.terminate()
+        pool.join()
+        shutil.rmtree(directory, ignore_errors=True)
+    return temptable
+
+
+def _from_csv(file, encoding=None, dtypes=None, cache_dir=None,
+              processes=None, connection=None, **fmtparams):
+    """Loads one or more CSV files as a temporary SQLite table. If
+    *cache_dir* is given, loaded tables are cached in that directory
+    and reused while the files remain unchanged. If *processes* is
+    given, multiple files (given by path) are read in parallel using
+    that number of worker processes. If *connection* is omitted, the
+    shared connection is used.
+    """
+    if not _is_nsiterable(file):
+        file = [file]
+
+    if cache_dir:
+        load = lambda: _from_csv(file, encoding, dtypes, None, processes,
+                                 connection, **fmtparams)
+        options = ('csv', encoding, _get_dtypes_key(dtypes), sorted(fmtparams.items()))
+        return _load_with_cache(cache_dir, file, options, load,
+                                TemporarySqliteTableForCsv, connection)  # <- EXIT!
+
+    if (processes and len(file) > 1
+            and all(isinstance(x, string_types) for x in file)):
+        return _from_csv_parallel(file, encoding, dtypes, processes,
+                                  connection, **fmtparams)  # <- EXIT!
+
+    files = iter(file)
+
+    first_file = next(files)
+
+    def make_table(reader):
+        columns = next(reader)  # Header row.
+        return TemporarySqliteTableForCsv(reader, columns, connection, dtypes)
+
+    temptable, used_fallback = _read_csv(first_file, encoding, make_table, **fmtparams)
+    if used_fallback:
+        _warn_encoding_fallback(first_file)
+
+    def concatenate(reader):
+        columns = next(reader)  # Header row.
+        temptable._concatenate_data(reader, columns, dtypes)
+
+    for f in files:
+        _, used_fallback = _read_csv(f, encoding, concatenate, **fmtparams)
+        if used_fallback:
+            _warn_encoding_fallback(f)
 
     return temptable
@@ -17,8 +17,9 @@ class DataTestProgram(_TestProgram):
     def __init__(self, module='__main__', defaultTest=None, argv=None,
                    testRunner=DataTestRunner, testLoader=_defaultTestLoader,
                    exit=True, verbosity=1, failfast=None, catchbreak=None,
-                   buffer=None, ignore=False):
+                   buffer=None, ignore=False, parallel=None):
         self.ignore = ignore
+        self.parallel = parallel
         _TestProgram.__init__(self,
                               module=module,
                               defaultTest=defaultTest,
@@ -31,6 +32,22 @@ class DataTestProgram(_TestProgram):
                               catchbreak=catchbreak,
                               buffer=buffer)
 
+    def parseArgs(self, argv):
+        """Remove the ``--parallel N`` option from *argv* (unittest's
+        own parser does not know it) then parse remaining arguments.
+        """
+        parallel, argv = _pop_parallel_option(argv)
+        if parallel is not None:
+            self.parallel = parallel
+        _TestProgram.parseArgs(self, argv)
+
+    def _getParentArgParser(self):
+        parser = _TestProgram._getParentArgParser(self)
+        parser.add_argument('--parallel', dest='parallel', type=int,
+                            metavar='N',
+                            help='Run tests in N worker processes')
+        return parser
+
     def runTests(self):
         try:
             if self.catchbreak and installHandler:
@@ -45,6 +62,8 @@ class DataTestProgram(_TestProgram):
             try:
                 kwds = ['verbosity', 'failfast', 'buffer', 'warnings', 'ignore']
                 kwds = [attr for attr in kwds if hasattr(self, attr)]
+                if getattr(self, 'parallel', None):
+                    kwds.append('parallel')
                 kwds = dict((attr, getattr(self, attr)) for attr in kwds)
                 testRunner = self.testRunner(**kwds)
             except TypeError:
@@ -60,11 +79,42 @@ class DataTestProgram(_TestProgram):
             _sys.exit(not self.result.wasSuccessful())
 
 
+def _pop_parallel_option(argv):
+    """Return a tuple containing the number of processes given with
+    the ``--parallel`` option (or None) and a copy of *argv* with the
+    option removed.
+    """
+    argv = list(argv)
+    parallel = None
+    index = 1  # <- Skip program name.
+    while index < len(argv):
+        arg = argv[index]
+        if arg == '--parallel':
+            try:
+                value = argv[index + 1]
+            except IndexError:
+                raise SystemExit('--parallel requires a number of processes')
+            del argv[index:index + 2]
+        elif arg.startswith('--parallel='):
+            value = arg[len('--parallel='):]
+            del argv[index]
+        else:
+            index += 1
+            continue
+        try:
+            parallel = int(value)
+        except ValueError:
+            raise SystemExit('--parallel requires a number of processes, '
+                             'got {0!r}'.format(value))
+    return parallel, argv
+
+
 if _sys.version_info[:2] == (3, 1):  # Patch methods for Python 3.1.
     def __init__(self, module='__main__', defaultTest=None, argv=None,
                    testRunner=DataTestRunner, testLoader=_defaultTestLoader,
-                   exit=True, ignore=False):
+                   exit=True, ignore=False, parallel=None):
         self.ignore = ignore
+        self.parallel = parallel
         _TestProgram.__init__(self,
                               module=module,
                               defaultTest=defaultTest,
@@ -77,9 +127,10 @@ if _sys.version_info[:2] == (3, 1):  # Patch methods for Python 3.1.
 elif _sys.version_info[:2] == (2, 6):  # Patch runTests() for Python 2.6.
     def __init__(self, module='__main__', defaultTest=None, argv=None,
                    testRunner=DataTestRunner, testLoader=_defaultTestLoader,
-                   exit=True, ignore=False):
+                   exit=True, ignore=False, parallel=None):
         self.exit = exit  # <- 2.6 does not handle exit argument.
         self.ignore = ignore
+        self.parallel = parallel
         _TestProgram.__init__(self,
                               module=module,
                               defaultTest=defaultTest,
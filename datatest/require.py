@@ -3,8 +3,11 @@ import difflib
 import re
 from .utils import itertools
 from .utils import collections
+from .utils import functools
 from .utils.builtins import callable
+from .utils.misc import _is_plain_number
 from .dataaccess import BaseElement
+from .dataaccess import DataQuery
 from .dataaccess import DictItems
 from .dataaccess import _is_collection_of_items
 from .errors import BaseDifference
@@ -13,10 +16,24 @@ from .errors import Missing
 from .errors import Invalid
 from .errors import Deviation
 from .errors import _make_difference
+from .errors import _make_truncated
 from .errors import NOTFOUND
 
+try:
+    import numpy as _numpy
+except ImportError:
+    _numpy = None
+
 _regex_type = type(re.compile(''))
 
+try:
+    _string_classes = (str, unicode)  # The "unicode" type was removed in 3.0.
+except NameError:
+    _string_classes = None  # Use the class of each regex pattern.
+
+# Number of items compared at a time by the NumPy comparison.
+_NUMERIC_CHUNK_SIZE = 10000
+
 
 def _deephash(obj):
     """Return a "deep hash" value for the given object. If the
@@ -56,16 +73,264 @@ def _deephash(obj):
         return hash(_hashable_proxy(obj))
 
 
+# Token used to keep the "deep hash" of an unhashable element from
+# matching a hashable element with the same hash value.
+_DEEPHASH_TOKEN = object()
+
+# Greatest edit distance searched for by the Myers comparison before
+# falling back to difflib (the search uses memory proportional to the
+# square of this distance).
+_MAX_EDIT_DISTANCE = 1000
+
+# Number of elements from each input that are held in memory when
+# an iterator is checked for sequence order.
+_SEQUENCE_WINDOW = 100000
+
+# Greatest size that a window can grow to (as a multiple of the normal
+# window size) while looking for elements that match again.
+_SEQUENCE_WINDOW_GROWTH = 4
+
+
+def _get_sequence_keys(data, sequence):
+    """Return lists of integer keys for the elements of *data* and
+    *sequence*--equal elements get the same key. Unhashable elements
+    are given keys using their "deep hash" (computed once for each
+    element).
+    """
+    keys = {}
+
+    def get_keys(iterable):
+        result = []
+        for element in iterable:
+            try:
+                key = keys.setdefault(element, len(keys))
+            except TypeError:
+                proxy = (_DEEPHASH_TOKEN, _deephash(element))
+                key = keys.setdefault(proxy, len(keys))
+            result.append(key)
+        return result
+
+    return get_keys(data), get_keys(sequence)
+
+
+def _myers_blocks(a, alo, ahi, b, blo, bhi, max_distance):
+    """Return a sorted list of (i, j, size) blocks that make up the
+    longest common subsequence of a[alo:ahi] and b[blo:bhi] using
+    the Myers diff algorithm. If the edit distance is greater than
+    *max_distance* (or if too many elements must be compared to find
+    it), None is returned.
+    """
+    n = ahi - alo
+    m = bhi - blo
+    max_d = min(n + m, max_distance)
+    budget = n + m + 2500  # Limit on element comparisons.
+    offset = max_d + 1
+    v = [0] * (2 * max_d + 3)  # Furthest reaching x for each diagonal.
+    trace = []
+    for d in range(max_d + 1):
+        trace.append(v[:])
+        for k in range(-d, d + 1, 2):
+            if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+                x = v[offset + k + 1]
+            else:
+                x = v[offset + k - 1] + 1
+            y = x - k
+            snake_start = x
+            while x < n and y < m and a[alo + x] == b[blo + y]:
+                x += 1
+                y += 1
+            v[offset + k] = x
+            if x >= n and y >= m:
+                break
+            budget -= x - snake_start + 1
+        else:
+            if budget < 0:
+                return None  # <- EXIT! Too many comparisons.
+            continue
+        break
+    else:
+        return None  # <- EXIT! Edit distance is too great.
+
+    # Walk back through the trace to collect the diagonal runs.
+    blocks = []
+    x, y = n, m
+    for d in range(len(trace) - 1, 0, -1):
+        v = trace[d]
+        k = x - y
+        if k == -d or (k != d and v[offset + k - 1] < v[offset + k + 1]):
+            prev_k = k + 1
+            prev_x = v[offset + prev_k]
+            start_x = prev_x
+        else:
+            prev_k = k - 1
+            prev_x = v[offset + prev_k]
+            start_x = prev_x + 1
+        if x > start_x:
+            size = x - start_x
+            blocks.append((alo + start_x, blo + y - size, size))
+        x, y = prev_x, prev_x - prev_k
+    if x > 0:
+        blocks.append((alo, blo, x))
+    blocks.reverse()
+    return blocks
+
+
+def _get_matching_blocks(a, b):
+    """Return a sorted list of (i, j, size) blocks where a[i:i+size]
+    equals b[j:j+size]. Common prefixes and suffixes are matched
+    directly and the remaining elements are compared with the Myers
+    algorithm. If the edit distance is greater than _MAX_EDIT_DISTANCE,
+    the whole lists are compared with difflib.SequenceMatcher instead.
+
+    The blocks make up a common subsequence of *a* and *b*. When the
+    Myers comparison is used, it is a longest common subsequence but,
+    if several alignments are possible, the blocks can differ from
+    the ones difflib.SequenceMatcher would find for the same lists.
+    """
+    alo, ahi, blo, bhi = 0, len(a), 0, len(b)
+
+    start = 0
+    limit = min(ahi, bhi)
+    while start < limit and a[start] == b[start]:
+        start += 1
+    alo = blo = start
+
+    end = 0
+    limit = min(ahi - alo, bhi - blo)
+    while end < limit and a[ahi - end - 1] == b[bhi - end - 1]:
+        end += 1
+    ahi -= end
+    bhi -= end
+
+    if alo == ahi or blo == bhi:
+        middle_blocks = []
+    else:
+        middle_blocks = _myers_blocks(a, alo, ahi, b, blo, bhi, _MAX_EDIT_DISTANCE)
+        if middle_blocks is None:
+            matcher = difflib.SequenceMatcher(a=a, b=b)
+            blocks = matcher.get_matching_blocks()
+            return [(i, j, size) for i, j, size in blocks if size]  # <- EXIT!
+
+    blocks = []
+    if start:
+        blocks.append((0, 0, start))
+    blocks.extend(middle_blocks)
+    if end:
+        blocks.append((ahi, bhi, end))
+    return blocks
+
+
+def _iter_block_differences(data, sequence, blocks, data_start=0, sequence_start=0):
+    """Yield ``((i, j), difference)`` items for the elements of *data*
+    and *sequence* that are not part of the matching *blocks* (the
+    last block must be a zero-size sentinel at the end of the matched
+    elements). The *data_start* and *sequence_start* offsets are added
+    to the index positions.
+    """
+    i1 = j1 = 0
+    for i2, j2, size in blocks:
+        shortest = min(i2 - i1, j2 - j1)
+        for k in range(shortest):
+            key = (data_start + i1 + k, sequence_start + j1 + k)
+            yield key, Invalid(data[i1 + k], sequence[j1 + k])
+        i1 += shortest
+        j1 += shortest
+
+        for i in range(i1, i2):
+            yield (data_start + i, sequence_start + j1), Extra(data[i])
+        for j in range(j1, j2):
+            yield (data_start + i1, sequence_start + j), Missing(sequence[j])
+        i1, j1 = i2 + size, j2 + size
+
+
+def _iter_sequence_differences(data, sequence, window):
+    """Compare the *data* and *sequence* iterables in windows of up to
+    *window* elements and yield ``((i, j), difference)`` items as they
+    are found. Memory use depends on the window size rather than the
+    size of the inputs.
+
+    Differences are only yielded up to the last match that leaves at
+    least a quarter window of unread elements for resynchronizing. If
+    no match is found, the windows are doubled in size (up to
+    _SEQUENCE_WINDOW_GROWTH times *window* elements) until the inputs
+    match again. If there is still no match, the first quarter of both
+    windows are reported as differences. When both inputs fit in a
+    single window, the result is the same as comparing them all at
+    once.
+    """
+    data = iter(data)
+    sequence = iter(sequence)
+    a, b = [], []
+    a_start = b_start = 0
+    a_done = b_done = False
+    margin = window // 4
+    size = window
+    max_size = window * _SEQUENCE_WINDOW_GROWTH
+    while True:
+        if not a_done:
+            a.extend(itertools.islice(data, size - len(a)))
+            a_done = len(a) < size
+        if not b_done:
+            b.extend(itertools.islice(sequence, size - len(b)))
+            b_done = len(b) < size
+
+        a_keys, b_keys = _get_sequence_keys(a, b)
+        if set(a_keys).isdisjoint(b_keys):
+            blocks = []  # <- No elements in common.
+        else:
+            blocks = _get_matching_blocks(a_keys, b_keys)
+        if a_done and b_done:
+            blocks.append((len(a), len(b), 0))  # Sentinel block.
+            for item in _iter_block_differences(a, b, blocks, a_start, b_start):
+                yield item
+            return  # <- EXIT!
+
+        a_limit = len(a) if a_done else len(a) - margin
+        b_limit = len(b) if b_done else len(b) - margin
+        committed = []
+        for i, j, block_size in blocks:
+            if i >= a_limit or j >= b_limit:
+                break
+            block_size = min(block_size, a_limit - i, b_limit - j)
+            committed.append((i, j, block_size))
+
+        if committed:
+            i, j, block_size = committed[-1]
+            a_end, b_end = i + block_size, j + block_size
+            next_size = window
+        elif size < max_size:
+            size = min(size * 2, max_size)
+            continue  # <- Could not resynchronize, read more elements.
+        else:
+            a_end = min(size // 4, len(a))  # <- Report leading elements
+            b_end = min(size // 4, len(b))  #    as differences.
+            next_size = size
+        committed.append((a_end, b_end, 0))  # Sentinel block.
+
+        for item in _iter_block_differences(a, b, committed, a_start, b_start):
+            yield item
+        del a[:a_end]
+        del b[:b_end]
+        a_start += a_end
+        b_start += b_end
+        size = max(next_size, len(a), len(b))
+
+
 def _require_sequence(data, sequence):
     """Compare *data* against a *sequence* of values. If differences
     are found, a dictionary is returned with two-tuple keys that
     contain the index positions of the difference in both the *data*
     and *sequence* objects. If no differences are found, returns None.
 
-    This function uses difflib.SequenceMatcher() which requires hashable
-    values. This said, _require_sequence() will make a best effort
-    attempt to build a "deep hash" to sort many types of unhashable
-    objects.
+    Each element is replaced by an integer key before comparing (equal
+    elements get the same key and unhashable objects are given keys
+    using a "deep hash" when possible). The keys are aligned with
+    _get_matching_blocks() and elements outside of the matching blocks
+    are reported as differences.
+
+    When *data* is an iterator (like a DataResult), it is compared in
+    windows of _SEQUENCE_WINDOW elements and the differences are
+    returned as a DictItems iterator that reads the data as needed.
     """
     data_type = getattr(data, 'evaluation_type', data.__class__)
     if issubclass(data_type, BaseElement) or \
@@ -74,35 +339,16 @@ def _require_sequence(data, sequence):
         raise ValueError(msg.format(data_type.__name__))
 
     if not isinstance(data, collections.Sequence):
-        data = tuple(data)
-
-    try:
-        matcher = difflib.SequenceMatcher(a=data, b=sequence)
-    except TypeError:  # Fall back to slower "deep hash" only if needed.
-        data_proxy = tuple(_deephash(x) for x in data)
-        sequence_proxy = tuple(_deephash(x) for x in sequence)
-        matcher = difflib.SequenceMatcher(a=data_proxy, b=sequence_proxy)
-
-    differences = {}
-    def append_diff(i1, i2, j1, j2):
-        if j1 == j2:
-            for i in range(i1, i2):
-                differences[(i, j1)] = Extra(data[i])
-        elif i1 == i2:
-            for j in range(j1, j2):
-                differences[(i1, j)] = Missing(sequence[j])
-        else:
-            shortest = min(i2 - i1, j2 - j1)
-            for i, j in zip(range(i1, i1+shortest), range(j1, j1+shortest)):
-                differences[(i, j)] = Invalid(data[i], sequence[j])
-
-            if (i1 + shortest != i2) or (j1 + shortest != j2):
-                append_diff(i1+shortest, i2, j1+shortest, j2)
-
-    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
-        if tag != 'equal':
-            append_diff(i1, i2, j1, j2)
+        differences = _iter_sequence_differences(data, sequence, _SEQUENCE_WINDOW)
+        first_item = next(differences, None)
+        if first_item is None:
+            return None  # <- EXIT!
+        return DictItems(itertools.chain([first_item], differences))  # <- EXIT!
 
+    data_keys, sequence_keys = _get_sequence_keys(data, sequence)
+    blocks = _get_matching_blocks(data_keys, sequence_keys)
+    blocks.append((len(data), len(sequence), 0))  # Sentinel block.
+    differences = dict(_iter_block_differences(data, sequence, blocks))
     return differences or None
 
 
@@ -110,18 +356,22 @@ def _require_set(data, requirement_set):
     """Compare *data* against a *requirement_set* of values."""
     if data is NOTFOUND:
         data = []
+    elif isinstance(data, DataQuery):
+        compared = data._compare_set(requirement_set)
+        if compared is None:
+            data = data()  # <- Evaluate query in Python.
+        else:
+            matching_elements, extra_elements = compared
+            missing_elements = requirement_set.difference(matching_elements)
+            data = None
     elif isinstance(data, BaseElement):
         data = [data]
 
-    matching_elements = set()
-    extra_elements = set()
-    for element in data:
-        if element in requirement_set:
-            matching_elements.add(element)
-        else:
-            extra_elements.add(element)
-
-    missing_elements = requirement_set.difference(matching_elements)
+    if data is not None:
+        if not isinstance(data, (set, frozenset)):
+            data = set(data)
+        extra_elements = data.difference(requirement_set)
+        missing_elements = requirement_set.difference(data)
 
     if extra_elements or missing_elements:
         missing = (Missing(x) for x in missing_elements)
@@ -130,38 +380,261 @@ def _require_set(data, requirement_set):
     return None
 
 
-def _require_callable(data, function):
-    if data is NOTFOUND:
-        return Invalid(None)  # <- EXIT!
+class parallel(object):
+    """parallel(requirement, workers=None, chunksize=1000)
 
-    def wrapped(element):
-        try:
-            if isinstance(element, BaseElement):
-                returned_value = function(element)
-            else:
-                returned_value = function(*element)
-        except Exception:
-            returned_value = False  # Raised errors count as False.
+    Wrap a callable *requirement* so that it is applied to the data
+    using a pool of *workers* processes (defaults to the number of
+    CPUs). Elements are sent to the workers in chunks of *chunksize*
+    and differences are returned in the same order as the data::
+
+        def valid_checksum(x):
+            ...
 
+        self.assertValid(data, parallel(valid_checksum, workers=8))
+
+    The *requirement* works the same as any other callable requirement
+    (it should return True, False, or a difference). When worker
+    processes are not started with fork() (e.g., on Windows), the
+    *requirement* must be picklable. Data elements and differences are
+    always pickled when they are passed between processes. Data with
+    no more than *chunksize* elements is checked without starting any
+    worker processes. Data is also checked without worker processes
+    when the test itself runs in a daemonic process (like the workers
+    used by DataTestRunner's *parallel* option) because these are not
+    allowed to start processes of their own.
+    """
+    def __init__(self, requirement, workers=None, chunksize=1000):
+        if not callable(requirement):
+            msg = 'requirement must be callable, got {0!r}'
+            raise TypeError(msg.format(requirement.__class__.__name__))
+        if chunksize < 1:
+            raise ValueError('chunksize must be a positive integer')
+        self.requirement = requirement
+        self.workers = workers
+        self.chunksize = chunksize
+
+    @property
+    def __name__(self):
+        requirement = self.requirement
+        return getattr(requirement, '__name__', requirement.__class__.__name__)
+
+    def __call__(self, *args):
+        return self.requirement(*args)
+
+    def __repr__(self):
+        return '{0}({1!r}, workers={2!r}, chunksize={3!r})'.format(
+            self.__class__.__name__, self.requirement, self.workers, self.chunksize)
+
+
+class batch(object):
+    """batch(requirement, chunksize=10000)
+
+    Mark a callable *requirement* as accepting a list of elements
+    rather than a single element. The data is passed to the
+    *requirement* in lists of up to *chunksize* elements and the
+    *requirement* should return a sequence of the same length (a
+    list or a NumPy array) with a result for each element--True,
+    False, or a difference::
+
+        @batch
+        def is_digits(values):
+            return [x.isdigit() for x in values]
+
+        self.assertValid(data, is_digits)
+
+    Since the function is only called once for each chunk, it can
+    use bulk operations (like NumPy functions) to check many
+    elements at once. A custom *chunksize* can be given when using
+    it as a decorator::
+
+        @batch(chunksize=50000)
+        def is_positive(values):
+            return numpy.array(values) > 0
+
+    Unlike other callable requirements, elements that are tuples are
+    passed to the *requirement* as-is (they are not unpacked into
+    separate arguments).
+    """
+    def __new__(cls, requirement=None, chunksize=10000):
+        if requirement is None:  # Used as decorator with arguments.
+            return functools.partial(cls, chunksize=chunksize)
+        return super(batch, cls).__new__(cls)
+
+    def __init__(self, requirement, chunksize=10000):
+        if not callable(requirement):
+            msg = 'requirement must be callable, got {0!r}'
+            raise TypeError(msg.format(requirement.__class__.__name__))
+        if chunksize < 1:
+            raise ValueError('chunksize must be a positive integer')
+        self.requirement = requirement
+        self.chunksize = chunksize
+
+    @property
+    def __name__(self):
+        requirement = self.requirement
+        return getattr(requirement, '__name__', requirement.__class__.__name__)
+
+    def __call__(self, elements):
+        return self.requirement(elements)
+
+    def __reduce__(self):
+        # Needed for copy and pickle since __new__() returns a
+        # partial object when *requirement* is omitted.
+        return (self.__class__, (self.requirement, self.chunksize))
+
+    def __repr__(self):
+        return '{0}({1!r}, chunksize={2!r})'.format(
+            self.__class__.__name__, self.requirement, self.chunksize)
+
+
+def _get_batch_differences(requirement, chunk):
+    """Return a list of differences for a *chunk* of elements checked
+    by a batch *requirement*.
+    """
+    results = requirement(chunk)
+    if len(results) != len(chunk):
+        message = '{0!r} returned {1} results for {2} elements'
+        raise ValueError(message.format(requirement.__name__, len(results), len(chunk)))
+
+    if (_numpy is not None
+            and isinstance(results, _numpy.ndarray)
+            and results.dtype == bool):
+        return [Invalid(chunk[int(i)]) for i in _numpy.flatnonzero(~results)]  # <- EXIT!
+
+    differences = []
+    for element, returned_value in zip(chunk, results):
         if returned_value == True:
-            return None  # <- EXIT!
+            continue
 
         if returned_value == False:
-            return Invalid(element)  # <- EXIT!
+            differences.append(Invalid(element))
+        elif isinstance(returned_value, BaseDifference):
+            differences.append(returned_value)
+        else:
+            message = ('{0!r} returned {1!r} for an element, should return '
+                       'True, False or a difference instance')
+            raise TypeError(message.format(requirement.__name__, returned_value))
+    return differences
 
-        if isinstance(returned_value, BaseDifference):
-            return returned_value  # <- EXIT!
 
-        callable_name = function.__name__
-        message = \
-            '{0!r} returned {1!r}, should return True, False or a difference instance'
-        raise TypeError(message.format(callable_name, returned_value))
+def _iter_batch_differences(data, requirement):
+    """Pass *data* to a batch *requirement* in chunks and yield the
+    differences in data order.
+    """
+    data = iter(data)
+    chunksize = requirement.chunksize
+    chunks = iter(lambda: list(itertools.islice(data, chunksize)), [])
+    for chunk in chunks:
+        for diff in _get_batch_differences(requirement, chunk):
+            yield diff
 
-    if isinstance(data, BaseElement):
-        return wrapped(data)  # <- EXIT!
 
-    results = (wrapped(elem) for elem in data)
-    diffs = (diff for diff in results if diff)
+def _apply_callable(function, element):
+    """Return a difference if *element* does not satisfy *function*,
+    otherwise return None.
+    """
+    try:
+        if isinstance(element, BaseElement):
+            returned_value = function(element)
+        else:
+            returned_value = function(*element)
+    except Exception:
+        returned_value = False  # Raised errors count as False.
+
+    if returned_value == True:
+        return None  # <- EXIT!
+
+    if returned_value == False:
+        return Invalid(element)  # <- EXIT!
+
+    if isinstance(returned_value, BaseDifference):
+        return returned_value  # <- EXIT!
+
+    callable_name = function.__name__
+    message = \
+        '{0!r} returned {1!r}, should return True, False or a difference instance'
+    raise TypeError(message.format(callable_name, returned_value))
+
+
+# The requirement used by a worker process (set when the process is
+# started by _init_callable_worker()).
+_worker_function = None
+
+
+def _init_callable_worker(function):
+    global _worker_function
+    _worker_function = function
+
+
+def _apply_callable_to_chunk(chunk):
+    """Return a list of differences for a *chunk* of elements. This
+    function is called in worker processes.
+    """
+    function = _worker_function
+    results = (_apply_callable(function, element) for element in chunk)
+    return [diff for diff in results if diff]
+
+
+def _iter_parallel_differences(data, requirement):
+    """Apply a parallel *requirement* to chunks of *data* in worker
+    processes and yield differences in data order. No more than two
+    chunks per worker are read ahead of the differences being used.
+    """
+    function = requirement.requirement
+    data = iter(data)
+    chunksize = requirement.chunksize
+    chunks = iter(lambda: list(itertools.islice(data, chunksize)), [])
+
+    import multiprocessing  # Imported here to keep module import fast.
+
+    first_chunk = next(chunks, [])
+    second_chunk = next(chunks, None)
+    if second_chunk is None or multiprocessing.current_process().daemon:
+        # Data is too small to be worth a pool or this is a daemonic
+        # process (which can not start child processes).
+        elements = itertools.chain(first_chunk, second_chunk or [], data)
+        for element in elements:
+            diff = _apply_callable(function, element)
+            if diff:
+                yield diff
+        return  # <- EXIT!
+
+    workers = requirement.workers or multiprocessing.cpu_count()
+    pool = multiprocessing.Pool(workers, _init_callable_worker, (function,))
+    try:
+        chunks = itertools.chain([first_chunk, second_chunk], chunks)
+        window = workers * 2  # <- Limits chunks read ahead.
+        pending = []
+        for chunk in chunks:
+            pending.append(pool.apply_async(_apply_callable_to_chunk, (chunk,)))
+            if len(pending) >= window:
+                for diff in pending.pop(0).get():
+                    yield diff
+        while pending:
+            for diff in pending.pop(0).get():
+                yield diff
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+def _require_callable(data, function):
+    if data is NOTFOUND:
+        return Invalid(None)  # <- EXIT!
+
+    if isinstance(function, batch):
+        if isinstance(data, BaseElement):
+            diffs = _get_batch_differences(function, [data])
+            return diffs[0] if diffs else None  # <- EXIT!
+        diffs = _iter_batch_differences(data, function)
+    elif isinstance(data, BaseElement):
+        return _apply_callable(function, data)  # <- EXIT!
+    elif isinstance(function, parallel):
+        diffs = _iter_parallel_differences(data, function)
+    else:
+        results = (_apply_callable(function, elem) for elem in data)
+        diffs = (diff for diff in results if diff)
     first_element = next(diffs, None)
     if first_element:
         return itertools.chain([first_element], diffs)  # <- EXIT!
@@ -169,9 +642,50 @@ def _require_callable(data, function):
 
 
 def _require_regex(data, regex):
+    """Compare *data* against a compiled *regex*, elements that do not
+    contain a match are Invalid. Strings are searched in a tight loop
+    and other elements are handled the same as other callable
+    requirements. When *data* is a DataQuery, the search is made inside
+    the data source when possible.
+    """
+    if data is NOTFOUND:
+        return Invalid(None)  # <- EXIT!
+
     search = regex.search  # Assign locally to minimize dot-lookups.
-    func = lambda element: search(element) is not None
-    return _require_callable(data, func)
+    def matches(element):
+        try:
+            if isinstance(element, BaseElement):
+                return search(element) is not None
+            return search(*element) is not None
+        except Exception:
+            return False  # Raised errors count as False.
+
+    if isinstance(data, DataQuery):
+        mismatches = data._find_regex_mismatches(regex)
+        if mismatches is not None:
+            diffs = (Invalid(element) for element in mismatches)
+            first_element = next(diffs, None)
+            if first_element:
+                return itertools.chain([first_element], diffs)  # <- EXIT!
+            return None  # <- EXIT!
+        data = data()  # <- Evaluate query in Python.
+    elif isinstance(data, BaseElement):
+        return None if matches(data) else Invalid(data)  # <- EXIT!
+
+    string_classes = _string_classes or (regex.pattern.__class__,)
+    def iter_invalid(data):
+        for element in data:
+            if element.__class__ in string_classes:
+                if search(element) is None:
+                    yield Invalid(element)
+            elif not matches(element):
+                yield Invalid(element)
+
+    diffs = iter_invalid(data)
+    first_element = next(diffs, None)
+    if first_element:
+        return itertools.chain([first_element], diffs)  # <- EXIT!
+    return None
 
 
 def _require_equality(data, other):
@@ -234,7 +748,67 @@ def _get_msg_and_func(data, requirement):
     return 'does not equal {0!r}'.format(requirement), _require_equality
 
 
-def _apply_mapping_requirement(data, mapping):
+def _as_list(diffs, max_differences=None):
+    """Return *diffs* as a list (single differences are returned
+    unchanged). If *max_differences* is given, no more than one
+    difference past this limit is consumed.
+    """
+    if isinstance(diffs, BaseElement):
+        return diffs
+    if max_differences is not None:
+        return list(itertools.islice(diffs, max_differences + 1))
+    return list(diffs)
+
+
+def _apply_numeric_mapping_requirement(data_items, mapping, data_keys):
+    """Compare key-value *data_items* against *mapping*, comparing
+    plain numbers in chunks with NumPy arrays. Other values are
+    compared with the normal require-functions. Keys are added to the
+    set of *data_keys* and unequal items are yielded in data order.
+    """
+    results = []   # List of key-difference pairs.
+    numeric = []   # List of positions in results to compare with NumPy.
+    actual_values = []
+    expected_values = []
+
+    def compare_numeric():
+        actual_array = _numpy.array(actual_values, dtype=float)
+        expected_array = _numpy.array(expected_values, dtype=float)
+        for i in _numpy.flatnonzero(actual_array != expected_array):
+            i = int(i)
+            key = results[numeric[i]][0]
+            diff = _make_difference(actual_values[i], expected_values[i])
+            results[numeric[i]] = (key, diff)
+
+    for key, actual in data_items:
+        data_keys.add(key)
+        expected = mapping.get(key, NOTFOUND)
+        if _is_plain_number(actual) and _is_plain_number(expected):
+            numeric.append(len(results))
+            results.append((key, None))
+            actual_values.append(actual)
+            expected_values.append(expected)
+        else:
+            _, require_func = _get_msg_and_func(actual, expected)
+            diff = require_func(actual, expected)
+            results.append((key, _as_list(diff) if diff else None))
+
+        if len(results) >= _NUMERIC_CHUNK_SIZE:
+            if numeric:
+                compare_numeric()
+            for key, diff in results:
+                if diff:
+                    yield key, diff
+            del results[:], numeric[:], actual_values[:], expected_values[:]
+
+    if numeric:
+        compare_numeric()
+    for key, diff in results:
+        if diff:
+            yield key, diff
+
+
+def _apply_mapping_requirement(data, mapping, max_differences=None):
     if isinstance(data, collections.Mapping):
         data_items = getattr(data, 'iteritems', data.items)()
     elif _is_collection_of_items(data):
@@ -243,25 +817,25 @@ def _apply_mapping_requirement(data, mapping):
         raise TypeError('data must be mapping or iterable of key-value items')
 
     data_keys = set()
-    for key, actual in data_items:
-        data_keys.add(key)
-        expected = mapping.get(key, NOTFOUND)
+    if _numpy is not None and max_differences is None:
+        for item in _apply_numeric_mapping_requirement(data_items, mapping, data_keys):
+            yield item
+    else:
+        for key, actual in data_items:
+            data_keys.add(key)
+            expected = mapping.get(key, NOTFOUND)
 
-        _, require_func = _get_msg_and_func(actual, expected)
-        diff = require_func(actual, expected)
-        if diff:
-            if not isinstance(diff, BaseElement):
-                diff = list(diff)
-            yield key, diff
+            _, require_func = _get_msg_and_func(actual, expected)
+            diff = require_func(actual, expected)
+            if diff:
+                yield key, _as_list(diff, max_differences)
 
     mapping_items = getattr(mapping, 'iteritems', mapping.items)()
     for key, expected in mapping_items:
         if key not in data_keys:
-            _, require_func = _get_msg_and_func(actual, expected)
+            _, require_func = _get_msg_and_func(NOTFOUND, expected)
             diff = require_func(NOTFOUND, expected)
-            if not isinstance(diff, BaseElement):
-                diff = list(diff)
-            yield key, diff
+            yield key, _as_list(diff, max_differences)
 
 
 def _normalize_mapping_result(result):
@@ -275,18 +849,58 @@ def _normalize_mapping_result(result):
     return None
 
 
-def _get_difference_info(data, requirement):
-    """Return iterable of differences or None."""
+def _truncate_differences(diffs, max_differences):
+    """Return the given differences limited to *max_differences*. If
+    the limit is exceeded, the remaining differences are not consumed
+    and a truncated container (see ValidationError.truncated) is
+    returned instead.
+    """
+    if isinstance(diffs, collections.Mapping):
+        diffs = DictItems(diffs)
+
+    if isinstance(diffs, DictItems):
+        items = []
+        count = 0
+        for key, value in diffs:
+            if isinstance(value, BaseElement):
+                count += 1
+                if count > max_differences:
+                    return _make_truncated(dict(items))  # <- EXIT!
+            else:
+                remaining = max_differences - count
+                count += len(value)
+                if count > max_differences:
+                    if remaining:
+                        items.append((key, value[:remaining]))
+                    return _make_truncated(dict(items))  # <- EXIT!
+            items.append((key, value))
+        return DictItems(items)
+
+    sample = list(itertools.islice(diffs, max_differences + 1))
+    if len(sample) > max_differences:
+        return _make_truncated(sample[:max_differences])
+    return sample
+
+
+def _get_difference_info(data, requirement, max_differences=None):
+    """Return iterable of differences or None.
+
+    If *max_differences* is given, data is only consumed until
+    the number of differences exceeds this limit and a truncated
+    sample of the differences is returned.
+    """
+    if max_differences is not None and max_differences < 1:
+        raise ValueError('max_differences must be a positive integer or None')
+
     if isinstance(requirement, collections.Mapping):
         default_msg = 'does not satisfy mapping requirement'
-        diffs = _apply_mapping_requirement(data, requirement)
+        diffs = _apply_mapping_requirement(data, requirement, max_differences)
         diffs = _normalize_mapping_result(diffs)
     elif isinstance(data, collections.Mapping):
         default_msg, require_func = _get_msg_and_func(data, requirement)
         items = getattr(data, 'iteritems', data.items)()
         diffs = ((k, require_func(v, requirement)) for k, v in items)
-        iter_to_list = lambda x: x if isinstance(x, BaseElement) else list(x)
-        diffs = ((k, iter_to_list(v)) for k, v in diffs if v)
+        diffs = ((k, _as_list(v, max_differences)) for k, v in diffs if v)
         diffs = _normalize_mapping_result(diffs)
     else:
         default_msg, require_func = _get_msg_and_func(data, requirement)
@@ -296,4 +910,7 @@ def _get_difference_info(data, requirement):
 
     if not diffs:
         return None
+
+    if max_differences is not None:
+        diffs = _truncate_differences(diffs, max_differences)
     return (default_msg, diffs)
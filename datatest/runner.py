@@ -1,10 +1,15 @@
 """Running tests"""
+import errno
 import inspect
+import multiprocessing
+import multiprocessing.util
 import os
 import re
 import sys
+import threading
 import unittest
 import warnings
+import weakref
 
 from .utils import functools
 from .errors import ValidationError
@@ -133,12 +138,19 @@ class DataTestResult(TextTestResult):
 
         return (exctype, value, tb)
 
+    def _exc_info_to_string(self, err, test):
+        """Return formatted traceback text for *err*."""
+        if isinstance(err[1], _RemoteError):
+            return err[1].text  # <- EXIT! Already formatted by worker.
+        return TextTestResult._exc_info_to_string(self, err, test)
+
     def addError(self, test, err):
         """Called when an error has occurred. 'err' is a tuple of values as
         returned by sys.exc_info().
         """
         if self._is_mandatory(test):
-            err = self._add_mandatory_message(err)
+            if not isinstance(err[1], _RemoteError):
+                err = self._add_mandatory_message(err)
             self.stop()  # <- sets "self.shouldStop = True
 
         TextTestResult.addError(self, test, err)
@@ -154,7 +166,8 @@ class DataTestResult(TextTestResult):
             err = (exctype, value, tb)        # Repack tuple.
 
         if self._is_mandatory(test):
-            err = self._add_mandatory_message(err)
+            if not isinstance(err[1], _RemoteError):
+                err = self._add_mandatory_message(err)
             self.stop()  # <- sets "self.shouldStop = True
 
         TextTestResult.addFailure(self, test, err)
@@ -168,6 +181,385 @@ class DataTestResult(TextTestResult):
                 self.stop()  # <- sets "self.shouldStop = True
 
 
+class _RemoteError(Exception):
+    """An error that was raised and formatted in a worker process.
+    Only the formatted traceback *text* is sent back to the parent
+    process (tracebacks themselves cannot be pickled).
+    """
+    def __init__(self, text):
+        self.text = text
+        Exception.__init__(self, text)
+
+
+class _RemoteFailure(_RemoteError, AssertionError):
+    """A test failure that was raised in a worker process."""
+
+
+class _RemoteTestDescription(object):
+    """Stands in for a test object that only exists in a worker process
+    (like a subtest or a class fixture error holder).
+    """
+    def __init__(self, description):
+        self.description = description
+
+    def id(self):
+        return self.description
+
+    def shortDescription(self):
+        return None
+
+    def __str__(self):
+        return self.description
+
+
+class _NullStream(object):
+    """A stream that discards everything written to it."""
+    def write(self, *args):
+        pass
+
+    def writeln(self, *args):
+        pass
+
+    def flush(self):
+        pass
+
+
+class _WorkerResult(DataTestResult):
+    """A result class that runs in a worker process and records each
+    outcome as a picklable event. The events are replayed on the main
+    process's DataTestResult with _replay_events().
+    """
+    def __init__(self, indexes, verbosity=0, ignore=False):
+        DataTestResult.__init__(self, _NullStream(), False, verbosity, ignore)
+        self._indexes = indexes  # <- Maps id() of each test to its index.
+        self.events = []
+
+    def _record(self, method_name, test, *args):
+        index = self._indexes.get(id(test))
+        if index is None:
+            args = (str(test),) + args  # <- Description is sent instead.
+        self.events.append((method_name, index, args))
+
+    def startTest(self, test):
+        DataTestResult.startTest(self, test)
+        self._record('startTest', test)
+
+    def stopTest(self, test):
+        DataTestResult.stopTest(self, test)
+        self._record('stopTest', test)
+
+    def addSuccess(self, test):
+        DataTestResult.addSuccess(self, test)
+        self._record('addSuccess', test)
+
+    def addError(self, test, err):
+        DataTestResult.addError(self, test, err)
+        self._record('addError', test, self.errors[-1][1])
+
+    def addFailure(self, test, err):
+        DataTestResult.addFailure(self, test, err)
+        self._record('addFailure', test, self.failures[-1][1])
+
+    def addSkip(self, test, reason):
+        DataTestResult.addSkip(self, test, reason)
+        self._record('addSkip', test, reason)
+
+    def addExpectedFailure(self, test, err):
+        DataTestResult.addExpectedFailure(self, test, err)
+        self._record('addExpectedFailure', test, self.expectedFailures[-1][1])
+
+    def addUnexpectedSuccess(self, test):
+        DataTestResult.addUnexpectedSuccess(self, test)
+        self._record('addUnexpectedSuccess', test)
+
+    def addSubTest(self, test, subtest, err):
+        failure_count = len(self.failures)
+        DataTestResult.addSubTest(self, test, subtest, err)
+        if err is None:
+            return  # <- EXIT! Passing subtests are not reported.
+
+        is_failure = len(self.failures) > failure_count
+        text = (self.failures if is_failure else self.errors)[-1][1]
+        self._record('addSubTest', test, str(subtest), is_failure, text)
+
+
+def _replay_events(result, tests, events):
+    """Replay events recorded by a _WorkerResult on the given *result*."""
+    for method_name, index, args in events:
+        if index is None:
+            test = _RemoteTestDescription(args[0])
+            args = args[1:]
+        else:
+            test = tests[index]
+
+        if method_name in ('addError', 'addExpectedFailure'):
+            args = ((_RemoteError, _RemoteError(args[0]), None),)
+        elif method_name == 'addFailure':
+            args = ((_RemoteFailure, _RemoteFailure(args[0]), None),)
+        elif method_name == 'addSubTest':
+            description, is_failure, text = args
+            exctype = _RemoteFailure if is_failure else _RemoteError
+            args = (_RemoteTestDescription(description),
+                    (exctype, exctype(text), None))
+        getattr(result, method_name)(test, *args)
+
+
+# Tests and options for the current parallel run. These are assigned
+# before the worker processes are forked so that the test objects
+# themselves never need to be pickled--workers receive only indexes.
+_parallel_tests = None
+_parallel_options = None
+
+# Shared array with an item for each unit of the current parallel run.
+# A worker sets its unit's item to its process id when it starts the
+# unit and to the negative of its process id when the unit finishes.
+_parallel_started = None
+
+# Shared flag that is set when the result is stopped. Workers skip any
+# units that were dispatched before the flag was set.
+_parallel_stopped = None
+
+# Queue used by workers to send the events recorded while tearing down
+# their remaining fixtures (as they exit) to the main process.
+_parallel_teardowns = None
+
+# The result used by the current worker process for all of its units.
+_worker_result = None
+
+
+def _get_worker_result():
+    """Return the result object for the current worker process. The
+    same result is used for every unit the worker runs so unittest
+    keeps track of the active module and class--setUpModule() is only
+    called when the worker starts on a new module. Fixtures that are
+    still active are torn down when the worker exits.
+    """
+    global _worker_result
+    if _worker_result is None:
+        options = _parallel_options
+        result = _WorkerResult(options['indexes'],
+                               options['verbosity'],
+                               options['ignore'])
+        result.failfast = options['failfast']
+        result.buffer = options['buffer']
+        result._testRunEntered = True  # <- Suites will not tear down fixtures.
+        multiprocessing.util.Finalize(None, _finish_worker, exitpriority=10)
+        _worker_result = result
+    return _worker_result
+
+
+def _finish_worker():
+    """Tear down the fixtures that are still active in the current
+    worker process and send the recorded events to the main process.
+    """
+    result = _worker_result
+    result.events = []
+    result.shouldStop = False
+    result._testRunEntered = False
+    unittest.TestSuite()(result)  # <- Top-level run tears down fixtures.
+    _parallel_teardowns.put(result.events)
+
+
+def _run_parallel_unit(number, unit):
+    """Run the tests at the indexes given in *unit* (the unit at
+    position *number*) in a worker process and return the recorded
+    events.
+    """
+    _parallel_started[number] = os.getpid()
+    if _parallel_stopped.value:
+        return []  # <- EXIT! The result was stopped.
+    result = _get_worker_result()
+    result.events = []
+    result.shouldStop = False
+    suite = unittest.TestSuite([_parallel_tests[i] for i in unit])
+    suite(result)
+    _parallel_started[number] = -os.getpid()
+    return result.events
+
+
+def _collect_events(queue, collected):
+    """Append the events received from *queue* to the *collected*
+    list until None is received.
+    """
+    while True:
+        events = queue.get()
+        if events is None:
+            return  # <- EXIT!
+        collected.append(events)
+
+
+def _is_process_alive(pid):
+    """Return True if a process with the given *pid* is running."""
+    try:
+        os.kill(pid, 0)  # <- Signal 0 only checks that the process exists.
+    except OSError as err:
+        return err.errno == errno.EPERM
+    return True
+
+
+def _report_lost_unit(result, tests, unit, pid):
+    """Report each test in *unit* as an error on the given *result*
+    after the worker process running the unit has died.
+    """
+    text = ('worker process {0} exited unexpectedly while running this '
+            'test (or another test in the same class)').format(pid)
+    for index in unit:
+        test = tests[index]
+        result.startTest(test)
+        result.addError(test, (_RemoteError, _RemoteError(text), None))
+        result.stopTest(test)
+
+
+def _discard_lost_result(async_result):
+    """Mark the result of a unit whose worker process has died as
+    ready. A pool waits for all outstanding results before it lets
+    its workers exit, so this is needed to close the pool normally
+    (there is no public method for this, ApplyResult._set() is used).
+    """
+    error = _RemoteError('worker process exited unexpectedly')
+    async_result._set(0, (False, error))
+
+
+def _get_fork_context():
+    """Return a multiprocessing context that starts workers with
+    fork() or None if fork() is not supported on this platform.
+    """
+    if not hasattr(os, 'fork'):
+        return None
+    try:
+        return multiprocessing.get_context('fork')
+    except AttributeError:
+        return multiprocessing  # <- Python 2 always uses fork().
+    except ValueError:
+        return None
+
+
+class _ParallelSuite(object):
+    """A callable that runs tests in worker processes and merges their
+    outcomes into a single result. Tests are dispatched in units of
+    consecutive tests from the same class (so class fixtures run once
+    per unit) and outcomes are merged in the original test order.
+    Module fixtures run once per worker process--setUpModule() is
+    called before a worker's first test from a module and
+    tearDownModule() is called when the worker moves on to another
+    module or exits. When the result is stopped (because a mandatory
+    test failed or failfast is set), no further units are dispatched.
+
+    Units that contain a mandatory test are barriers--they are only
+    dispatched after all earlier units have finished and no later
+    units are dispatched until their outcomes are known.
+
+    If a worker process dies while running a unit (e.g., it crashes
+    or is killed), the unit's tests are reported as errors and the
+    remaining units continue to run.
+    """
+    _poll_interval = 0.1  # <- Seconds between checks for dead workers.
+
+    def __init__(self, tests, processes, verbosity=1, ignore=False):
+        self._tests = list(tests)
+        self._processes = processes
+        self._verbosity = verbosity
+        self._ignore = ignore
+
+    def _get_units(self):
+        units = []
+        previous_class = None
+        for index, test in enumerate(self._tests):
+            if units and test.__class__ is previous_class:
+                units[-1].append(index)
+            else:
+                units.append([index])
+            previous_class = test.__class__
+        return units
+
+    def _is_mandatory_unit(self, result, unit):
+        """Return True if *unit* contains a mandatory test."""
+        is_mandatory = getattr(result, '_is_mandatory', None)
+        if is_mandatory is None:
+            return False  # <- EXIT! Result does not support mandatory tests.
+        return any(is_mandatory(self._tests[i]) for i in unit)
+
+    def _get_events(self, number, async_result):
+        """Return a tuple of (events, None) for the unit at position
+        *number* or (None, pid) if the worker process running the unit
+        has died.
+        """
+        while not async_result.ready():
+            async_result.wait(self._poll_interval)
+            pid = _parallel_started[number]
+            if pid > 0 and not async_result.ready() and not _is_process_alive(pid):
+                return None, pid  # <- EXIT! Unit was lost.
+        return async_result.get(), None
+
+    def countTestCases(self):
+        return len(self._tests)
+
+    def __call__(self, result):
+        global _parallel_tests
+        global _parallel_options
+        global _parallel_started
+        global _parallel_stopped
+        global _parallel_teardowns
+
+        _parallel_tests = self._tests
+        _parallel_options = {
+            'indexes': dict((id(test), i) for i, test in enumerate(self._tests)),
+            'verbosity': self._verbosity,
+            'ignore': self._ignore,
+            'failfast': getattr(result, 'failfast', False),
+            'buffer': getattr(result, 'buffer', False),
+        }
+        units = [(number, unit, self._is_mandatory_unit(result, unit))
+                 for number, unit in enumerate(self._get_units())]
+        units.reverse()  # <- Reversed so units can be popped in order.
+        window = self._processes * 2  # <- Limits units dispatched ahead.
+        context = _get_fork_context()
+        _parallel_started = context.Array('l', len(units), lock=False)
+        _parallel_stopped = context.Value('b', 0, lock=False)
+        _parallel_teardowns = context.Queue()
+        teardowns = []
+        collector = threading.Thread(target=_collect_events,
+                                     args=(_parallel_teardowns, teardowns))
+        collector.daemon = True
+        collector.start()
+        pool = context.Pool(self._processes)
+        try:
+            pending = []
+            while units or pending:
+                while units and len(pending) < window:
+                    if pending and (pending[-1][3] or units[-1][2]):
+                        break  # <- Mandatory units run alone.
+                    number, unit, is_barrier = units.pop()
+                    async_result = pool.apply_async(_run_parallel_unit, (number, unit))
+                    pending.append((number, unit, async_result, is_barrier))
+                number, unit, async_result, _ = pending.pop(0)
+                events, pid = self._get_events(number, async_result)
+                if events is None:
+                    _report_lost_unit(result, self._tests, unit, pid)
+                    _discard_lost_result(async_result)
+                else:
+                    _replay_events(result, self._tests, events)
+                if result.shouldStop:
+                    _parallel_stopped.value = 1
+                    break  # <- Stop dispatching remaining units.
+            pool.close()
+            pool.join()  # <- Workers tear down their fixtures as they exit.
+        finally:
+            pool.terminate()
+            pool.join()
+            _parallel_teardowns.put(None)
+            collector.join()
+            _parallel_tests = None
+            _parallel_options = None
+            _parallel_started = None
+            _parallel_stopped = None
+            _parallel_teardowns = None
+
+        for events in teardowns:
+            _replay_events(result, self._tests, events)
+        return result
+
+
 class HideInternalStackFrames(object):
     """Wrapper for traceback to hide extraneous stack frames that
     originate from within the datatest module itself.
@@ -220,14 +612,24 @@ class HideInternalStackFrames(object):
 class DataTestRunner(unittest.TextTestRunner):
     """A data test runner (wraps unittest.TextTestRunner) that displays
     results in textual form.
+
+    If *parallel* is greater than 1, tests are run in that number of
+    worker processes (tests from the same class are always run together
+    in a single worker and module fixtures run once per worker).
+    Outcomes are reported in line-number order and a failing mandatory
+    test stops any further tests from being dispatched. Parallel
+    execution requires fork() support--on other platforms, tests are
+    run serially.
     """
     resultclass = DataTestResult
 
     def __init__(self, stream=None, descriptions=True, verbosity=1,
-                 failfast=False, buffer=False, resultclass=None, ignore=False):
+                 failfast=False, buffer=False, resultclass=None, ignore=False,
+                 parallel=None):
         if stream is None:
             stream = sys.stderr
         self.ignore = ignore
+        self.parallel = parallel
         unittest.TextTestRunner.__init__(self,
                                          stream=stream,
                                          descriptions=descriptions,
@@ -268,6 +670,14 @@ class DataTestRunner(unittest.TextTestRunner):
         separator = '=' * 70
         self.stream.writeln(separator)
         self.stream.writeln(docstrings)
+
+        if self.parallel and self.parallel > 1:
+            if _get_fork_context() is None:
+                warnings.warn('parallel test execution requires fork(), '
+                              'running tests serially')
+            else:
+                test = _ParallelSuite(test, self.parallel,
+                                      self.verbosity, self.ignore)
         return unittest.TextTestRunner.run(self, test)
 
 
@@ -275,10 +685,12 @@ class DataTestRunner(unittest.TextTestRunner):
 # versions of unittest.  Also, fixes redirect behavior inherited from these
 # older versions (see issue 10786 <http://bugs.python.org/issue10786>).
 if sys.version_info[:2] in [(3, 1), (2, 6)]:  # 3.1 and 2.6
-    def __init__(self, stream=None, descriptions=1, verbosity=1, ignore=False):
+    def __init__(self, stream=None, descriptions=1, verbosity=1, ignore=False,
+                 parallel=None):
         if stream is None:
             stream = sys.stderr
         self.ignore = ignore
+        self.parallel = parallel
         unittest.TextTestRunner.__init__(self,
                                          stream=stream,
                                          descriptions=descriptions,
@@ -286,18 +698,52 @@ if sys.version_info[:2] in [(3, 1), (2, 6)]:  # 3.1 and 2.6
     DataTestRunner.__init__ = __init__
 
 
-def _sort_key(test):
-    """Accepts test method, returns module name and line number."""
+def _get_test_function(test):
+    """Accepts a single test, returns the function that implements its
+    test method (unwrapped from any decorators).
+    """
     method = getattr(test, test._testMethodName)
     while hasattr(method, '_wrapped'):  # If object is wrapped with a
         method = method._wrapped        # decorator, unwrap it.
+    return getattr(method, '__func__', method)  # <- Unbind if method.
+
 
+# Line numbers of test functions, memoized by _get_line_number().
+_line_numbers = weakref.WeakKeyDictionary()
+
+
+def _get_line_number(function):
+    """Return the line number where *function* is defined. The number
+    is taken from the function's code object (this is much faster than
+    reading the source file) and the source is only inspected when the
+    object has no code.
+    """
     try:
-        lineno = inspect.getsourcelines(method)[1]
-    except IOError:
-        warnings.warn('Unable to sort {0}'.format(method))
-        lineno = 0
-    return (method.__module__, lineno)
+        return _line_numbers[function]  # <- EXIT! Already memoized.
+    except (KeyError, TypeError):
+        pass
+
+    code = getattr(function, '__code__', None)
+    if code is not None:
+        lineno = code.co_firstlineno
+    else:
+        try:
+            lineno = inspect.getsourcelines(function)[1]
+        except (IOError, TypeError):
+            warnings.warn('Unable to sort {0}'.format(function))
+            lineno = 0
+
+    try:
+        _line_numbers[function] = lineno
+    except TypeError:
+        pass  # <- Object does not support weak references.
+    return lineno
+
+
+def _sort_key(test):
+    """Accepts test method, returns module name and line number."""
+    function = _get_test_function(test)
+    return (function.__module__, _get_line_number(function))
 
 
 def _sort_tests(suite, key=_sort_key):
@@ -316,7 +762,4 @@ def _sort_tests(suite, key=_sort_key):
 
 def _get_module(one_test):
     """Accepts a single test, returns module name."""
-    method = getattr(one_test, one_test._testMethodName)
-    while hasattr(method, '_wrapped'):  # If object is wrapped with a
-        method = method._wrapped        # decorator, unwrap it.
-    return sys.modules[method.__module__]
+    return sys.modules[_get_test_function(one_test).__module__]
@@ -6,5 +6,7 @@ from abc import *
 try:
     ABC  # New in version 3.4.
 except NameError:
-    ABC = ABCMeta('ABC', (object,), {})  # <- Using Python 2 and 3
-                                         #    compatible syntax.
+    ABC = None
+
+if ABC is None or '__slots__' not in ABC.__dict__:  # ABC.__slots__ is
+    ABC = ABCMeta('ABC', (object,), {'__slots__': ()})  # new in 3.7.
@@ -2,6 +2,7 @@
 """Miscellaneous helper functions."""
 from __future__ import absolute_import
 import inspect
+from numbers import Integral
 from sys import version_info as _version_info
 from .collections import Iterable
 from .decimal import Decimal
@@ -53,6 +54,22 @@ def _unique_everseen(iterable):  # Adapted from itertools recipes.
         yield element
 
 
+# Integers with a greater magnitude can not be exactly represented as
+# 64-bit floats.
+_MAX_EXACT_INTEGER = 2 ** 53
+
+
+def _is_plain_number(x):
+    """Return True if *x* is a float or an integer that can be exactly
+    represented as a float.
+    """
+    if x.__class__ is float:
+        return True
+    if isinstance(x, Integral) and not isinstance(x, bool):
+        return abs(x) <= _MAX_EXACT_INTEGER
+    return False
+
+
 def _make_decimal(d):
     """Converts number into normalized Decimal object."""
     if isinstance(d, float):
@@ -1,6 +1,10 @@
 # -*- coding: utf-8 -*-
 import inspect
 from . import _unittest as unittest
+try:
+    import numpy
+except ImportError:
+    numpy = None
 from datatest.utils import collections
 from datatest.utils import contextlib
 
@@ -15,6 +19,7 @@ from datatest.allow import allowed_specific
 from datatest.allow import allowed_key
 from datatest.allow import allowed_args
 from datatest.allow import allowed_limit
+from datatest import allow
 
 from datatest.errors import ValidationError
 from datatest.errors import Missing
@@ -440,6 +445,28 @@ class TestAllowedSpecific(unittest.TestCase):
         with allowed_specific(allowed):
             raise ValidationError('example error', differences)
 
+    def test_nan_and_unhashable(self):
+        nan = float('nan')
+        differences = [Invalid(nan), Invalid(nan), Extra(['xxx']), Extra(['xxx'])]
+        allowed = [Invalid(float('nan')), Extra(['xxx'])]
+
+        with self.assertRaises(ValidationError) as cm:
+            with allowed_specific(allowed):
+                raise ValidationError('example error', differences)
+
+        actual = list(cm.exception.differences)
+        self.assertEqual(actual, [Invalid(nan), Extra(['xxx'])])
+
+    def test_many_differences(self):
+        differences = [Invalid(x) for x in range(50000)]
+        allowed = [Invalid(x) for x in range(1, 50000)]
+
+        with self.assertRaises(ValidationError) as cm:
+            with allowed_specific(allowed):
+                raise ValidationError('example error', differences)
+
+        self.assertEqual(list(cm.exception.differences), [Invalid(0)])
+
     def test_error_mapping_allowance_list(self):
         differences = {'foo': [Extra('xxx')], 'bar': [Extra('xxx'), Missing('yyy')]}
         allowed = [Extra('xxx')]
@@ -959,6 +986,67 @@ class TestAllowedPercentDeviation(unittest.TestCase):
                 raise ValidationError('example error', [Deviation(0, float('nan'))])
 
 
+@unittest.skipIf(numpy is None, 'numpy not found')
+class TestNumpyDeviation(unittest.TestCase):
+    """The NumPy fast path should give the same results as the
+    regular predicates.
+    """
+    def get_remaining(self, allowance, differences):
+        try:
+            with allowance:
+                raise ValidationError('example error', differences)
+        except ValidationError as err:
+            return err.differences
+        return None
+
+    def assertSameResult(self, make_allowance, differences):
+        result = self.get_remaining(make_allowance(), differences)
+
+        original = allow._numpy
+        allow._numpy = None
+        try:
+            expected = self.get_remaining(make_allowance(), differences)
+        finally:
+            allow._numpy = original
+        self.assertEqual(result, expected)
+
+    def test_deviation(self):
+        differences = [
+            Deviation(-1, 10),
+            Deviation(+3, 10),
+            Deviation(0.1, 10),  # <- Float close to Decimal bound.
+            Deviation(0.30000000000000004, 10),
+            Deviation(None, 0),
+            Deviation(2, float('nan')),
+            Deviation(float('inf'), 10),
+            Deviation(2 ** 60, 10),  # <- Too large for exact float.
+        ]
+        self.assertSameResult(lambda: allowed_deviation(0.1), differences)
+        self.assertSameResult(lambda: allowed_deviation(0.3), differences)
+        self.assertSameResult(lambda: allowed_deviation(-1, 2), differences)
+
+        mapping = dict(('key{0}'.format(i), diff) for i, diff in enumerate(differences))
+        mapping['list'] = [Deviation(1, 10), Deviation(5, 10)]
+        self.assertSameResult(lambda: allowed_deviation(3), mapping)
+
+    def test_percent_deviation(self):
+        differences = [
+            Deviation(-1, 10),
+            Deviation(+3, 10),
+            Deviation(+3.0, 10),  # <- Exactly on bound.
+            Deviation(1, 3),
+            Deviation(0, None),
+            Deviation(5, 0),
+            Deviation(float('inf'), 10),
+        ]
+        self.assertSameResult(lambda: allowed_percent_deviation(0.3), differences)
+        self.assertSameResult(lambda: allowed_percent_deviation(0.3, 0.3), differences)
+        self.assertSameResult(lambda: allowed_percent_deviation(0.1, 0.4), differences)
+
+        mapping = {'a': differences[:4], 'b': Deviation(1, 3)}
+        self.assertSameResult(lambda: allowed_percent_deviation(0.2), mapping)
+
+
 class TestMsgIntegration(unittest.TestCase):
     """The 'msg' keyword is passed to to each parent class and
     eventually handled in the allow_iter base class. These tests
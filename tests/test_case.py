@@ -11,6 +11,9 @@ from . import _unittest as unittest
 
 # Import code to test.
 from datatest.case import DataTestCase
+from datatest.case import register_sources
+from datatest.case import unregister_sources
+from datatest.case import _registered_sources
 
 from datatest.dataaccess import DataSource
 from datatest.dataaccess import DataQuery
@@ -52,6 +55,77 @@ class TestSubclass(TestHelperCase):
         self.assertTrue(issubclass(DataTestCase, _TestCase))
 
 
+class TestFindDataSource(unittest.TestCase):
+    def setUp(self):
+        class _TestClass(DataTestCase):  # Dummy class.
+            def runTest(_self):
+                pass
+        self.case = _TestClass()
+
+    def get_from(self, namespace, name='subject'):
+        """Get *name* from a frame whose globals are *namespace*."""
+        namespace['_case'] = self.case
+        code = compile('_case.{0}'.format(name), '<test>', 'eval')
+        return eval(code, namespace)
+
+    def test_calling_frame(self):
+        namespace = {'subject': 'A', 'reference': 'B'}
+        self.assertEqual(self.get_from(namespace), 'A')
+        self.assertEqual(self.get_from(namespace, 'reference'), 'B')
+
+    def test_cached_namespace(self):
+        namespace = {'subject': 'A'}
+        self.assertEqual(self.get_from(namespace), 'A')
+
+        # The cached namespace is used (even from other frames) and
+        # reflects later assignments.
+        namespace['subject'] = 'B'
+        self.assertEqual(self.case.subject, 'B')
+
+        # When the name is removed, the stack is searched again.
+        del namespace['subject']
+        self.assertEqual(self.get_from({'subject': 'C'}), 'C')
+
+    def test_not_found(self):
+        with self.assertRaisesRegex(NameError, "cannot find 'subject'"):
+            self.get_from({})
+
+    def test_register_sources(self):
+        module = self.case.__class__.__module__
+        self.addCleanup(_registered_sources.pop, module, None)
+
+        register_sources(subject='A', module=module)
+        self.assertEqual(self.get_from({'subject': 'B'}), 'A')
+        with self.assertRaises(NameError):
+            self.get_from({}, 'reference')
+
+        register_sources(reference='C', module=module)
+        self.assertEqual(self.case.subject, 'A')
+        self.assertEqual(self.case.reference, 'C')
+
+    def test_register_calling_module(self):
+        self.addCleanup(_registered_sources.pop, __name__, None)
+        register_sources(subject='A')
+        self.assertEqual(_registered_sources[__name__], {'subject': 'A'})
+
+    def test_unregister_sources(self):
+        module = self.case.__class__.__module__
+        self.addCleanup(_registered_sources.pop, module, None)
+
+        register_sources(subject='A', module=module)
+        unregister_sources(module=module)
+        self.assertNotIn(module, _registered_sources)
+        self.assertEqual(self.get_from({'subject': 'B'}), 'B')
+
+        unregister_sources(module=module)  # <- No error if not registered.
+
+    def test_unregister_calling_module(self):
+        self.addCleanup(_registered_sources.pop, __name__, None)
+        register_sources(subject='A')
+        unregister_sources()
+        self.assertNotIn(__name__, _registered_sources)
+
+
 class TestAssertValid(DataTestCase):
     """
     +-------------------------------------------------------------+
@@ -135,12 +209,81 @@ class TestAssertValid(DataTestCase):
 
         self.assertEqual(cm.exception.maxDiff, 35)
 
+    def test_max_differences(self):
+        consumed = []
+        def generate():
+            for x in range(1000):
+                consumed.append(x)
+                yield x
+        data = DataResult(generate(), evaluation_type=list)  # <- Lazy.
+
+        with self.assertRaises(ValidationError) as cm:
+            self.assertValid(data, 'a', max_differences=2)
+
+        error = cm.exception
+        self.assertTrue(error.truncated)
+        self.assertEqual(error.differences, [Invalid(0), Invalid(1)])
+        self.assertEqual(len(consumed), 3)
+        self.assertRegex(str(error), 'more than 2 differences')
+        self.assertRegex(str(error), 'omit the max_differences argument')
+
+    def test_max_differences_attribute(self):
+        self.maxDifferences = 1
+        with self.assertRaises(ValidationError) as cm:
+            self.assertValid(['x', 'y', 'z'], 'a')
+        self.assertEqual(cm.exception.differences, [Invalid('x')])
+
+    def test_max_differences_allowance(self):
+        # Allowing differences in a truncated sample re-raises the
+        # original error--later differences were never checked.
+        with self.assertRaises(ValidationError) as cm:
+            with allowed_specific([Invalid('b')]):
+                self.assertValid(['b', 'c', 'd'], 'a', max_differences=1)
+        self.assertEqual(cm.exception.differences, [Invalid('b')])
+        self.assertTrue(cm.exception.truncated)
+
+        # Remaining differences stay truncated.
+        with self.assertRaises(ValidationError) as cm:
+            with allowed_specific([Invalid('b')]):
+                self.assertValid(['b', 'c', 'd'], 'a', max_differences=2)
+        self.assertEqual(cm.exception.differences, [Invalid('c')])
+        self.assertTrue(cm.exception.truncated)
+
+    def test_lazy_differences(self):
+        self.lazyDifferences = True
+        with self.assertRaises(ValidationError) as cm:
+            with allowed_specific([Invalid('b')]):
+                self.assertValid(iter(['b', 'c', 'd']), 'a')
+
+        error = cm.exception
+        self.assertTrue(error.lazy)
+        self.assertFalse(isinstance(error.differences, list))
+        self.assertEqual(list(error.differences), [Invalid('c'), Invalid('d')])
+
     def test_query_objects(self):
         source = DataSource([('1', '2'), ('1', '2')], fieldnames=['A', 'B'])
         query_obj1 = source(['B'])
         query_obj2 = source(['B'])
         self.assertValid(query_obj1, query_obj2)
 
+    def test_query_set_requirement(self):
+        source = DataSource([('1', '2'), ('3', '2')], fieldnames=['A', 'B'])
+        self.assertValid(source('A'), set(['1', '3']))
+        self.assertValid(source('A'), source(set(['A'])))
+
+        with self.assertRaises(ValidationError) as cm:
+            self.assertValid(source('A'), set(['1', '2']))
+        differences = cm.exception.differences
+        self.assertEqual(set(differences), set([Missing('2'), Extra('3')]))
+
+    def test_query_regex_requirement(self):
+        source = DataSource([('a1', '2'), ('b2', '2')], fieldnames=['A', 'B'])
+        self.assertValid(source('A'), re.compile('^[a-z][0-9]$'))
+
+        with self.assertRaises(ValidationError) as cm:
+            self.assertValid(source('A'), re.compile('^a'))
+        self.assertEqual(cm.exception.differences, [Invalid('b2')])
+
     def test_result_objects(self):
         result_obj1 = DataResult(['2', '2'], evaluation_type=list)
         result_obj2 = DataResult(['2', '2'], evaluation_type=list)
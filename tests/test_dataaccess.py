@@ -1,16 +1,22 @@
 # -*- coding: utf-8 -*-
 from __future__ import absolute_import
 from __future__ import division
+import gc
 import os
 import re
+import shutil
 import sqlite3
 import tempfile
 import textwrap
+import threading
+import warnings
+import weakref
 from . import _io as io
 
 from . import _unittest as unittest
 from datatest.utils import collections
 from datatest.utils.misc import _is_nsiterable
+from datatest.load import sqltemp
 
 from datatest.dataaccess import working_directory
 from datatest.dataaccess import BaseElement
@@ -33,6 +39,8 @@ from datatest.dataaccess import _parse_select
 from datatest.dataaccess import RESULT_TOKEN
 from datatest.dataaccess import DataQuery
 from datatest.dataaccess import DataSource
+from datatest.expression import element
+from datatest.expression import _ColumnExpression
 
 
 class TestWorkingDirectory(unittest.TestCase):
@@ -359,6 +367,25 @@ class TestSumData(unittest.TestCase):
         result = _sqlite_sum('abc')
         self.assertEqual(result, 0.0)
 
+    def test_result_type(self):
+        """Like SQLite, the sum of integers should be an integer
+        and the sum of other values should be a float.
+        """
+        result = _sqlite_sum([1, 2, None, 3])
+        self.assertEqual(result, 6)
+        self.assertIsInstance(result, int)
+
+        result = _sqlite_sum([1, 2, 3.5])
+        self.assertEqual(result, 6.5)
+
+        result = _sqlite_sum([1, '2', 3])
+        self.assertEqual(result, 6.0)
+        self.assertIsInstance(result, float)
+
+        result = _sqlite_sum(['1', 2, 3])
+        self.assertEqual(result, 6.0)
+        self.assertIsInstance(result, float)
+
     def test_dict_iter_of_lists(self):
         iterable = DataResult({'a': [1, 2], 'b': [3, 4]}, dict)
         result = _apply_to_data(_sqlite_sum, iterable)
@@ -848,6 +875,151 @@ class TestDataQuery(unittest.TestCase):
         )
         self.assertEqual(optimized, expected)
 
+    def test_optimize_distinct_aggregation(self):
+        """
+        Unoptimized:
+            DataSource._select({'col1': ['values']}, col2='xyz').distinct().count()
+
+        Optimized:
+            DataSource._select_aggregate('COUNT', {'col1': {'values'}}, col2='xyz')
+        """
+        unoptimized = (
+            (getattr, (RESULT_TOKEN, '_select'), {}),
+            (RESULT_TOKEN, ({'col1': ['values']},), {'col2': 'xyz'}),
+            (_sqlite_distinct, (RESULT_TOKEN,), {}),
+            (_apply_to_data, (_sqlite_count, RESULT_TOKEN,), {}),
+        )
+        optimized = DataQuery._optimize(unoptimized)
+
+        expected = (
+            (getattr, (RESULT_TOKEN, '_select_aggregate'), {}),
+            (RESULT_TOKEN, ('COUNT', {'col1': set(['values'])},), {'col2': 'xyz'}),
+        )
+        self.assertEqual(optimized, expected)
+
+    def test_optimize_partial(self):
+        """Steps that cannot be translated should remain in the plan."""
+        unoptimized = (
+            (getattr, (RESULT_TOKEN, '_select'), {}),
+            (RESULT_TOKEN, (['col1'],), {}),
+            (_sqlite_distinct, (RESULT_TOKEN,), {}),
+            (_sqlite_distinct, (RESULT_TOKEN,), {}),
+            (_map_data, (int, RESULT_TOKEN), {}),
+            (_apply_to_data, (_sqlite_sum, RESULT_TOKEN,), {}),
+        )
+        optimized = DataQuery._optimize(unoptimized)
+
+        expected = (
+            (getattr, (RESULT_TOKEN, '_select_distinct'), {}),
+            (RESULT_TOKEN, (['col1'],), {}),
+            (_map_data, (int, RESULT_TOKEN), {}),
+            (_apply_to_data, (_sqlite_sum, RESULT_TOKEN,), {}),
+        )
+        self.assertEqual(optimized, expected)
+
+        # Distinct values from multiple fields can not be aggregated.
+        unoptimized = (
+            (getattr, (RESULT_TOKEN, '_select'), {}),
+            (RESULT_TOKEN, ([('col1', 'col2')],), {}),
+            (_sqlite_distinct, (RESULT_TOKEN,), {}),
+            (_apply_to_data, (_sqlite_count, RESULT_TOKEN,), {}),
+        )
+        optimized = DataQuery._optimize(unoptimized)
+
+        expected = (
+            (getattr, (RESULT_TOKEN, '_select_distinct'), {}),
+            (RESULT_TOKEN, ([('col1', 'col2')],), {}),
+            (_apply_to_data, (_sqlite_count, RESULT_TOKEN,), {}),
+        )
+        self.assertEqual(optimized, expected)
+
+        # Nothing to optimize.
+        unoptimized = (
+            (getattr, (RESULT_TOKEN, '_select'), {}),
+            (RESULT_TOKEN, (['col1'],), {}),
+            (_map_data, (int, RESULT_TOKEN), {}),
+        )
+        self.assertIsNone(DataQuery._optimize(unoptimized))
+
+    def test_optimize_expressions(self):
+        """Filter and map steps that use expressions should be folded
+        into the data selection.
+        """
+        is_large = element > 5
+        stripped = element.strip()
+        unoptimized = (
+            (getattr, (RESULT_TOKEN, '_select'), {}),
+            (RESULT_TOKEN, (['col1'],), {}),
+            (_filter_data, (is_large, RESULT_TOKEN), {}),
+            (_map_data, (stripped, RESULT_TOKEN), {}),
+        )
+        optimized = DataQuery._optimize(unoptimized)
+
+        expected = (
+            (getattr, (RESULT_TOKEN, '_select'), {}),
+            (RESULT_TOKEN, ([_ColumnExpression('col1', stripped)],), {'col1': is_large}),
+        )
+        self.assertEqual(optimized, expected)
+
+        # Functions that are not expressions can not be translated.
+        unoptimized = (
+            (getattr, (RESULT_TOKEN, '_select'), {}),
+            (RESULT_TOKEN, (['col1'],), {}),
+            (_map_data, (stripped, RESULT_TOKEN), {}),
+            (_filter_data, (str.isdigit, RESULT_TOKEN), {}),
+        )
+        optimized = DataQuery._optimize(unoptimized)
+
+        expected = (
+            (getattr, (RESULT_TOKEN, '_select'), {}),
+            (RESULT_TOKEN, ([_ColumnExpression('col1', stripped)],), {}),
+            (_filter_data, (str.isdigit, RESULT_TOKEN), {}),
+        )
+        self.assertEqual(optimized, expected)
+
+        # Filtering grouped data is not translated (it would remove
+        # groups that have no matching values).
+        unoptimized = (
+            (getattr, (RESULT_TOKEN, '_select'), {}),
+            (RESULT_TOKEN, ({'col1': ['col2']},), {}),
+            (_filter_data, (is_large, RESULT_TOKEN), {}),
+        )
+        self.assertIsNone(DataQuery._optimize(unoptimized))
+
+    def test_optimize_results(self):
+        """Optimized and unoptimized queries should give same results."""
+        source = DataSource([('a', '1'), ('a', '1'), ('a', '2'),
+                             ('b', '3'), ('b', None), ('b', '3')],
+                            fieldnames=['A', 'B'])
+        queries = [
+            source('B').distinct().count(),
+            source('B').distinct().sum(),
+            source({'A': 'B'}).distinct().count(),
+            source({'A': 'B'}).distinct().max(),
+            source('B').distinct().distinct().filter().map(int).sum(),
+            source('B').filter(element != '1'),
+            source('B').filter(element != None).map(element.strip()).filter(element == '3'),
+            source({'A': 'B'}, A='a').map(element.lower()),
+            source('A', B=element.isin(['1', '2'])).distinct(),
+            source('B').filter(element > 1),  # Mixed types are not ordered.
+            source('B').map(element.strip()).filter(element <= '2'),
+        ]
+
+        numbers = DataSource([(1,), (200,)], fieldnames=['C'])
+        queries.extend([
+            numbers('C').filter(element > 100),
+            numbers('C').filter(element > '100'),
+            numbers('C').map(element.strip()),  # Not text, gives None.
+        ])
+        for query in queries:
+            result = query(optimize=True)
+            result = getattr(result, 'fetch', lambda: result)()
+
+            expected = query(optimize=False)
+            expected = getattr(expected, 'fetch', lambda: expected)()
+
+            self.assertEqual(result, expected, repr(query))
+
     def test_explain(self):
         query = DataQuery(['col1'])
         expected = """
@@ -1006,6 +1178,203 @@ class TestDataSourceConstructors(unittest.TestCase):
         self.assertEqual(set(table_contents), set(expected))
 
 
+    def test_dtypes(self):
+        data = [('x', '1', '1.5'), ('y', '2', '2.5'), ('z', '3', 'n/a')]
+        source = DataSource(data, fieldnames=['A', 'B', 'C'], dtypes={'B': int, 'C': float})
+        table_contents = self.get_table_contents(source)
+        expected = [('x', 1, 1.5), ('y', 2, 2.5), ('z', 3, 'n/a')]
+        self.assertEqual(set(table_contents), set(expected))
+
+        self.assertEqual(source('B').sum().fetch(), 6)
+        self.assertEqual(source('B').sum()(optimize=False), 6)
+
+    def test_from_csv_dtypes(self):
+        csv_file = self._get_filelike(b'A,B,C\n'
+                                      b'x,1,0.5\n'
+                                      b'y,2,\n'
+                                      b'z,3,1\n', encoding='utf-8')
+        source = DataSource.from_csv(csv_file, dtypes='infer')
+        table_contents = self.get_table_contents(source)
+        expected = [('x', 1, 0.5), ('y', 2, ''), ('z', 3, 1.0)]
+        self.assertEqual(set(table_contents), set(expected))
+
+
+
+class TestDataSourceCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.cache_dir = os.path.join(self.temp_dir, 'cache')
+        self.path = os.path.join(self.temp_dir, 'data.csv')
+        self.write_file(b'A,B\nx,1\ny,2\n')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_file(self, contents, mtime=1000000000):
+        with open(self.path, 'wb') as fh:
+            fh.write(contents)
+        os.utime(self.path, (mtime, mtime))
+
+    def test_cache_used(self):
+        source = DataSource.from_csv(self.path, cache_dir=self.cache_dir)
+        self.assertEqual(set(source('A').fetch()), set(['x', 'y']))
+        self.assertEqual(len(os.listdir(self.cache_dir)), 1)
+
+        # Same size and mtime (contents are not examined).
+        self.write_file(b'A,B\nz,1\nz,2\n')
+        source = DataSource.from_csv(self.path, cache_dir=self.cache_dir)
+        self.assertEqual(set(source('A').fetch()), set(['x', 'y']), 'should use cached table')
+        self.assertEqual(source.fieldnames, ('A', 'B'))
+
+        self.assertEqual(repr(source), 'DataSource.from_csv({0!r})'.format(self.path))
+
+    def test_cache_invalidated(self):
+        DataSource.from_csv(self.path, cache_dir=self.cache_dir)
+
+        self.write_file(b'A,B\nz,1\nz,2\n', mtime=1000000001)  # <- New mtime.
+        source = DataSource.from_csv(self.path, cache_dir=self.cache_dir)
+        self.assertEqual(set(source('A').fetch()), set(['z']))
+
+        source = DataSource.from_csv(self.path, dtypes={'B': int}, cache_dir=self.cache_dir)
+        self.assertEqual(set(source('B').fetch()), set([1, 2]), 'dtypes are part of key')
+        self.assertEqual(len(os.listdir(self.cache_dir)), 3)
+
+    def test_cache_keeps_defaults_and_types(self):
+        other_path = os.path.join(self.temp_dir, 'other.csv')
+        with open(other_path, 'wb') as fh:
+            fh.write(b'A,C\nz,3\n')
+
+        files = [self.path, other_path]
+        DataSource.from_csv(files, dtypes='infer', cache_dir=self.cache_dir)
+        source = DataSource.from_csv(files, dtypes='infer', cache_dir=self.cache_dir)
+
+        cursor = source._connection.cursor()
+        cursor.execute('SELECT * FROM ' + source._table)
+        expected = [('x', 1, ''), ('y', 2, ''), ('z', '', 3)]
+        self.assertEqual(list(cursor), expected)
+
+    def test_damaged_cache_file(self):
+        DataSource.from_csv(self.path, cache_dir=self.cache_dir)
+        cache_file = os.path.join(self.cache_dir, os.listdir(self.cache_dir)[0])
+        with open(cache_file, 'wb') as fh:
+            fh.write(b'not a database')
+
+        source = DataSource.from_csv(self.path, cache_dir=self.cache_dir)
+        self.assertEqual(set(source('A').fetch()), set(['x', 'y']))
+
+        source = DataSource.from_csv(self.path, cache_dir=self.cache_dir)
+        self.assertEqual(set(source('A').fetch()), set(['x', 'y']), 'should be rebuilt')
+
+    def test_encoding_fallback_warning_cached(self):
+        self.write_file(b'A,B\nx,1\n\xe9,2\n')  # <- Not UTF-8 encoded.
+        for _ in range(2):  # Build cache, then use it.
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                source = DataSource.from_csv(self.path, cache_dir=self.cache_dir)
+            self.assertEqual(len(caught), 1)
+            self.assertIn('ISO-8859-1', str(caught[0].message))
+            self.assertEqual(set(source('A').fetch()), set(['x', u'\xe9']))
+
+    def test_cache_not_saved(self):
+        with open(self.cache_dir, 'w') as fh:  # <- File where directory
+            fh.write('')                       #    should be.
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            source = DataSource.from_csv(self.path, cache_dir=self.cache_dir)
+        self.assertEqual(len(caught), 1)
+        self.assertIn('could not save table', str(caught[0].message))
+        self.assertEqual(set(source('A').fetch()), set(['x', 'y']))
+
+    def test_cache_partial_file_removed(self):
+        os.makedirs(self.cache_dir)
+        def fail(*args):
+            raise OSError('failed')
+
+        original = sqltemp._replace_file
+        sqltemp._replace_file = fail
+        try:
+            with warnings.catch_warnings(record=True) as caught:
+                warnings.simplefilter('always')
+                source = DataSource.from_csv(self.path, cache_dir=self.cache_dir)
+        finally:
+            sqltemp._replace_file = original
+        self.assertEqual(len(caught), 1)
+        self.assertEqual(os.listdir(self.cache_dir), [], 'should remove partial file')
+        self.assertEqual(set(source('A').fetch()), set(['x', 'y']))
+
+    def test_file_object_not_cached(self):
+        filelike = TestDataSourceConstructors._get_filelike(b'A,B\nx,1\ny,2\n', 'utf-8')
+        source = DataSource.from_csv(filelike, cache_dir=self.cache_dir)
+        self.assertEqual(set(source('A').fetch()), set(['x', 'y']))
+        self.assertFalse(os.path.exists(self.cache_dir))
+
+
+
+class TestDataSourceParallelCsv(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        contents = [
+            b'A,B\nx,1\ny,2\n',
+            b'B,C\n3,j\n4,k\n',
+            b'C,A,D\nl,z,0.5\n\xe9,w,1\n',  # <- Not UTF-8 encoded.
+        ]
+        self.paths = []
+        for index, data in enumerate(contents):
+            path = os.path.join(self.temp_dir, 'file{0}.csv'.format(index))
+            with open(path, 'wb') as fh:
+                fh.write(data)
+            self.paths.append(path)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    @staticmethod
+    def get_table_contents(source):
+        cursor = source._connection.cursor()
+        cursor.execute('SELECT * FROM ' + source._table)
+        return list(cursor)
+
+    def load(self, **kwds):
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            source = DataSource.from_csv(self.paths, **kwds)
+        messages = [str(x.message) for x in caught]
+        return source, messages
+
+    def test_same_as_sequential(self):
+        sequential, seq_warnings = self.load()
+        parallel, par_warnings = self.load(processes=2)
+
+        self.assertEqual(parallel.fieldnames, ('A', 'B', 'C', 'D'))
+        self.assertEqual(parallel.fieldnames, sequential.fieldnames)
+        self.assertEqual(self.get_table_contents(parallel),
+                         self.get_table_contents(sequential))
+        self.assertEqual(len(par_warnings), 1)
+        self.assertEqual(par_warnings, seq_warnings)
+
+    def test_same_as_sequential_dtypes(self):
+        sequential, _ = self.load(dtypes='infer')
+        parallel, _ = self.load(dtypes='infer', processes=2)
+
+        result = self.get_table_contents(parallel)
+        self.assertEqual(result, self.get_table_contents(sequential))
+        self.assertEqual(result[0], ('x', 1, '', ''))
+        self.assertEqual(result[-1], ('w', '', u'\xe9', 1.0))
+
+    def test_values_after_sample(self):
+        path = os.path.join(self.temp_dir, 'file3.csv')
+        with open(path, 'wb') as fh:
+            fh.write(b'A,E\n' + b'v,1\n' * 1000 + b'v,007\n')
+        self.paths.append(path)
+
+        sequential, _ = self.load(dtypes='infer')
+        parallel, _ = self.load(dtypes='infer', processes=2)
+
+        result = self.get_table_contents(parallel)
+        self.assertEqual(result, self.get_table_contents(sequential))
+        self.assertEqual(result[-1], ('v', '', '', '', '007'))
+
+
 class TestDataSourceBasics(unittest.TestCase):
     def setUp(self):
         fieldnames = ['label1', 'label2', 'value']
@@ -1044,6 +1413,351 @@ class TestDataSourceBasics(unittest.TestCase):
         ]
         self.assertEqual(expected, result)
 
+    def test_iter_rows(self):
+        result = self.source.iter_rows(tuple, batch_size=2)
+        self.assertNotIsInstance(result, (list, tuple))
+        self.assertEqual(next(result), ('a', 'x', '17'))
+        self.assertEqual(len(list(result)), 6)
+
+        result = list(self.source.iter_rows(batch_size=3))
+        self.assertEqual(result, list(self.source))
+
+        result = self.source.iter_rows('namedtuple')
+        row = next(result)
+        self.assertEqual(row._fields, ('label1', 'label2', 'value'))
+        self.assertEqual(row.value, '17')
+
+        Row = collections.namedtuple('Row', ['a', 'b', 'c'])
+        result = self.source.iter_rows(Row)
+        self.assertEqual(next(result), Row('a', 'x', '17'))
+
+        with self.assertRaises(TypeError):
+            self.source.iter_rows(list)
+
+    def test_metadata(self):
+        source = DataSource([('a', 1), ('b', 2)], ['A', 'B'], dtypes={'B': int})
+        self.assertEqual(source._get_metadata('fieldnames'), ('A', 'B'))
+        self.assertEqual(source._get_metadata('fieldset'), frozenset(['A', 'B']))
+        self.assertEqual(source._get_metadata('dtypes'), {'B': 'INTEGER'})
+        self.assertEqual(source._get_metadata('row_count'), 2)
+        self.assertEqual(source._get_metadata('indexes'), ())
+
+        source.create_index('A')  # <- Clears cached metadata.
+        self.assertEqual(len(source._get_metadata('indexes')), 1)
+
+    def test_metadata_cached(self):
+        """Metadata should be loaded from the database only once."""
+        class ConnectionWrapper(object):
+            def __init__(self, connection):
+                self.connection = connection
+                self.cursor_count = 0
+
+            def cursor(self):
+                self.cursor_count += 1
+                return self.connection.cursor()
+
+        connection = ConnectionWrapper(self.source._connection)
+        self.source._connection = connection
+        self.source._clear_metadata()
+
+        self.source.fieldnames
+        self.assertEqual(connection.cursor_count, 1)
+
+        self.source.fieldnames
+        self.source._assert_fields_exist(['label1', 'value'])
+        self.assertEqual(connection.cursor_count, 1)
+
+        with self.assertRaises(LookupError):
+            self.source._assert_fields_exist(['label1', 'foo'])
+
+    def test_suggest_indexes(self):
+        source = DataSource(self.source, ['label1', 'label2', 'value'])
+        self.assertEqual(source.suggest_indexes(), [])
+
+        source._select(['value']).fetch()  # <- No index candidate.
+        source._select({'label1': ['value']}).fetch()
+        source._select_distinct({'label1': ['value']}, label2='x').fetch()
+        source._select_aggregate('SUM', {'label1': ['value']}, label2='x').fetch()
+        source._select(['value'], label2=['x', 'y']).fetch()
+
+        suggestions = sorted((x[0], x[1]) for x in source.suggest_indexes())
+        expected = [
+            (('label1',), 1),
+            (('label2',), 1),
+            (('label2', 'label1'), 2),
+        ]
+        self.assertEqual(suggestions, expected)
+
+        source.create_index('label2', 'label1')  # Covers both.
+        suggestions = [x[0] for x in source.suggest_indexes()]
+        self.assertEqual(suggestions, [('label1',)])
+
+    def test_auto_index(self):
+        source = DataSource(self.source, ['label1', 'label2', 'value'])
+        source.auto_index = True
+        source._auto_index_min_rows = 5
+
+        source._select({'label1': ['value']}).fetch()
+        source._select({'label1': ['value']}).fetch()
+        self.assertEqual(source._get_metadata('index_columns'), ())
+
+        source._select({'label1': ['value']}).fetch()  # <- Third use.
+        self.assertEqual(source._get_metadata('index_columns'), (('label1',),))
+
+        source = DataSource(self.source, ['label1', 'label2', 'value'])
+        source.auto_index = True
+        source._auto_index_min_rows = 10  # <- More rows than source.
+        for _ in range(3):
+            source._select({'label1': ['value']}).fetch()
+        self.assertEqual(source._get_metadata('index_columns'), ())
+
+    def test_result_cache(self):
+        source = DataSource(self.source, ['label1', 'label2', 'value'])
+        query = source({'label1': 'value'}, label2='x')
+        expected = {'a': ['17', '13'], 'b': ['25']}
+
+        self.assertEqual(query.fetch(), expected)
+        self.assertEqual(source.result_cache_info(), (0, 0, 0, 0), 'disabled by default')
+
+        source.result_cache_size = 2
+        self.assertEqual(query.fetch(), expected)
+        self.assertEqual(query.fetch(), expected)
+        self.assertEqual(source.result_cache_info(), (1, 1, 2, 1))
+
+        source('label1').fetch()
+        source('label2').fetch()  # <- Evicts least-recently-used result.
+        self.assertEqual(query.fetch(), expected)
+        self.assertEqual(source.result_cache_info(), (1, 4, 2, 2))
+
+        source.clear_result_cache()
+        self.assertEqual(source.result_cache_info().currsize, 0)
+
+    def test_result_cache_invalidation(self):
+        source = DataSource(self.source, ['label1', 'label2', 'value'])
+        source.result_cache_size = 8
+        self.assertEqual(source('label1').distinct().fetch(), ['a', 'b'])
+
+        cursor = source._connection.cursor()
+        cursor.execute('INSERT INTO {0} VALUES (?, ?, ?)'.format(source._table),
+                       ('c', 'x', '1'))
+        self.assertEqual(source('label1').distinct().fetch(), ['a', 'b', 'c'])
+
+    def test_compare_set(self):
+        matching, extra = self.source._compare_set('label2', set(['x', 'y', 'w']))
+        self.assertEqual(sorted(matching), ['x', 'y'])
+        self.assertEqual(extra, ['z'])
+
+        matching, extra = self.source._compare_set('label2', set(['x']), label1='b')
+        self.assertEqual(matching, ['x'])
+        self.assertEqual(sorted(extra), ['y', 'z'])
+
+        msg = 'requirement values must not be left in the database'
+        self.assertEqual(self.count_requirement_tables(self.source), 0, msg)
+
+    @staticmethod
+    def count_requirement_tables(source):
+        cursor = source._connection.cursor()
+        cursor.execute('SELECT COUNT(*) FROM sqlite_temp_master WHERE name GLOB ?',
+                       (DataSource._requirement_table_prefix + '*',))
+        return cursor.fetchone()[0]
+
+    def test_compare_set_no_open_transaction(self):
+        """Comparing should not leave a transaction open (PRAGMA
+        statements used by create_index() fail inside a transaction).
+        """
+        self.source._compare_set('label1', set(['a']))
+        self.source.create_index('label1')  # <- Pass without error.
+
+    def test_compare_set_open_cursor(self):
+        """Comparing while another statement is reading from the
+        database should not fail or leave tables behind.
+        """
+        source = DataSource([[str(x)] for x in range(3000)], ['A'])
+        rows = iter(source)
+        next(rows)  # <- Leave the cursor open (rows are fetched in batches).
+
+        matching, extra = source._compare_set('A', set(['1']))
+        self.assertEqual(matching, ['1'])
+        self.assertEqual(len(extra), 2999)
+        matching, extra = source._compare_set('A', set(['2']))
+        self.assertEqual(matching, ['2'])
+
+        del rows
+        gc.collect()
+        source._compare_set('A', set(['3']))
+        self.assertEqual(self.count_requirement_tables(source), 0)
+
+    def test_compare_set_types(self):
+        """Values should only match if Python considers them equal."""
+        source = DataSource([['1'], [2], [3.0], [None]], ['A'])
+        matching, extra = source._compare_set('A', set([1, 2, 3]))
+        self.assertEqual(sorted(matching), [2, 3.0])
+        self.assertEqual(set(extra), set(['1', None]))
+
+        source = DataSource([['1'], ['2']], ['A'], dtypes={'A': int})
+        matching, extra = source._compare_set('A', set(['1', 2]))
+        self.assertEqual(matching, [2])
+        self.assertEqual(extra, [1])
+
+        self.assertIsNone(source._compare_set('A', set([1, None])))
+        self.assertIsNone(source._compare_set('A', set([1, float('nan')])))
+        self.assertIsNone(source._compare_set('A', set([1, (2, 3)])))
+
+    def test_compare_set_query(self):
+        query = self.source('label2').filter(element != 'y')
+        matching, extra = query._compare_set(set(['x', 'y']))
+        self.assertEqual(matching, ['x'])
+        self.assertEqual(extra, ['z'])
+
+        query = self.source('label2').map(element.upper())
+        matching, extra = query._compare_set(set(['X']))
+        self.assertEqual(matching, ['X'])
+        self.assertEqual(sorted(extra), ['Y', 'Z'])
+
+        msg = 'steps that run in Python can not be compared in SQL'
+        query = self.source('label2').map(lambda x: x)
+        self.assertIsNone(query._compare_set(set(['x'])), msg)
+
+        msg = 'mapping selects can not be compared in SQL'
+        query = self.source({'label1': 'label2'})
+        self.assertIsNone(query._compare_set(set(['x'])), msg)
+
+    def test_compare_set_keeps_result_cache(self):
+        source = DataSource(self.source, ['label1', 'label2', 'value'])
+        source.result_cache_size = 8
+        source('label1').fetch()
+        source._compare_set('label1', set(['a']))
+        source('label1').fetch()
+        self.assertEqual(source.result_cache_info().hits, 1)
+
+    def test_connection(self):
+        source1 = DataSource(self.source, ['label1', 'label2', 'value'])
+        source2 = DataSource(self.source, ['label1', 'label2', 'value'])
+        self.assertIsNot(source1._connection, source2._connection)
+
+        cursor = source1._connection.cursor()
+        cursor.execute('PRAGMA temp_store')
+        self.assertEqual(cursor.fetchone()[0], 2)  # <- 2 is MEMORY.
+
+    def test_connection_released(self):
+        source = DataSource(self.source, ['label1', 'label2', 'value'])
+        source('label1').fetch()
+        reference = weakref.ref(source)
+        del source
+        gc.collect()
+        self.assertIsNone(reference(), 'source and connection should be collected')
+
+    def test_other_thread(self):
+        source = DataSource(self.source, ['label1', 'label2', 'value'])
+        results = []
+        thread = threading.Thread(target=lambda: results.append(source('label1').fetch()))
+        thread.start()
+        thread.join()
+        self.assertEqual(results, [['a', 'a', 'a', 'a', 'b', 'b', 'b']])
+
+    def test_concurrent_reads(self):
+        source = DataSource(self.source, ['label1', 'label2', 'value'])
+        source.create_index('label1')
+        expected = source({'label1': 'value'}).sum().fetch()
+
+        source.enable_concurrent_reads()
+        self.assertEqual(source._get_metadata('index_columns'), (('label1',),))
+
+        results = []
+        connections = []
+        def worker():
+            for _ in range(20):
+                results.append(source({'label1': 'value'}).sum().fetch())
+            connections.append(source._connection)
+
+        threads = [threading.Thread(target=worker) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [expected] * 80)
+        self.assertEqual(len(set(id(x) for x in connections)), 4,
+                         msg='each thread should use its own connection')
+
+    def test_concurrent_reads_result_cache(self):
+        source = DataSource(self.source, ['label1', 'label2', 'value'])
+        source.enable_concurrent_reads()
+        source.result_cache_size = 8
+
+        def worker():
+            source('label1').distinct().fetch()
+            source('label1').distinct().fetch()
+        worker()
+        thread = threading.Thread(target=worker)
+        thread.start()
+        thread.join()
+        source('label1').distinct().fetch()
+        self.assertEqual(source._thread_local._result_cache.info(), (2, 1, 8, 1),
+                         msg='cache should not be cleared by other connections')
+
+        def insert():
+            cursor = source._connection.cursor()
+            cursor.execute('INSERT INTO {0} VALUES (?, ?, ?)'.format(source._table),
+                           ('c', 'x', '1'))
+            source._connection.commit()
+        thread = threading.Thread(target=insert)
+        thread.start()
+        thread.join()
+        self.assertEqual(source('label1').distinct().fetch(), ['a', 'b', 'c'],
+                         msg='changes from other connections should clear cache')
+
+    def test_concurrent_reads_result_cache_info(self):
+        """Counts should include threads that have finished."""
+        source = DataSource(self.source, ['label1', 'label2', 'value'])
+        source.enable_concurrent_reads()
+        source.result_cache_size = 8
+
+        def worker():
+            source('label1').distinct().fetch()
+            source('label1').distinct().fetch()
+        threads = [threading.Thread(target=worker) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        del threads
+        gc.collect()  # <- Release the caches of finished threads.
+
+        info = source.result_cache_info()
+        self.assertEqual((info.hits, info.misses), (3, 3))
+
+    def test_concurrent_reads_cleanup(self):
+        source = DataSource(self.source, ['label1', 'label2', 'value'])
+        source.enable_concurrent_reads()
+        directory = source._database_file.directory
+        self.assertTrue(os.path.isdir(directory))
+
+        source('label1').fetch()
+        del source
+        gc.collect()
+        self.assertFalse(os.path.exists(directory))
+
+    def test_iter_rows_fetches_batches(self):
+        """Rows should be fetched in batches as they are needed."""
+        fetched = []
+
+        class CursorWrapper(object):
+            def __init__(self, cursor):
+                self.cursor = cursor
+
+            def fetchmany(self, size):
+                rows = self.cursor.fetchmany(size)
+                fetched.append(len(rows))
+                return rows
+
+        cursor = CursorWrapper(self.source._execute_query('*'))
+        result = DataSource._fetch_batches(cursor, None, 3)
+        next(result)
+        self.assertEqual(fetched, [3])
+        list(result)
+        self.assertEqual(fetched, [3, 3, 1, 0])
+
     def test_select_list_of_strings(self):
         result = self.source._select(['label1'])
         expected = ['a', 'a', 'a', 'a', 'b', 'b', 'b']
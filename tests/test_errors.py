@@ -1,7 +1,9 @@
 # -*- coding: utf-8 -*-
+import pickle
 import re
 import textwrap
 from . import _unittest as unittest
+from datatest.utils.decimal import Decimal
 
 from datatest.errors import ValidationError
 from datatest.errors import BaseDifference
@@ -11,6 +13,9 @@ from datatest.errors import Invalid
 from datatest.errors import Deviation
 from datatest.errors import _make_difference
 from datatest.errors import NOTFOUND
+from datatest.errors import _make_truncated
+from datatest.errors import _DifferenceStream
+from datatest.dataaccess import DictItems
 
 
 # FOR TESTING: A minimal subclass of BaseDifference.
@@ -20,6 +25,49 @@ class MinimalDifference(BaseDifference):
     pass
 
 
+class TestDifferenceStream(unittest.TestCase):
+    def test_replay(self):
+        consumed = []
+        def generate():
+            for x in 'abc':
+                consumed.append(x)
+                yield MinimalDifference(x)
+
+        stream = _DifferenceStream(generate())
+        self.assertEqual(consumed, [])  # <- Nothing read yet.
+
+        iterator = iter(stream)
+        self.assertEqual(next(iterator), MinimalDifference('a'))
+        self.assertEqual(consumed, ['a'])  # <- Read only as needed.
+
+        expected = [MinimalDifference('a'), MinimalDifference('b'), MinimalDifference('c')]
+        self.assertEqual(list(stream), expected)
+        self.assertEqual(list(stream), expected, 'should be replayable')
+        self.assertEqual(list(iterator), expected[1:])
+
+    def test_spill_to_file(self):
+        differences = [MinimalDifference(x) for x in range(10)]
+        stream = _DifferenceStream(iter(differences))
+        stream.memory_limit = 3
+        self.assertEqual(list(stream), differences)
+        self.assertEqual(len(stream._memory), 3)
+        self.assertEqual(stream._spilled, 7)
+        self.assertEqual(list(stream), differences)
+
+    def test_unpicklable(self):
+        unpicklable = lambda x: x
+        differences = [MinimalDifference(x) for x in range(5)]
+        differences.append(MinimalDifference(unpicklable))
+        stream = _DifferenceStream(iter(differences))
+        stream.memory_limit = 3
+        self.assertEqual(list(stream), differences)
+        self.assertEqual(stream._spilled, 0)  # <- Moved back into memory.
+
+    def test_bool(self):
+        self.assertFalse(_DifferenceStream(iter([])))
+        self.assertTrue(_DifferenceStream(iter([MinimalDifference('a')])))
+
+
 class TestValidationError(unittest.TestCase):
     def test_error_list(self):
         error_list = [MinimalDifference('A'), MinimalDifference('B')]
@@ -102,6 +150,61 @@ class TestValidationError(unittest.TestCase):
         expected = textwrap.dedent(expected).strip()
         self.assertEqual(str(err), expected)
 
+    def test_truncated(self):
+        err = ValidationError('invalid data', [MinimalDifference('A')])
+        self.assertFalse(err.truncated)
+
+        differences = _make_truncated([MinimalDifference('A'),
+                                       MinimalDifference('B')])
+        err = ValidationError('invalid data', differences)
+        self.assertTrue(err.truncated)
+        expected = """
+            invalid data (more than 2 differences): [
+                MinimalDifference('A'),
+                MinimalDifference('B'),
+            ]
+            Stopped early (too many differences). To find all differences, omit the max_differences argument of assertValid() and set self.maxDifferences to None.
+        """
+        expected = textwrap.dedent(expected).strip()
+        self.assertEqual(str(err), expected)
+
+        differences = _make_truncated({'a': MinimalDifference('A')})
+        self.assertEqual(differences, {'a': MinimalDifference('A')})
+        self.assertTrue(ValidationError('invalid data', differences).truncated)
+
+    def test_lazy(self):
+        consumed = []
+        def generate():
+            for x in 'ABC':
+                consumed.append(x)
+                yield MinimalDifference(x)
+
+        err = ValidationError('invalid data', generate(), lazy=True)
+        self.assertEqual(consumed, ['A'])  # <- Checked for emptiness.
+        self.assertEqual(list(err.differences), [MinimalDifference('A'),
+                                                 MinimalDifference('B'),
+                                                 MinimalDifference('C')])
+        err.maxDiff = 35
+        expected = """
+            invalid data (3 differences): [
+                MinimalDifference('A'),
+                ...
+            ]
+            Truncated (too long). Set self.maxDiff to None for full message.
+        """
+        self.assertEqual(str(err), textwrap.dedent(expected).strip())
+
+        with self.assertRaises(ValueError):
+            ValidationError('invalid data', iter([]), lazy=True)
+
+    def test_lazy_items(self):
+        items = DictItems(iter([('a', MinimalDifference('A'))]))
+        err = ValidationError('invalid data', items, lazy=True)
+        self.assertIsInstance(err.differences, DictItems)
+        self.assertEqual(dict(err.differences), {'a': MinimalDifference('A')})
+        self.assertEqual(dict(err.differences), {'a': MinimalDifference('A')})
+        self.assertRegex(str(err), r"'a': MinimalDifference\('A'\)")
+
     def test_repr(self):
         err = ValidationError('invalid data', [MinimalDifference('A')])
         expected = "ValidationError('invalid data', [MinimalDifference('A')])"
@@ -164,6 +267,50 @@ class TestBaseDifference(unittest.TestCase):
         second = MinimalDifference(float('nan'))
         self.assertEqual(first, second)
 
+    def test_hash(self):
+        self.assertEqual(hash(MinimalDifference('A')), hash(MinimalDifference('A')))
+        self.assertEqual(hash(MinimalDifference(float('nan'))),
+                         hash(MinimalDifference(float('nan'))))
+        self.assertEqual(hash(MinimalDifference(Decimal('NaN'))),
+                         hash(MinimalDifference(Decimal('NaN'))))
+
+        diffs = set([Missing('A'), Missing('A'), Extra('A')])
+        self.assertEqual(diffs, set([Missing('A'), Extra('A')]))
+
+        with self.assertRaises(TypeError):
+            hash(MinimalDifference(['A']))  # <- Unhashable args.
+
+    def test_not_equal(self):
+        first = MinimalDifference('A', float('nan'))
+        second = MinimalDifference('A', float('nan'))
+        self.assertFalse(first != second)
+
+        hash(first)  # Compute hashes to use the hash
+        hash(second)  # comparison (not the fast path).
+        self.assertEqual(first, second)
+        self.assertNotEqual(first, MinimalDifference('B', float('nan')))
+        self.assertNotEqual(first, MinimalDifference('A'))
+
+    def test_slots(self):
+        """Built-in differences should not have an instance dict."""
+        for diff in [Missing('A'), Extra('A'), Invalid('A'), Deviation(1, 2)]:
+            self.assertFalse(hasattr(diff, '__dict__'))
+
+    def test_pickle(self):
+        for diff in [Missing('A'), Invalid('A', 'B'), Deviation(+1, 5),
+                     MinimalDifference(float('nan'))]:
+            hash(diff)  # <- Cached hash should not be pickled.
+            for protocol in range(pickle.HIGHEST_PROTOCOL + 1):
+                restored = pickle.loads(pickle.dumps(diff, protocol))
+                self.assertEqual(restored, diff)
+                self.assertIs(restored.__class__, diff.__class__)
+                self.assertFalse(hasattr(restored, '_hash'))
+
+        diff = MinimalDifference('A')
+        diff.note = 'x'  # <- Subclass without __slots__ has a __dict__.
+        restored = pickle.loads(pickle.dumps(diff))
+        self.assertEqual(restored.note, 'x')
+
     def test_comparing_different_types(self):
         diff = MinimalDifference('X')
         self.assertNotEqual(diff, Exception('X'))
@@ -0,0 +1,165 @@
+# -*- coding: utf-8 -*-
+from __future__ import absolute_import
+import re
+import sqlite3
+
+from . import _unittest as unittest
+from datatest.expression import element
+from datatest.expression import Expression
+from datatest.expression import _register_functions
+
+
+class TestPythonEvaluation(unittest.TestCase):
+    def test_comparisons(self):
+        self.assertTrue((element == 'a')('a'))
+        self.assertTrue((element != 'a')('b'))
+        self.assertTrue((element < 5)(4))
+        self.assertTrue((element <= 5)(5))
+        self.assertTrue((element > 5)(6))
+        self.assertTrue((element >= 5)(5))
+        self.assertFalse((element > 5)(5))
+
+    def test_methods(self):
+        self.assertEqual(element.strip()(' a '), 'a')
+        self.assertEqual(element.lstrip('x')('xxa'), 'a')
+        self.assertEqual(element.rstrip()('a  '), 'a')
+        self.assertEqual(element.strip().upper()(' a '), 'A')
+        self.assertEqual(element.lower()('A'), 'a')
+        self.assertTrue(element.startswith('ab')('abc'))
+        self.assertTrue(element.endswith('bc')('abc'))
+
+    def test_mixed_types(self):
+        """Values are only compared with literals of the same type
+        class (numbers with numbers, text with text) to give the same
+        results as the SQL translation.
+        """
+        self.assertFalse((element > 100)('200'))
+        self.assertFalse((element <= 'a')(1))
+        self.assertFalse((element < 5)(None))
+        self.assertFalse((element == 1)('1'))
+        self.assertTrue((element != 1)('1'))
+        self.assertTrue((element >= 1)(True))
+        self.assertTrue((element < 'b')('a'))
+
+    def test_methods_on_other_types(self):
+        """String methods return None for values that are not text."""
+        self.assertIsNone(element.strip()(5))
+        self.assertIsNone(element.upper()(None))
+        self.assertIsNone(element.startswith('a')(1.5))
+
+    def test_isin(self):
+        self.assertTrue(element.isin(['a', 'b'])('a'))
+        self.assertFalse(element.isin(['a', 'b'])('c'))
+        self.assertTrue(element.isin([[1], [2]])([1]))  # Unhashable values.
+
+    def test_combined(self):
+        expression = (element > 1) & (element < 5)
+        self.assertTrue(expression(3))
+        self.assertFalse(expression(5))
+
+        expression = (element < 1) | (element > 5)
+        self.assertTrue(expression(0))
+        self.assertFalse(expression(3))
+
+        expression = ~(element == 3)
+        self.assertTrue(expression(2))
+        self.assertFalse(expression(3))
+
+    def test_bool(self):
+        with self.assertRaises(TypeError):
+            (element > 1) and (element < 5)
+
+    def test_repr(self):
+        self.assertEqual(repr(element), 'element')
+        self.assertEqual(repr(element > 5), 'element > 5')
+        self.assertEqual(repr(element.strip().upper()), 'element.strip().upper()')
+
+        expression = (element == 1) | ~(element == 2)
+        self.assertEqual(repr(expression), '(element == 1) | (~(element == 2))')
+
+    def test_name(self):
+        self.assertEqual((element > 5).__name__, 'element > 5')
+        self.assertEqual(Expression.__name__, 'Expression')
+
+
+class TestTranslation(unittest.TestCase):
+    """Translated expressions should give the same results as
+    their Python counterparts.
+    """
+    def setUp(self):
+        self.values = [None, 0, 1, 1.5, 5, 10, '', 'a', ' a ', 'A', 'b',
+                       'abc', "it's", '5', '10']
+        connection = sqlite3.connect(':memory:')
+        _register_functions(connection)
+        cursor = connection.cursor()
+        cursor.execute('CREATE TEMPORARY TABLE test (col)')
+        cursor.executemany('INSERT INTO test VALUES (?)', [(x,) for x in self.values])
+        self.cursor = cursor
+
+    def assertFilterMatches(self, expression):
+        """Check that a translated filter keeps the same values as
+        Python.
+        """
+        sql = expression._to_sql('col')
+        self.assertIsNotNone(sql)
+        self.cursor.execute('SELECT col FROM test WHERE ' + sql)
+        result = [row[0] for row in self.cursor]
+        expected = [value for value in self.values if expression(value)]
+        self.assertEqual(result, expected, repr(expression))
+
+    def assertMapMatches(self, expression):
+        sql = expression._to_sql('col')
+        self.assertIsNotNone(sql)
+        self.cursor.execute('SELECT col, ' + sql + ' FROM test')
+        for value, result in self.cursor:
+            self.assertEqual(result, expression(value), repr(expression))
+
+    def test_comparisons(self):
+        self.assertFilterMatches(element == 1)
+        self.assertFilterMatches(element == 'a')
+        self.assertFilterMatches(element == "it's")
+        self.assertFilterMatches(element == None)
+        self.assertFilterMatches(element != 'a')
+        self.assertFilterMatches(element != None)
+        self.assertFilterMatches(element != 5)
+        self.assertFilterMatches(element > 1)
+        self.assertFilterMatches(element >= 1.5)
+        self.assertFilterMatches(element < 5)
+        self.assertFilterMatches(element <= 'a')
+        self.assertFilterMatches(element > '5')
+
+    def test_isin(self):
+        self.assertFilterMatches(element.isin([1, 'a', None]))
+        self.assertFilterMatches(element.isin(['5', 5]))
+
+    def test_combined(self):
+        self.assertFilterMatches((element > 0) & (element < 10))
+        self.assertFilterMatches((element == 'a') | (element == 'A'))
+        self.assertFilterMatches(~(element == 'a'))
+
+    def test_methods(self):
+        self.assertMapMatches(element.strip())
+        self.assertMapMatches(element.strip('a'))
+        self.assertMapMatches(element.upper())
+        self.assertMapMatches(element.lower().lstrip())
+        self.assertFilterMatches(element.strip() == 'a')
+        self.assertFilterMatches(element.startswith('a'))
+        self.assertFilterMatches(element.endswith('c'))
+
+    def test_regex_functions(self):
+        self.cursor.execute("SELECT col FROM test WHERE col REGEXP '^[a-z]$'")
+        self.assertEqual([row[0] for row in self.cursor], ['a', 'b'])
+
+        self.cursor.execute('SELECT col FROM test WHERE datatest_regex(?, ?, col)',
+                            ('^a', re.IGNORECASE))
+        self.assertEqual([row[0] for row in self.cursor], ['a', 'A', 'abc'])
+
+    def test_untranslatable(self):
+        self.assertIsNone((element == object())._to_sql('col'))
+        self.assertIsNone((element < None)._to_sql('col'))
+        self.assertIsNone((element == float('nan'))._to_sql('col'))
+        self.assertIsNone(((element > 1) == True)._to_sql('col'))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -8,6 +8,8 @@ from datatest.utils import collections
 # Import code to test.
 from datatest.load.sqltemp import TemporarySqliteTable
 from datatest.load.sqltemp import TemporarySqliteTableForCsv
+from datatest.load.sqltemp import _infer_dtypes
+from datatest.load.sqltemp import _normalize_dtype
 
 
 class TestTemporarySqliteTable(unittest.TestCase):
@@ -32,6 +34,11 @@ class TestTemporarySqliteTable(unittest.TestCase):
         stmnt = TemporarySqliteTable._create_table_statement('mytable', ['col1', 'col2'])
         self.assertEqual('CREATE TEMPORARY TABLE mytable ("col1", "col2")', stmnt)
 
+    def test_create_table_statement_dtypes(self):
+        dtypes = {'col1': int, 'col2': 'real'}
+        stmnt = TemporarySqliteTable._create_table_statement('mytable', ['col1', 'col2', 'col3'], dtypes)
+        self.assertEqual('CREATE TEMPORARY TABLE mytable ("col1" INTEGER, "col2" REAL, "col3")', stmnt)
+
     def test_make_new_table(self):
         tablename = TemporarySqliteTable._make_new_table(existing=[])
         self.assertEqual(tablename, 'tbl0')
@@ -189,6 +196,112 @@ class TestTemporarySqliteTable(unittest.TestCase):
         self.assertEqual(list(cursor), [], msg='Table should be empty.')
 
 
+    def test_init_with_dtypes(self):
+        columns = ['foo', 'bar', 'baz']
+        data = [
+            ('a', '1', '1.5'),
+            ('b', '2', '2'),
+            ('c', '', 'x'),
+        ]
+        dtypes = {'bar': int, 'baz': float}
+        temptable = TemporarySqliteTable(data, columns, dtypes=dtypes)
+        self.assertEqual(temptable.dtypes, {'bar': 'INTEGER', 'baz': 'REAL'})
+
+        cursor = temptable.connection.cursor()
+        cursor.execute('SELECT * FROM ' + temptable.name)
+        expected = [
+            ('a', 1, 1.5),
+            ('b', 2, 2.0),
+            ('c', '', 'x'),  # <- Non-numeric values are kept as text.
+        ]
+        result = list(cursor)
+        self.assertEqual(result, expected)
+        self.assertIsInstance(result[0][1], int)
+        self.assertIsInstance(result[1][2], float)
+
+    def test_init_infer_dtypes(self):
+        columns = ['foo', 'bar', 'baz']
+        data = [
+            ('a', '1', '1.5'),
+            ('b', '2', ''),
+            ('c', '3', '2'),
+        ]
+        temptable = TemporarySqliteTable(data, columns, dtypes='infer')
+        self.assertEqual(temptable.dtypes, {'bar': 'INTEGER', 'baz': 'REAL'})
+
+        cursor = temptable.connection.cursor()
+        cursor.execute('SELECT SUM(bar), SUM(baz) FROM ' + temptable.name)
+        self.assertEqual(cursor.fetchone(), (6, 3.5))
+
+    def test_init_infer_dtypes_after_sample(self):
+        columns = ['foo', 'bar', 'baz']
+        sample = [('a', '1', '1.5')] * 1000  # <- Sample size is 1000 rows.
+        data = sample + [('b', '007', '2'), ('c', '3', 'x'), ('d', '1e5', '4')]
+        temptable = TemporarySqliteTable(data, columns, dtypes='infer')
+        self.assertEqual(temptable.dtypes, {'bar': 'TEXT', 'baz': 'TEXT'})
+
+        cursor = temptable.connection.cursor()
+        cursor.execute('SELECT foo, bar, baz FROM ' + temptable.name)
+        result = list(cursor)
+        self.assertEqual(len(result), 1003)
+        self.assertEqual(result[0], ('a', '1', '1.5'))
+        expected = [
+            ('b', '007', '2.0'),  # <- Not changed to 7 (but 2 was stored as REAL).
+            ('c', '3', 'x'),
+            ('d', '1e5', '4'),  # <- Not changed to 100000.
+        ]
+        self.assertEqual(result[1000:], expected)
+
+    def test_init_infer_dtypes_after_sample_dict_rows(self):
+        sample = [{'a': '1', 'b': '1'}] * 1000
+        data = sample + [{'a': '2', 'b': '02'}, {'a': '3', 'b': '3'}]
+        temptable = TemporarySqliteTable(data, dtypes='infer')
+        self.assertEqual(temptable.dtypes, {'a': 'INTEGER', 'b': 'TEXT'})
+
+        cursor = temptable.connection.cursor()
+        cursor.execute('SELECT a, b FROM ' + temptable.name)
+        result = list(cursor)
+        self.assertEqual(result[999:], [(1, '1'), (2, '02'), (3, '3')])
+
+
+class TestDtypes(unittest.TestCase):
+    def test_normalize_dtype(self):
+        self.assertEqual(_normalize_dtype(int), 'INTEGER')
+        self.assertEqual(_normalize_dtype(float), 'REAL')
+        self.assertEqual(_normalize_dtype(str), 'TEXT')
+        self.assertEqual(_normalize_dtype('Text'), 'TEXT')
+        self.assertIsNone(_normalize_dtype(None))
+
+        with self.assertRaises(ValueError):
+            _normalize_dtype(list)
+
+        with self.assertRaises(ValueError):
+            _normalize_dtype('BLOB')
+
+    def test_infer_dtypes(self):
+        columns = ['a', 'b', 'c', 'd', 'e', 'f']
+        data = [
+            ('x', '1', '1', '1', '001', 5),
+            ('y', '2', '2.5', '', '002', 6),
+            ('z', '-3', '1e3', 'x', '003', 7.5),
+        ]
+        dtypes, rebuilt = _infer_dtypes(columns, data)
+        self.assertEqual(dtypes, {'b': 'INTEGER', 'c': 'REAL', 'f': 'REAL'})
+        self.assertEqual(list(rebuilt), data, msg='data should be unchanged')
+
+    def test_infer_dtypes_sample_size(self):
+        data = [('1',), ('2',), ('x',)]
+        dtypes, rebuilt = _infer_dtypes(['a'], data, sample_size=2)
+        self.assertEqual(dtypes, {'a': 'INTEGER'})
+        self.assertEqual(list(rebuilt), data)
+
+    def test_infer_dtypes_dict_rows(self):
+        data = [{'a': '1', 'b': 'x'}, {'a': '2', 'b': 'y'}]
+        dtypes, rebuilt = _infer_dtypes(['a', 'b'], data)
+        self.assertEqual(dtypes, {'a': 'INTEGER'})
+        self.assertEqual(list(rebuilt), data)
+
+
 class TestTemporarySqliteTableForCsv(unittest.TestCase):
     def setUp(self):
         columns = ['foo', 'bar']
@@ -253,3 +366,21 @@ class TestTemporarySqliteTableForCsv(unittest.TestCase):
             ('',  '',  'd', '4'),
         ]
         self.assertEqual(result, expected)
+
+    def test_concat_dtypes(self):
+        columns = ['foo', 'baz']
+        data = [
+            ('c', '3'),
+            ('d', '4'),
+        ]
+        self.temptable._concatenate_data(data, columns, dtypes='infer')
+        self.assertEqual(self.temptable.dtypes, {'baz': 'INTEGER'})
+
+        result = self.get_table()
+        expected = [
+            ('a', '1',  ''),
+            ('b', '2',  ''),
+            ('c',  '', 3),
+            ('d',  '', 4),
+        ]
+        self.assertEqual(result, expected)
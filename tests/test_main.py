@@ -1,5 +1,6 @@
 # -*- coding: utf-8 -*-
 import glob
+import linecache
 import os
 import shutil
 import sys
@@ -77,6 +78,10 @@ class TestDataTestProgram(unittest.TestCase):
         with open(filename, 'w') as fh:
             source_code = textwrap.dedent(source_code)
             fh.write(source_code)
+        sys.modules.pop(modname, None)  # <- Some loaders reuse an existing
+                                        #    module (keeping old classes).
+        linecache.clearcache()  # <- Older versions of inspect do not
+                                #    check for stale source lines.
         module = load_module_from_file(modname, filename)
         return module
 
@@ -244,6 +249,267 @@ class TestDataTestProgram(unittest.TestCase):
         #self.assertEqual(len(result.errors), 0)
         #self.assertEqual(len(result.failures), 1)
 
+    def test_parallel(self):
+        source_code = """
+            import datatest
+
+            class TestA(datatest.DataTestCase):
+                def test_one(self):
+                    self.assertTrue(True)
+
+                def test_two(self):
+                    self.assertTrue(False)  # <- TEST FAILURE!
+
+            class TestB(datatest.DataTestCase):
+                @classmethod
+                def setUpClass(cls):
+                    raise Exception('fixture error')  # <- CLASS ERROR!
+
+                def test_three(self):
+                    self.assertTrue(True)
+
+            class TestC(datatest.DataTestCase):
+                def test_four(self):
+                    self.assertTrue(False)  # <- TEST FAILURE!
+
+                def test_five(self):
+                    raise Exception('test error')  # <- TEST ERROR!
+
+        """
+        module = self.load_module(source_code)
+
+        with open(os.devnull, 'w') as devnul:
+            with redirect_stderr(devnul):
+                argv = ['', '--parallel', '2']
+                program = DataTestProgram(module=module, exit=False, argv=argv)
+
+        self.assertEqual(program.parallel, 2)
+        result = program.result
+        self.assertEqual(result.testsRun, 4)
+        self.assertEqual(len(result.failures), 2)
+        self.assertEqual(len(result.errors), 2)
+
+        # Outcomes are merged in line-number order.
+        failed = [test.id() for test, _ in result.failures]
+        self.assertEqual(failed, ['testmodule.TestA.test_two',
+                                  'testmodule.TestC.test_four'])
+        self.assertIn('setUpClass', str(result.errors[0][0]))
+        self.assertRegex(result.errors[0][1], 'fixture error')
+        self.assertEqual(result.errors[1][0].id(), 'testmodule.TestC.test_five')
+        self.assertRegex(result.errors[1][1], 'test error')
+
+    def test_parallel_mandatory(self):
+        source_code = """
+            import datatest
+
+            class TestA(datatest.DataTestCase):
+                def test_one(self):
+                    self.assertTrue(True)
+
+                @datatest.mandatory  # <- "MANDATORY" DECORATOR
+                def test_two(self):
+                    self.assertTrue(False)  # <- TEST FAILURE!
+
+            class TestB(datatest.DataTestCase):
+                def test_three(self):
+                    self.assertTrue(True)
+
+            class TestC(datatest.DataTestCase):
+                def test_four(self):
+                    self.assertTrue(True)
+
+        """
+        module = self.load_module(source_code)
+
+        with open(os.devnull, 'w') as devnul:
+            with redirect_stderr(devnul):
+                program = DataTestProgram(module=module, exit=False,
+                                          argv=['', '--parallel=2'])
+
+        result = program.result
+        self.assertEqual(result.testsRun, 2)  # <- Should stop early, "test_two" is mandatory.
+        self.assertEqual(len(result.errors), 0)
+        self.assertEqual(len(result.failures), 1)
+        self.assertRegex(result.failures[0][1], 'mandatory test failed, stopping early')
+        self.assertEqual(result.failures[0][1].count('mandatory test failed'), 1)
+
+    def test_parallel_mandatory_barrier(self):
+        """Units after a mandatory test should not be dispatched until
+        its outcome is known.
+        """
+        marker = os.path.join(self._temp_dir, 'marker.txt')
+        source_code = """
+            import datatest
+
+            class TestA(datatest.DataTestCase):
+                @datatest.mandatory  # <- "MANDATORY" DECORATOR
+                def test_one(self):
+                    self.assertTrue(False)  # <- TEST FAILURE!
+
+            class TestB(datatest.DataTestCase):
+                def test_two(self):
+                    open({0!r}, 'w').close()
+
+        """.format(marker)
+        module = self.load_module(source_code)
+
+        with open(os.devnull, 'w') as devnul:
+            with redirect_stderr(devnul):
+                program = DataTestProgram(module=module, exit=False,
+                                          argv=['', '--parallel=2'])
+
+        self.assertEqual(program.result.testsRun, 1)
+        self.assertFalse(os.path.exists(marker), 'TestB should never run')
+
+    def test_parallel_module_fixtures(self):
+        """Module fixtures should run once per worker process rather
+        than once per class.
+        """
+        log = os.path.join(self._temp_dir, 'log.txt')
+        source_code = """
+            import os
+            import datatest
+
+            def setUpModule():
+                with open({0!r}, 'a') as fh:
+                    fh.write('setUp %d\\n' % os.getpid())
+
+            def tearDownModule():
+                with open({0!r}, 'a') as fh:
+                    fh.write('tearDown %d\\n' % os.getpid())
+
+            class TestA(datatest.DataTestCase):
+                def test_one(self):
+                    self.assertTrue(True)
+
+            class TestB(datatest.DataTestCase):
+                def test_two(self):
+                    self.assertTrue(True)
+
+            class TestC(datatest.DataTestCase):
+                def test_three(self):
+                    self.assertTrue(True)
+
+            class TestD(datatest.DataTestCase):
+                def test_four(self):
+                    self.assertTrue(True)
+
+        """.format(log)
+        module = self.load_module(source_code)
+
+        with open(os.devnull, 'w') as devnul:
+            with redirect_stderr(devnul):
+                program = DataTestProgram(module=module, exit=False,
+                                          argv=['', '--parallel=2'])
+
+        self.assertEqual(program.result.testsRun, 4)
+        self.assertTrue(program.result.wasSuccessful())
+        with open(log) as fh:
+            calls = [line.split() for line in fh]
+        setups = [pid for name, pid in calls if name == 'setUp']
+        teardowns = [pid for name, pid in calls if name == 'tearDown']
+        self.assertLessEqual(len(setups), 2)
+        self.assertEqual(len(setups), len(set(setups)), 'once per worker')
+        self.assertEqual(sorted(teardowns), sorted(setups))
+
+    def test_parallel_module_teardown_error(self):
+        source_code = """
+            import datatest
+
+            def tearDownModule():
+                raise Exception('teardown error')  # <- MODULE ERROR!
+
+            class TestA(datatest.DataTestCase):
+                def test_one(self):
+                    self.assertTrue(True)
+
+        """
+        module = self.load_module(source_code)
+
+        with open(os.devnull, 'w') as devnul:
+            with redirect_stderr(devnul):
+                program = DataTestProgram(module=module, exit=False,
+                                          argv=['', '--parallel=2'])
+
+        result = program.result
+        self.assertEqual(result.testsRun, 1)
+        self.assertEqual(len(result.errors), 1)
+        self.assertIn('tearDownModule', str(result.errors[0][0]))
+        self.assertRegex(result.errors[0][1], 'teardown error')
+
+    def test_parallel_requirement(self):
+        """A parallel() requirement should be checked without starting
+        its own worker processes when tests run in parallel workers.
+        """
+        source_code = """
+            import datatest
+
+            def is_even(x):
+                return x % 2 == 0
+
+            class TestA(datatest.DataTestCase):
+                def test_one(self):
+                    data = [x * 2 for x in range(50)]
+                    self.assertValid(data, datatest.parallel(is_even, workers=2, chunksize=10))
+
+                def test_two(self):
+                    data = [x * 2 for x in range(50)] + [7]
+                    self.assertValid(data, datatest.parallel(is_even, workers=2, chunksize=10))  # <- TEST FAILURE!
+
+        """
+        module = self.load_module(source_code)
+
+        with open(os.devnull, 'w') as devnul:
+            with redirect_stderr(devnul):
+                program = DataTestProgram(module=module, exit=False,
+                                          argv=['', '--parallel=2'])
+
+        result = program.result
+        self.assertEqual(result.testsRun, 2)
+        self.assertEqual(result.errors, [])
+        self.assertEqual(len(result.failures), 1)
+        self.assertEqual(result.failures[0][0].id(), 'testmodule.TestA.test_two')
+        self.assertRegex(result.failures[0][1], r'Invalid\(7\)')
+
+    def test_parallel_dead_worker(self):
+        """Tests should be reported as errors if their worker process
+        dies (rather than waiting forever for their results).
+        """
+        source_code = """
+            import os
+            import datatest
+
+            class TestA(datatest.DataTestCase):
+                def test_one(self):
+                    self.assertTrue(True)
+
+            class TestB(datatest.DataTestCase):
+                def test_two(self):
+                    os._exit(1)  # <- WORKER DIES!
+
+                def test_three(self):
+                    self.assertTrue(True)
+
+            class TestC(datatest.DataTestCase):
+                def test_four(self):
+                    self.assertTrue(False)  # <- TEST FAILURE!
+
+        """
+        module = self.load_module(source_code)
+
+        with open(os.devnull, 'w') as devnul:
+            with redirect_stderr(devnul):
+                program = DataTestProgram(module=module, exit=False,
+                                          argv=['', '--parallel=2'])
+
+        result = program.result
+        self.assertEqual(result.testsRun, 4)
+        self.assertEqual(len(result.failures), 1)
+        errored = [test.id() for test, _ in result.errors]
+        self.assertEqual(errored, ['testmodule.TestB.test_two',
+                                   'testmodule.TestB.test_three'])
+        self.assertRegex(result.errors[0][1], 'exited unexpectedly')
+
 
 # Patch for setUpClass and tearDownClass on older versions of unittest.
 try:
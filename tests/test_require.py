@@ -1,7 +1,13 @@
 """Tests for validation and comparison functions."""
+import copy
+import pickle
 import re
 import textwrap
 from . import _unittest as unittest
+try:
+    import numpy
+except ImportError:
+    numpy = None
 from datatest.utils.misc import _is_consumable
 
 from datatest.errors import Extra
@@ -9,16 +15,25 @@ from datatest.errors import Missing
 from datatest.errors import Invalid
 from datatest.errors import Deviation
 from datatest.errors import NOTFOUND
+from datatest.errors import _TruncatedList
+from datatest.errors import _TruncatedDict
 
 from datatest.require import _require_sequence
+from datatest.require import _iter_sequence_differences
 from datatest.require import _require_set
 from datatest.require import _require_callable
+from datatest.require import parallel
+from datatest.require import batch
 from datatest.require import _require_regex
 from datatest.require import _require_equality
 from datatest.require import _require_single_equality
 from datatest.require import _get_msg_and_func
 from datatest.require import _apply_mapping_requirement
 from datatest.require import _get_difference_info
+from datatest import require
+from datatest.dataaccess import DataSource
+from datatest.dataaccess import DataResult
+from datatest.dataaccess import DictItems
 
 
 class TestRequireSequence(unittest.TestCase):
@@ -97,6 +112,172 @@ class TestRequireSequence(unittest.TestCase):
         self.assertEqual(actual, expected)
 
 
+    def test_mixed_hashable_and_unhashable(self):
+        data = ['aaa', {'b': 2}, ['ccc'], 'ddd']
+        requirement = ['aaa', {'b': 2}, ['---'], 'ddd']
+        actual = _require_sequence(data, requirement)
+        self.assertEqual(actual, {(2, 2): Invalid(['ccc'], ['---'])})
+
+    def test_long_sequence(self):
+        data = list(range(100000))
+        requirement = list(range(100000))
+        requirement[10] = 'a'
+        requirement[50000] = 'b'
+        del requirement[90000]
+        requirement.append('c')
+
+        actual = _require_sequence(data, requirement)
+        expected = {
+            (10, 10): Invalid(10, 'a'),
+            (50000, 50000): Invalid(50000, 'b'),
+            (90000, 90000): Extra(90000),
+            (100000, 99999): Missing('c'),
+        }
+        self.assertEqual(actual, expected)
+
+    def test_longest_common_subsequence(self):
+        """Elements outside of the longest common subsequence should
+        be reported as differences.
+        """
+        data = list('cacacec')
+        requirement = list('babaadbc')
+        actual = _require_sequence(data, requirement)
+        expected = {
+            (0, 0): Invalid('c', 'b'),
+            (2, 2): Invalid('c', 'b'),
+            (4, 4): Invalid('c', 'a'),
+            (5, 5): Invalid('e', 'd'),
+            (6, 6): Missing('b'),
+        }
+        self.assertEqual(actual, expected)
+
+    def test_difflib_fallback(self):
+        """When differences exceed the edit distance limit, the result
+        should be the same as comparing the elements with difflib.
+        """
+        data = list('cacacec')
+        requirement = list('babaadbc')
+
+        original = require._MAX_EDIT_DISTANCE
+        require._MAX_EDIT_DISTANCE = 1
+        try:
+            actual = _require_sequence(data, requirement)
+        finally:
+            require._MAX_EDIT_DISTANCE = original
+
+        expected = {
+            (0, 0): Missing('b'),
+            (0, 1): Missing('a'),
+            (0, 2): Missing('b'),
+            (0, 3): Missing('a'),
+            (0, 4): Missing('a'),
+            (0, 5): Missing('d'),
+            (0, 6): Missing('b'),
+            (1, 8): Extra('a'),
+            (2, 8): Extra('c'),
+            (3, 8): Extra('a'),
+            (4, 8): Extra('c'),
+            (5, 8): Extra('e'),
+            (6, 8): Extra('c'),
+        }
+        self.assertEqual(actual, expected)
+
+    def test_iterator_data(self):
+        """Iterators are compared in windows and return DictItems."""
+        data = ['aaa', '---', 'ddd', 'eee', 'ggg']
+        requirement = ['aaa', 'bbb', 'ccc', 'ddd', 'fff']
+
+        actual = _require_sequence(DataResult(data, evaluation_type=list), requirement)
+        self.assertIsInstance(actual, DictItems)
+        self.assertEqual(dict(actual), _require_sequence(data, requirement))
+
+        actual = _require_sequence(DataResult(data, evaluation_type=list), data)
+        self.assertIsNone(actual)
+
+    def test_small_window(self):
+        data = ['a', 'b', 'x', 'c', 'd', 'e', 'f', 'g', 'h', 'i', 'j']
+        requirement = ['a', 'b', 'c', 'd', 'e', 'y', 'f', 'g', 'h', 'i', 'k']
+
+        original = require._SEQUENCE_WINDOW
+        require._SEQUENCE_WINDOW = 4
+        try:
+            actual = _require_sequence(DataResult(data, list), requirement)
+            actual = dict(actual)
+        finally:
+            require._SEQUENCE_WINDOW = original
+
+        expected = {
+            (2, 2): Extra('x'),
+            (6, 5): Missing('y'),
+            (10, 10): Invalid('j', 'k'),
+        }
+        self.assertEqual(actual, expected)
+
+    def test_resynchronize(self):
+        """Differences longer than the window should be compared as
+        if the inputs were read all at once.
+        """
+        data = ['a', 'b', 'c', 'd', 'e', 'f']
+        requirement = ['x', 'y', 'z', 'd', 'e', 'f']
+        actual = dict(_iter_sequence_differences(data, requirement, window=2))
+        expected = {
+            (0, 0): Invalid('a', 'x'),
+            (1, 1): Invalid('b', 'y'),
+            (2, 2): Invalid('c', 'z'),
+        }
+        self.assertEqual(actual, expected)
+
+        data = ['a', 'x', 'y', 'z', 'b', 'c']  # Inserted run.
+        requirement = ['a', 'b', 'c']
+        actual = dict(_iter_sequence_differences(data, requirement, window=2))
+        expected = {
+            (1, 1): Extra('x'),
+            (2, 1): Extra('y'),
+            (3, 1): Extra('z'),
+        }
+        self.assertEqual(actual, expected)
+
+        data = ['x', 'y', 'z', 'a', 'b', 'c', 'd']  # Leading run.
+        requirement = ['a', 'b', 'c', 'd']
+        actual = dict(_iter_sequence_differences(data, requirement, window=2))
+        expected = {
+            (0, 0): Extra('x'),
+            (1, 0): Extra('y'),
+            (2, 0): Extra('z'),
+        }
+        self.assertEqual(actual, expected)
+
+        data = ['a', 'b', 'c']  # Deleted run.
+        requirement = ['a', 'x', 'y', 'z', 'b', 'c']
+        actual = dict(_iter_sequence_differences(data, requirement, window=2))
+        expected = {
+            (1, 1): Missing('x'),
+            (1, 2): Missing('y'),
+            (1, 3): Missing('z'),
+        }
+        self.assertEqual(actual, expected)
+
+
+    def test_window_growth_limit(self):
+        """When no elements match, windows should not grow larger than
+        _SEQUENCE_WINDOW_GROWTH times the window size.
+        """
+        consumed = []
+        def data():
+            for x in range(100):
+                consumed.append(x)
+                yield x
+        requirement = ['x{0}'.format(x) for x in range(100)]
+        max_size = 4 * require._SEQUENCE_WINDOW_GROWTH
+
+        count = 0
+        for (i, j), diff in _iter_sequence_differences(data(), requirement, window=4):
+            self.assertLessEqual(len(consumed) - i, max_size)
+            self.assertEqual(diff, Invalid(i, 'x{0}'.format(i)))
+            count += 1
+        self.assertEqual(count, 100)
+
+
 class TestRequireSet(unittest.TestCase):
     def setUp(self):
         self.requirement = set(['a', 'b', 'c'])
@@ -144,6 +325,28 @@ class TestRequireSet(unittest.TestCase):
         result = _require_set(NOTFOUND, set(['a']))
         self.assertEqual(list(result), [Missing('a')])
 
+    def test_set_data(self):
+        data = frozenset(['a', 'c', 'x'])
+        result = _require_set(data, self.requirement)
+        self.assertEqual(set(result), set([Missing('b'), Extra('x')]))
+
+    def test_unhashable(self):
+        with self.assertRaises(TypeError):
+            _require_set(iter([['a']]), self.requirement)
+
+    def test_data_query(self):
+        source = DataSource([['a'], ['c'], ['x'], ['x']], ['A'])
+
+        result = _require_set(source('A'), self.requirement)
+        self.assertEqual(set(result), set([Missing('b'), Extra('x')]))
+
+        query = source('A').map(lambda x: x)  # <- Evaluated in Python.
+        result = _require_set(query, self.requirement)
+        self.assertEqual(set(result), set([Missing('b'), Extra('x')]))
+
+        result = _require_set(source('A', A=['a', 'c']), set(['a', 'c']))
+        self.assertIsNone(result)
+
 
 class TestRequireCallable(unittest.TestCase):
     def setUp(self):
@@ -199,6 +402,135 @@ class TestRequireCallable(unittest.TestCase):
         self.assertEqual(result, Invalid(None))
 
 
+def _all_even(values):  # <- Defined at module level so it can be pickled.
+    return [x % 2 == 0 for x in values]
+
+
+def _is_even(x):  # <- Defined at module level so it can be pickled.
+    if x == 'bad':
+        return 'bad'  # <- Not True, False or a difference.
+    if x == 11:
+        return Deviation(+1, 10)
+    return x % 2 == 0
+
+
+class TestRequireParallel(unittest.TestCase):
+    def test_same_as_serial(self):
+        data = list(range(50)) + [11, 'x']
+        expected = list(_require_callable(iter(data), _is_even))
+
+        requirement = parallel(_is_even, workers=2, chunksize=3)
+        actual = list(_require_callable(iter(data), requirement))
+        self.assertEqual(actual, expected, 'should keep the order of the data')
+
+        self.assertIsNone(_require_callable(iter([2, 4, 6, 8]), requirement))
+
+    def test_small_data(self):
+        """Data that fits in one chunk is checked without a pool."""
+        requirement = parallel(lambda x: x > 0, chunksize=10)
+        result = _require_callable([1, 0, 2], requirement)
+        self.assertEqual(list(result), [Invalid(0)])
+
+        self.assertEqual(_require_callable(-1, requirement), Invalid(-1))
+
+    def test_bad_return_value(self):
+        requirement = parallel(_is_even, workers=2, chunksize=2)
+        with self.assertRaises(TypeError):
+            list(_require_callable(iter([2, 4, 6, 'bad', 8]), requirement))
+
+    def test_message(self):
+        msg, func = _get_msg_and_func([1, 2], parallel(_is_even))
+        self.assertEqual(msg, "does not satisfy '_is_even' condition")
+        self.assertIs(func, _require_callable)
+
+    def test_bad_arguments(self):
+        with self.assertRaises(TypeError):
+            parallel('abc')
+
+        with self.assertRaises(ValueError):
+            parallel(_is_even, chunksize=0)
+
+
+class TestRequireBatch(unittest.TestCase):
+    def test_mask(self):
+        calls = []
+        @batch(chunksize=2)
+        def is_even(values):
+            calls.append(list(values))
+            return [x % 2 == 0 for x in values]
+
+        result = _require_callable(iter([2, 3, 4, 5, 6]), is_even)
+        self.assertEqual(list(result), [Invalid(3), Invalid(5)])
+        self.assertEqual(calls, [[2, 3], [4, 5], [6]])
+
+        self.assertIsNone(_require_callable(iter([2, 4]), is_even))
+
+    def test_differences(self):
+        @batch
+        def check(values):
+            return [True if x == 'a' else Deviation(+1, 10) for x in values]
+
+        result = _require_callable(['a', 'b'], check)
+        self.assertEqual(list(result), [Deviation(+1, 10)])
+
+    def test_single_element(self):
+        is_positive = batch(lambda values: [x > 0 for x in values])
+        self.assertIsNone(_require_callable(5, is_positive))
+        self.assertEqual(_require_callable(-5, is_positive), Invalid(-5))
+        self.assertEqual(_require_callable(NOTFOUND, is_positive), Invalid(None))
+
+    def test_tuple_elements(self):
+        """Tuples are passed as-is (they are not unpacked)."""
+        check = batch(lambda values: [a < b for a, b in values])
+        result = _require_callable([(1, 2), (3, 2)], check)
+        self.assertEqual(list(result), [Invalid((3, 2))])
+
+    def test_bad_results(self):
+        check = batch(lambda values: [True])
+        with self.assertRaises(ValueError):
+            list(_require_callable([1, 2], check))
+
+        check = batch(lambda values: ['x' for x in values])
+        with self.assertRaises(TypeError):
+            list(_require_callable([1, 2], check))
+
+    def test_copy_and_pickle(self):
+        check = batch(_all_even, chunksize=5)
+
+        copied = copy.copy(check)
+        self.assertIsInstance(copied, batch)
+        self.assertIs(copied.requirement, _all_even)
+        self.assertEqual(copied.chunksize, 5)
+
+        unpickled = pickle.loads(pickle.dumps(check))
+        self.assertIsInstance(unpickled, batch)
+        self.assertEqual(repr(unpickled), repr(check))
+        result = _require_callable([2, 3], unpickled)
+        self.assertEqual(list(result), [Invalid(3)])
+
+    @unittest.skipIf(numpy is None, 'numpy not found')
+    def test_numpy_mask(self):
+        is_positive = batch(lambda values: numpy.array(values) > 0, chunksize=3)
+        result = _require_callable(iter([1, -2, 3, 4, -5]), is_positive)
+        self.assertEqual(list(result), [Invalid(-2), Invalid(-5)])
+
+    def test_message(self):
+        @batch
+        def is_digits(values):
+            return [x.isdigit() for x in values]
+
+        msg, func = _get_msg_and_func(['1', '2'], is_digits)
+        self.assertEqual(msg, "does not satisfy 'is_digits' condition")
+        self.assertIs(func, _require_callable)
+
+    def test_bad_arguments(self):
+        with self.assertRaises(TypeError):
+            batch('abc')
+
+        with self.assertRaises(ValueError):
+            batch(len, chunksize=0)
+
+
 class TestRequireRegex(unittest.TestCase):
     def setUp(self):
         self.regex = re.compile('[a-z][0-9]+')
@@ -229,6 +561,35 @@ class TestRequireRegex(unittest.TestCase):
         result = _require_regex(NOTFOUND, self.regex)
         self.assertEqual(result, Invalid(None))
 
+    def test_single_element(self):
+        self.assertIsNone(_require_regex('a1', self.regex))
+        self.assertEqual(_require_regex('XX', self.regex), Invalid('XX'))
+
+    def test_non_string_elements(self):
+        """Elements that are not strings are handled the same way as
+        other callable requirements.
+        """
+        data = ['a1', ('b2',), ('XX',), None, u'c3']
+        result = _require_regex(data, self.regex)
+        self.assertEqual(list(result), [Invalid(('XX',)), Invalid(None)])
+
+    def test_data_query(self):
+        source = DataSource([['a1'], ['XX'], ['b2'], ['XX'], [5]], ['A'])
+
+        result = _require_regex(source('A'), self.regex)
+        self.assertEqual(list(result), [Invalid('XX'), Invalid('XX'), Invalid(5)])
+
+        result = _require_regex(source(set(['A'])), self.regex)
+        self.assertEqual(set(result), set([Invalid('XX'), Invalid(5)]))
+
+        query = source('A').map(lambda x: x)  # <- Evaluated in Python.
+        result = _require_regex(query, self.regex)
+        self.assertEqual(list(result), [Invalid('XX'), Invalid('XX'), Invalid(5)])
+
+        regex = re.compile('xx', re.IGNORECASE)  # <- Flags are used in SQL, too.
+        result = _require_regex(source('A', A=['XX', 'a1']), regex)
+        self.assertEqual(list(result), [Invalid('a1')])
+
 
 class TestRequireEquality(unittest.TestCase):
     def test_eq(self):
@@ -515,3 +876,81 @@ class TestGetDifferenceInfo(unittest.TestCase):
         msg, diffs = _get_difference_info(set(['x']), set(['x', 'y']))
         self.assertTrue(_is_consumable(diffs))
         self.assertEqual(list(diffs), [Missing('y')])
+
+    def test_max_differences(self):
+        consumed = []
+        def data():
+            for x in range(1000):
+                consumed.append(x)
+                yield x
+
+        msg, diffs = _get_difference_info(data(), 'a', max_differences=3)
+        self.assertIsInstance(diffs, _TruncatedList)
+        self.assertEqual(diffs, [Invalid(0), Invalid(1), Invalid(2)])
+        self.assertEqual(len(consumed), 4)  # <- Stops after limit is exceeded.
+
+        # Within limit, differences are not truncated.
+        msg, diffs = _get_difference_info(['a', 'b'], 'a', max_differences=3)
+        self.assertNotIsInstance(diffs, _TruncatedList)
+        self.assertEqual(diffs, [Invalid('b')])
+
+        with self.assertRaises(ValueError):
+            _get_difference_info(['a', 'b'], 'a', max_differences=0)
+
+    def test_max_differences_mapping(self):
+        data = {'a': iter(['x', 'y', 'y']), 'b': iter(['y', 'y'])}
+        requirement = {'a': 'x', 'b': 'x'}
+        msg, diffs = _get_difference_info(data, requirement, max_differences=3)
+        self.assertIsInstance(diffs, _TruncatedDict)
+        self.assertEqual(sum(len(v) for v in diffs.values()), 3)
+
+        data = {'a': 'x', 'b': 'y'}
+        msg, diffs = _get_difference_info(data, {'a': 'x', 'b': 'z'},
+                                          max_differences=1)
+        self.assertEqual(dict(diffs), {'b': Invalid('y', expected='z')})
+
+        data = {'a': 'y', 'b': 'y'}
+        msg, diffs = _get_difference_info(data, {'a': 'x', 'b': 'z'},
+                                          max_differences=1)
+        self.assertIsInstance(diffs, _TruncatedDict)
+        self.assertEqual(len(diffs), 1)
+
+    def test_max_differences_sequence(self):
+        msg, diffs = _get_difference_info(['a', 'x', 'y'], ['a', 'b', 'c'],
+                                          max_differences=1)
+        self.assertIsInstance(diffs, _TruncatedDict)
+        self.assertEqual(len(diffs), 1)
+
+
+@unittest.skipIf(numpy is None, 'numpy not found')
+class TestNumericMappingRequirement(unittest.TestCase):
+    """The NumPy comparison should give the same differences as the
+    regular comparison.
+    """
+    def assertSameResult(self, data, requirement):
+        result = list(_apply_mapping_requirement(data, requirement))
+
+        original = require._numpy
+        require._numpy = None
+        try:
+            expected = list(_apply_mapping_requirement(data, requirement))
+        finally:
+            require._numpy = original
+        self.assertEqual(result, expected)
+
+    def test_numeric(self):
+        data = {'a': 1, 'b': 2.5, 'c': 3, 'd': float('nan'), 'e': 0,
+                'f': 2 ** 60, 'g': 'x', 'h': 5, 'i': True}
+        requirement = {'a': 1, 'b': 2.0, 'c': 3.0, 'd': 1, 'e': 5,
+                       'f': 2 ** 60 + 1, 'g': 1, 'i': 1, 'j': 7}
+        self.assertSameResult(data, requirement)
+
+    def test_chunks(self):
+        original = require._NUMERIC_CHUNK_SIZE
+        require._NUMERIC_CHUNK_SIZE = 3
+        try:
+            data = dict((i, i % 4) for i in range(20))
+            requirement = dict((i, 1) for i in range(22))
+            self.assertSameResult(data, requirement)
+        finally:
+            require._NUMERIC_CHUNK_SIZE = original
@@ -6,6 +6,8 @@ from datatest.runner import DataTestResult
 from datatest.runner import skip
 from datatest.runner import mandatory
 from datatest.runner import _sort_key
+from datatest.runner import _get_line_number
+from datatest import runner
 
 
 class TestDataTestResult(unittest.TestCase):
@@ -68,3 +70,33 @@ class TestOrdering(unittest.TestCase):
         mandatory_line_no = reference_line_no + 7
         _, line_no = _sort_key(mandatory_case)
         self.assertEqual(mandatory_line_no, line_no)
+
+    def test_sort_key_without_source(self):
+        class SampleCase(unittest.TestCase):
+            @skip('Testing skip behavior.')
+            def test_skipped(self):
+                pass
+
+        # Line numbers should come from code objects without reading
+        # the source file.
+        original = runner.inspect.getsourcelines
+        def getsourcelines(obj):
+            raise AssertionError('should not read source')
+        runner.inspect.getsourcelines = getsourcelines
+        try:
+            case = SampleCase('test_skipped')
+            _, line_no = _sort_key(case)
+        finally:
+            runner.inspect.getsourcelines = original
+
+        function = case.test_skipped._wrapped
+        function = getattr(function, '__func__', function)
+        self.assertEqual(line_no, function.__code__.co_firstlineno)
+
+    def test_line_number_memoized(self):
+        def func():
+            pass
+        lineno = _get_line_number(func)
+        self.assertEqual(lineno, func.__code__.co_firstlineno)
+        self.assertIn(func, runner._line_numbers)
+        self.assertEqual(_get_line_number(func), lineno)
@@ -79,3 +79,17 @@ class TestExpectsMultipleParams(unittest.TestCase):
         else:
             expects_multiple = misc._expects_multiple_params(max)
             self.assertIsNone(expects_multiple)
+
+
+class TestIsPlainNumber(unittest.TestCase):
+    def test_plain_numbers(self):
+        self.assertTrue(misc._is_plain_number(1))
+        self.assertTrue(misc._is_plain_number(-2.5))
+        self.assertTrue(misc._is_plain_number(2 ** 53))
+
+    def test_other_objects(self):
+        self.assertFalse(misc._is_plain_number(2 ** 53 + 1))  # Not exact as float.
+        self.assertFalse(misc._is_plain_number(True))
+        self.assertFalse(misc._is_plain_number('1'))
+        self.assertFalse(misc._is_plain_number(None))
+        self.assertFalse(misc._is_plain_number(misc.Decimal('1.5')))